@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+import typing as t
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+
+__all__ = (
+    'CacheStats',
+    'ChangeVersions',
+    'PrivateFileBasedCache',
+    'atomic_rebumping_versions',
+)
+
+
+_state = threading.local()
+
+
+class CacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> t.Dict[str, t.Union[int, float]]:
+        return {'hits': self.hits, 'misses': self.misses, 'hit_ratio': round(self.hit_ratio, 4)}
+
+
+class PrivateFileBasedCache(FileBasedCache):
+    """
+    `FileBasedCache` accessible by the user of the app only. Its directory in the temp directory may be created
+    beforehand by anyone, so a directory of another user is refused and the permissions of the own one are fixed.
+    """
+
+    def __init__(self, *args: t.Any, **kwargs: t.Any) -> None:
+        super().__init__(*args, **kwargs)
+
+        if os.path.isdir(self._dir):
+            self._check_dir()
+
+    def _createdir(self) -> None:
+        super()._createdir()
+        self._check_dir()
+
+    def _check_dir(self) -> None:
+        stat = os.stat(self._dir)
+
+        if stat.st_uid != os.getuid():
+            raise ImproperlyConfigured(f'Cache directory {self._dir} belongs to another user')
+
+        if stat.st_mode & 0o077:
+            os.chmod(self._dir, 0o700)
+
+
+class ChangeVersions:
+    """
+    Opaque versions of parts of data (e.g. resources of an owner) replaced on every change of the part.
+    `ALL` is the version of the whole data, it is replaced on change of any part.
+
+    Versions are stored in `VERSIONS_CACHE_ALIAS` cache shared by all the processes of the app, so a change made
+    by any worker process or job is seen by the others.
+    They are used in cache keys and ETags, so nothing has to be invalidated explicitly.
+    """
+    ALL = 'all'
+
+    def __init__(self, namespace: str) -> None:
+        self.namespace = namespace
+
+    def _get_key(self, part: t.Any) -> str:
+        return f'{self.namespace}:version:{part}'
+
+    def get(self, part: t.Any = ALL) -> str:
+        cache = caches[settings.VERSIONS_CACHE_ALIAS]
+        key = self._get_key(part)
+
+        version = cache.get(key)
+
+        if version is None:
+            # a new random version, so data cached before the version was evicted can never match
+            cache.add(key, uuid.uuid4().hex, None)
+            version = cache.get(key)
+
+        return version
+
+    def bump(self, parts: t.Iterable[t.Any]) -> None:
+        """
+        Replaces versions of the parts and the version of all the data. Called on every change,
+        once immediately and once more after the commit, so data cached by concurrent requests before the commit
+        is never served.
+        """
+        cache = caches[settings.VERSIONS_CACHE_ALIAS]
+        keys = [self._get_key(part) for part in {*parts, self.ALL}]
+
+        def bump() -> None:
+            cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+        bump()
+        transaction.on_commit(bump)
+
+        rollback_bumps = getattr(_state, 'rollback_bumps', None)
+
+        if rollback_bumps is not None:
+            rollback_bumps.append(bump)
+
+
+@contextlib.contextmanager
+def atomic_rebumping_versions() -> t.Iterator[None]:
+    """
+    `transaction.atomic()` that replaces versions bumped inside of it once more if the transaction is rolled back:
+    data of the transaction read after a bump, e.g. by a later request of a batch, may have been cached under
+    the version, and the bump after the commit that would replace it never happens.
+    """
+    previous = getattr(_state, 'rollback_bumps', None)
+    _state.rollback_bumps = bumps = []
+    committed = False
+
+    try:
+        with transaction.atomic():
+            yield
+            committed = not transaction.get_rollback()
+    finally:
+        _state.rollback_bumps = previous
+
+        if not committed:
+            for bump in bumps:
+                bump()
+        elif previous is not None:
+            previous.extend(bumps)
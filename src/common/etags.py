@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import hashlib
+import typing as t
+
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+__all__ = (
+    'ETagMixin',
+)
+
+
+class ETagMixin:
+    """
+    Conditional GET support for viewsets.
+
+    Strong ETag is derived from `get_etag_version()`, a marker replaced on every change of the data,
+    instead of the response content, so `304 Not Modified` is returned without queries and serialization.
+    The marker has to be shared by all the processes of the app (as `common.cache.ChangeVersions` are), otherwise
+    a worker could confirm data changed by another one.
+    """
+
+    def get_etag_version(self) -> t.Any:
+        raise NotImplementedError()
+
+    def get_etag(self) -> str:
+        request = self.request
+        parts = (
+            self.action,
+            request.user.pk,
+            self.get_etag_version(),
+            request.accepted_media_type,
+            sorted(request.query_params.lists()),
+            sorted(self.kwargs.items()),
+        )
+
+        return '"%s"' % hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    def get_conditional_response(self, etag: str, get_response: t.Callable[[], Response]) -> Response:
+        if_none_match = parse_etags(self.request.META.get('HTTP_IF_NONE_MATCH', ''))
+
+        if etag in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = get_response()
+
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            # representation depends on the user
+            patch_vary_headers(response, ('Authorization',))
+
+        return response
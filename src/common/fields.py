@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import typing as t
+
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.utils import html
+
+
+__all__ = (
+    'CommaSeparatedListField',
+)
+
+
+class CommaSeparatedListField(serializers.ListField):
+    """
+    List field that additionally accepts comma separated values in query params/form data, e.g. `?ids=1,2,3`.
+    """
+
+    def get_value(self, dictionary: t.Mapping[str, t.Any]) -> t.Any:
+        if not html.is_html_input(dictionary) or self.field_name not in dictionary:
+            return super().get_value(dictionary)
+
+        return [item for value in dictionary.getlist(self.field_name) for item in value.split(',') if item] or empty
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import typing as t
+
+from rest_framework import mixins
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+
+__all__ = (
+    'ValuesListMixin',
+)
+
+
+class ValuesListMixin(mixins.ListModelMixin):
+    """
+    Fast path of `list` action: rows are fetched by `values_list()` of the serializer fields and returned as dicts,
+    so neither model instances nor the serializer are created.
+
+    Output is the same as of the serializer as long as its fields return values of the model fields as is
+    (e.g. integers, strings and booleans), which is checked by tests of the views using the mixin.
+    The fast path is enabled by `values_list = True` of the view.
+    """
+    values_list = False
+
+    def get_values_list_fields(self) -> t.Sequence[str]:
+        return self.get_serializer_class().Meta.fields
+
+    def list(self, request: Request, *args: t.Any, **kwargs: t.Any) -> Response:
+        if not self.values_list:
+            return super().list(request, *args, **kwargs)
+
+        fields = self.get_values_list_fields()
+        # keyset pagination takes cursor position from attributes of the last row
+        extra_fields = [field for field in getattr(self, 'keyset_ordering', ()) if field not in fields]
+
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*fields, *extra_fields, named=True)
+
+        page = self.paginate_queryset(queryset)
+        data = [dict(zip(fields, row)) for row in (queryset if page is None else page)]
+
+        if page is not None:
+            return self.get_paginated_response(data)
+
+        return Response(data)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import json
+import typing as t
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+import coreapi
+import coreschema
+from django.db.models import QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+
+
+__all__ = (
+    'KeysetPagination',
+)
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with opt-in keyset (cursor) mode.
+
+    Keyset mode is enabled by `cursor` query parameter (empty value for the first page) and requires
+    `keyset_ordering` attribute on the view, e.g. `('owner_id', 'id')`, of integer fields that must be unique
+    and backed by an index.
+    Next page is selected by `(owner_id, id) > (last_owner_id, last_id)` condition instead of OFFSET,
+    and no COUNT query is made, so every page costs the same.
+    """
+    cursor_query_param = 'cursor'
+    cursor_query_description = 'The pagination cursor value, empty value for the first page.'
+    default_keyset_limit = 100
+    max_keyset_limit = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    keyset = False
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request,
+                          view: t.Optional[APIView] = None) -> t.Optional[t.List[t.Any]]:
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset = True
+        self.request = request
+        self.ordering = view.keyset_ordering
+        self.limit = self.get_keyset_limit(request)
+
+        position = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        if position is not None:
+            queryset = self.filter_after(queryset, position)
+
+        # one extra row tells whether there is a next page
+        results = list(queryset[:self.limit + 1])
+        self.has_next = len(results) > self.limit
+        results = results[:self.limit]
+
+        self.next_position = [getattr(results[-1], field) for field in self.ordering] if self.has_next else None
+
+        return results
+
+    def filter_after(self, queryset: QuerySet, position: t.List[t.Any]) -> QuerySet:
+        meta = queryset.model._meta
+        columns = ', '.join(f'"{meta.db_table}"."{meta.get_field(field).column}"' for field in self.ordering)
+        placeholders = ', '.join(['%s'] * len(position))
+
+        # row value comparison is used as index condition, unlike an equivalent combination of OR/AND
+        return queryset.extra(where=[f'({columns}) > ({placeholders})'], params=position)
+
+    def get_keyset_limit(self, request: Request) -> int:
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_keyset_limit
+
+        if limit <= 0:
+            return self.default_keyset_limit
+
+        return min(limit, self.max_keyset_limit)
+
+    def decode_cursor(self, request: Request) -> t.Optional[t.List[t.Any]]:
+        encoded = request.query_params[self.cursor_query_param]
+
+        if not encoded:
+            return None
+
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # ordering consists of integer keys only
+        if not isinstance(position, list) or len(position) != len(self.ordering) \
+                or not all(type(value) is int for value in position):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position
+
+    def encode_cursor(self, position: t.List[t.Any]) -> str:
+        return urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode('ascii')).decode('ascii')
+
+    def get_next_link(self) -> t.Optional[str]:
+        if not self.keyset:
+            return super().get_next_link()
+
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data: t.List[t.Any]) -> Response:
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_schema_fields(self, view: APIView) -> t.List[coreapi.Field]:
+        return super().get_schema_fields(view) + [
+            coreapi.Field(
+                name=self.cursor_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(title='Cursor', description=self.cursor_query_description),
+            ),
+        ]
@@ -0,0 +1,122 @@
+"""
+Per-action budget of SQL queries of viewsets and detection of N+1 queries.
+
+Queries of the action are counted from the end of authentication and permission checks to the response,
+so the count does not depend on authentication caches. Savepoints are not counted, they depend on whether
+the request runs inside a transaction (as tests do). Queries of streamed content are not counted either.
+
+An action exceeding its budget or repeating a query of the same shape more than the limit raises
+`QueryBudgetExceeded` if `QUERY_BUDGET_RAISE` is set (as the test runner does) and is logged otherwise.
+"""
+from __future__ import annotations
+
+import contextlib
+import logging
+import re
+import typing as t
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+from rest_framework.request import Request
+
+
+__all__ = (
+    'QueryBudgetExceeded',
+    'QueryBudgetMixin',
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+re_placeholders = re.compile(r'%s(?:, %s)+')
+re_savepoint = re.compile(r'^(?:SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT) ')
+
+
+def get_query_shape(sql: str) -> str:
+    # `IN (%s, %s, ...)` has the same shape regardless of the number of values
+    return re_placeholders.sub('%s, ...', sql)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self) -> None:
+        self.shapes: t.Counter[str] = Counter()
+
+    @property
+    def count(self) -> int:
+        return sum(self.shapes.values())
+
+    def execute_wrapper(self, execute: t.Callable, sql: str, params: t.Any, many: bool,
+                        context: t.Dict[str, t.Any]) -> t.Any:
+        if not re_savepoint.match(sql):
+            self.shapes[get_query_shape(sql)] += 1
+
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMixin:
+    """
+    `action2query_budget` maps actions to the maximum number of their queries, actions missing in it are not limited
+    by the number. Any action may repeat a query of the same shape at most `query_repeat_limit` times,
+    `action2query_repeat_limit` overrides it per action, `None` disables the check.
+    """
+    action2query_budget: t.Dict[str, int] = {}
+    action2query_repeat_limit: t.Dict[str, t.Optional[int]] = {}
+    query_repeat_limit: t.Optional[int] = 3
+
+    def initial(self, request: Request, *args: t.Any, **kwargs: t.Any) -> None:
+        super().initial(request, *args, **kwargs)
+
+        self._query_counter = QueryCounter()
+        self._query_counter_stack = contextlib.ExitStack()
+
+        for connection in connections.all():
+            self._query_counter_stack.enter_context(connection.execute_wrapper(self._query_counter.execute_wrapper))
+
+    def dispatch(self, request: HttpRequest, *args: t.Any, **kwargs: t.Any) -> HttpResponse:
+        self._query_counter = None
+
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._query_counter is not None:
+                self._query_counter_stack.close()
+
+        # authentication or permission check failed before counting started
+        if self._query_counter is not None:
+            request._action_queries = self._query_counter.count
+            self._check_query_budget(self._query_counter)
+
+        return response
+
+    def _check_query_budget(self, counter: QueryCounter) -> None:
+        problems = []
+
+        budget = self.action2query_budget.get(self.action)
+
+        if budget is not None and counter.count > budget:
+            problems.append(f'{counter.count} queries exceed the budget of {budget}')
+
+        repeat_limit = self.action2query_repeat_limit.get(self.action, self.query_repeat_limit)
+
+        if repeat_limit is not None:
+            problems.extend(
+                f'query repeated {count} times (N+1?): {shape}'
+                for shape, count in counter.shapes.most_common() if count > repeat_limit
+            )
+
+        if not problems:
+            return
+
+        message = f'{type(self).__name__}.{self.action}: ' + '; '.join(problems)
+
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+
+        logger.warning(message)
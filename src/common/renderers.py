@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import typing as t
+
+from rest_framework.renderers import BaseRenderer
+
+
+__all__ = (
+    'CSVRenderer',
+    'NDJSONRenderer',
+    'StreamingRenderer',
+)
+
+
+class StreamingRenderer(BaseRenderer):
+    """
+    Renderer of flat rows that can be streamed chunk by chunk. `render` is used only for error responses.
+    """
+    charset = 'utf-8'
+
+    def render_header(self, fields: t.Sequence[str]) -> str:
+        return ''
+
+    def render_rows(self, fields: t.Sequence[str], rows: t.Iterable[t.Sequence[t.Any]]) -> str:
+        raise NotImplementedError()
+
+    def render(self, data: t.Any, accepted_media_type: t.Optional[str] = None,
+               renderer_context: t.Optional[t.Dict[str, t.Any]] = None) -> bytes:
+        if data is None:
+            return b''
+
+        if not isinstance(data, dict):
+            data = {'detail': data}
+
+        fields = list(data.keys())
+        content = self.render_header(fields) + self.render_rows(fields, [list(data.values())])
+
+        return content.encode(self.charset)
+
+
+class NDJSONRenderer(StreamingRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render_rows(self, fields: t.Sequence[str], rows: t.Iterable[t.Sequence[t.Any]]) -> str:
+        return ''.join(
+            json.dumps(dict(zip(fields, row)), ensure_ascii=False, separators=(',', ':')) + '\n' for row in rows
+        )
+
+
+class CSVRenderer(StreamingRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def _write(self, rows: t.Iterable[t.Sequence[t.Any]]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def render_header(self, fields: t.Sequence[str]) -> str:
+        return self._write([fields])
+
+    def render_rows(self, fields: t.Sequence[str], rows: t.Iterable[t.Sequence[t.Any]]) -> str:
+        return self._write(rows)
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import typing as t
+from types import ModuleType
+
+from django.conf import settings
+
+
+__all__ = (
+    'swagger_schema',
+)
+
+
+def swagger_schema(get_overrides: t.Callable[[ModuleType], t.Dict[str, t.Any]]) -> t.Callable[[t.Callable], t.Callable]:
+    """
+    Lazy version of `drf_yasg.utils.swagger_auto_schema`.
+    Overrides are built by `get_overrides(drf_yasg.openapi)` and drf_yasg is imported only if API docs are enabled,
+    so workers running without docs (`API_DOCS_ENABLED=false`) do not import it at all.
+    """
+
+    def decorator(view_method: t.Callable) -> t.Callable:
+        if not settings.API_DOCS_ENABLED:
+            return view_method
+
+        from drf_yasg import openapi
+        from drf_yasg.utils import swagger_auto_schema
+
+        return swagger_auto_schema(**get_overrides(openapi))(view_method)
+
+    return decorator
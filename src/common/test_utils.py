@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import multiprocessing
 import random
 import string
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
 
+from django.http import HttpResponse
 from django.test import Client
 from rest_framework.test import APIClient
 
@@ -58,3 +62,18 @@ class UsersTestMixin:
 
     def generate_password(self) -> str:
         return get_random_string()
+
+
+def run_in_process(func: t.Callable[..., t.Any], *args: t.Any) -> t.Any:
+    """
+    Runs the function in another process, as a change made by another worker process or by a job
+    """
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('fork')) as pool:
+        return pool.submit(func, *args).result()
+
+
+def get_action_queries(response: HttpResponse) -> int:
+    """
+    Number of queries of the viewset action counted by `common.query_budget.QueryBudgetMixin`
+    """
+    return response.wsgi_request._action_queries
@@ -0,0 +1,210 @@
+"""
+Rate limiting of API requests by token buckets shared by all worker processes of the host.
+
+Buckets are stored in a memory mapped file (`THROTTLING_FILE`), a fixed-size hash table of `THROTTLING_SLOTS` slots:
+key hash (uint64), tokens (double), time of the last update (double). A bucket is updated under an exclusive
+`fcntl` lock of the byte range of its probe window, so processes updating other buckets do not wait for each other,
+and checking a request takes no network round trip. When all the slots of a window are taken, the least recently
+updated bucket is evicted, so an evicted client starts with a full bucket. A request takes a token from the buckets
+of its user and of its address only if both of them have one, so a rejected request does not drain the other one.
+
+Rates are set in `DEFAULT_THROTTLE_RATES` of `REST_FRAMEWORK` settings in DRF format, e.g. `10/min` is a bucket of
+10 tokens refilled by 10 tokens per minute. Viewsets map actions to scopes by `action2throttle_scope`, a scope rate
+(`login.ip`, `resources_create.user`) overrides the default one (`ip`, `user`) and has its own buckets.
+The address is taken from `X-Forwarded-For` only behind `NUM_PROXIES` proxies of DRF settings, otherwise any client
+could get a fresh bucket by sending the header.
+"""
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+import typing as t
+
+from django.conf import settings
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from resources_api.metrics import Counter
+
+
+if t.TYPE_CHECKING:
+    # throttle classes are imported by rest_framework.views
+    from rest_framework.views import APIView
+
+
+__all__ = (
+    'ClientThrottle',
+    'TokenBuckets',
+    'get_buckets',
+    'parse_rate',
+)
+
+
+throttled_requests_total = Counter('throttled_requests_total', 'Number of requests rejected by rate limits.')
+
+SLOT = struct.Struct('Qdd')
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate: str) -> t.Tuple[int, float]:
+    """
+    Capacity of the bucket and tokens refilled per second of DRF rate, e.g. `10/min` is `(10, 1 / 6)`
+    """
+    number, period = rate.split('/')
+    capacity = int(number)
+
+    return capacity, capacity / PERIODS[period[0]]
+
+
+class TokenBuckets:
+    probe = 8
+
+    def __init__(self, path: str, slots: int) -> None:
+        # the probe window of the last slot does not wrap
+        size = (slots + self.probe) * SLOT.size
+
+        self.slots = slots
+        self._file = open(path, 'a+b')
+
+        if os.fstat(self._file.fileno()).st_size < size:
+            self._file.truncate(size)
+
+        self._map = mmap.mmap(self._file.fileno(), size)
+        # fcntl locks are held by the process, threads of the process are serialized by the lock
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, refill_rate: float, now: t.Optional[float] = None) -> float:
+        """
+        Takes a token from the bucket of the key. Returns 0 if the token is taken, seconds till the next token
+        otherwise.
+        """
+        return self.consume_all([(key, capacity, refill_rate)], now)[0]
+
+    def consume_all(self, buckets: t.Sequence[t.Tuple[str, int, float]],
+                    now: t.Optional[float] = None) -> t.List[float]:
+        """
+        Takes a token from every bucket `(key, capacity, refill rate)` if all of them have one, none otherwise.
+        Returns seconds till the next token of every bucket, all zeros if the tokens are taken.
+        """
+        key_hashes = [
+            int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+            for key, _, _ in buckets
+        ]
+        # windows are locked in the same order by all the processes to avoid deadlocks
+        starts = sorted({key_hash % self.slots for key_hash in key_hashes})
+        now = time.time() if now is None else now
+
+        with self._lock:
+            for start in starts:
+                fcntl.lockf(self._file, fcntl.LOCK_EX, self.probe * SLOT.size, start * SLOT.size)
+
+            try:
+                found = []
+
+                for key_hash, (_, capacity, refill_rate) in zip(key_hashes, buckets):
+                    slot, tokens = self._find(key_hash, key_hash % self.slots, capacity, refill_rate, now)
+                    # refilled state is stored at once, so another bucket of the same window does not take the slot
+                    SLOT.pack_into(self._map, slot * SLOT.size, key_hash, tokens, now)
+                    found.append((slot, tokens))
+
+                waits = [max(1 - tokens, 0) / refill_rate for (_, tokens), (_, _, refill_rate) in zip(found, buckets)]
+
+                if not any(waits):
+                    for key_hash, (slot, tokens) in zip(key_hashes, found):
+                        SLOT.pack_into(self._map, slot * SLOT.size, key_hash, tokens - 1, now)
+            finally:
+                for start in starts:
+                    fcntl.lockf(self._file, fcntl.LOCK_UN, self.probe * SLOT.size, start * SLOT.size)
+
+        return waits
+
+    def _find(self, key_hash: int, start: int, capacity: int, refill_rate: float,
+              now: float) -> t.Tuple[int, float]:
+        oldest, oldest_updated = start, float('inf')
+
+        for slot in range(start, start + self.probe):
+            slot_hash, tokens, updated = SLOT.unpack_from(self._map, slot * SLOT.size)
+
+            if slot_hash == key_hash:
+                # the clock may go back
+                return slot, min(capacity, tokens + max(now - updated, 0) * refill_rate)
+
+            if updated < oldest_updated:
+                oldest, oldest_updated = slot, updated
+
+        return oldest, capacity
+
+
+_buckets_lock = threading.Lock()
+_buckets: t.Optional[TokenBuckets] = None
+_buckets_owner: t.Optional[t.Tuple[int, str, int]] = None
+
+
+def get_buckets() -> TokenBuckets:
+    global _buckets, _buckets_owner
+
+    owner = (os.getpid(), settings.THROTTLING_FILE, settings.THROTTLING_SLOTS)
+
+    # buckets are shared by the threads of the process; a forked process opens the file again,
+    # as the lock of the parent could be held by its other thread
+    if _buckets_owner != owner:
+        with _buckets_lock:
+            if _buckets_owner != owner:
+                _buckets = TokenBuckets(settings.THROTTLING_FILE, settings.THROTTLING_SLOTS)
+                _buckets_owner = owner
+
+    return _buckets
+
+
+class ClientThrottle(BaseThrottle):
+    """
+    Buckets of the authenticated user (`user` rates) and of the client address (`ip` rates) of the request
+    """
+
+    def get_bucket_idents(self, request: Request) -> t.Dict[str, t.Optional[str]]:
+        """
+        Identities of the clients the buckets belong to by rate kind, a request is not limited by a missing one
+        """
+        return {
+            'user': str(request.user.pk) if request.user and request.user.is_authenticated else None,
+            'ip': self.get_ident(request),
+        }
+
+    def allow_request(self, request: Request, view: APIView) -> bool:
+        self.wait_seconds = 0.0
+
+        if not settings.THROTTLING_ENABLED:
+            return True
+
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        scope = getattr(view, 'action2throttle_scope', {}).get(getattr(view, 'action', None))
+        rate_names = []
+        buckets = []
+
+        for kind, ident in self.get_bucket_idents(request).items():
+            rate_name = f'{scope}.{kind}' if f'{scope}.{kind}' in rates else kind
+
+            if ident is not None and rates.get(rate_name) is not None:
+                rate_names.append(rate_name)
+                buckets.append((f'{rate_name}:{ident}', *parse_rate(rates[rate_name])))
+
+        if not buckets:
+            return True
+
+        waits = get_buckets().consume_all(buckets)
+        self.wait_seconds = max(waits)
+
+        for rate_name, wait in zip(rate_names, waits):
+            if wait:
+                throttled_requests_total.inc(rate=rate_name)
+
+        return not self.wait_seconds
+
+    def wait(self) -> t.Optional[float]:
+        return self.wait_seconds
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import signal
+import threading
+import typing as t
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connections
+
+from ...queue import work
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs. SIGINT and SIGTERM stop the worker after the running jobs are finished.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--concurrency', type=int, default=1, help='Number of jobs run at once, one per thread')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Seconds to wait when there are no due jobs, JOBS_POLL_INTERVAL by default')
+        parser.add_argument('--burst', action='store_true', help='Exit when there are no due jobs')
+
+    def handle(self, *args: t.Any, concurrency: int, poll_interval: t.Optional[float], burst: bool,
+               **options: t.Any) -> None:
+        stop = threading.Event()
+        poll_interval = settings.JOBS_POLL_INTERVAL if poll_interval is None else poll_interval
+
+        previous_handlers = {}
+
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                previous_handlers[signum] = signal.signal(signum, lambda *_: stop.set())
+
+        try:
+            processed = self._run(stop, concurrency, poll_interval, burst)
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+        self.stdout.write(self.style.SUCCESS(f'Jobs run: {processed}'))
+
+    def _run(self, stop: threading.Event, concurrency: int, poll_interval: float, burst: bool) -> int:
+        if concurrency <= 1:
+            return work(stop, poll_interval, burst)
+
+        results = [0] * concurrency
+
+        def run(i: int) -> None:
+            try:
+                results[i] = work(stop, poll_interval, burst)
+            finally:
+                # connections are per thread
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(i,), name=f'jobs-worker-{i}') for i in range(concurrency)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return sum(results)
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:27
+
+from __future__ import annotations
+
+import django.contrib.postgres.fields.jsonb
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=64)),
+                ('key', models.CharField(max_length=255, null=True)),
+                ('payload', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('lease_expires', models.DateTimeField(null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('started', models.DateTimeField(null=True)),
+                ('finished', models.DateTimeField(null=True)),
+                ('progress', django.contrib.postgres.fields.jsonb.JSONField(null=True)),
+                ('result', django.contrib.postgres.fields.jsonb.JSONField(null=True)),
+                ('error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='jobmodel',
+            index=models.Index(condition=models.Q(status='pending'), fields=['run_after', 'id'], name='jobs_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobmodel',
+            index=models.Index(condition=models.Q(status='running'), fields=['lease_expires'], name='jobs_running_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobmodel',
+            index=models.Index(fields=['key', '-id'], name='jobs_key_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='jobmodel',
+            constraint=models.UniqueConstraint(condition=models.Q(status__in=('pending', 'running')), fields=('key',), name='jobs_active_key_uniq'),
+        ),
+    ]
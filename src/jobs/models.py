@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from django.contrib.postgres.fields import JSONField
+from django.db import models
+from django.utils import timezone
+
+
+__all__ = (
+    'JobModel',
+)
+
+
+class JobModel(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    kind = models.CharField(max_length=64)
+    # identifies the subject of the job, so the same job is not queued twice, e.g. `purge_user:42`
+    key = models.CharField(max_length=255, null=True)
+    payload = JSONField(default=dict)
+    status = models.CharField(max_length=16, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    # a running job with expired lease is claimed again, so jobs of crashed workers are not lost
+    lease_expires = models.DateTimeField(null=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True)
+    finished = models.DateTimeField(null=True)
+    progress = JSONField(null=True)
+    result = JSONField(null=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = (
+            # claim queries look only at pending and running jobs, done ones do not bloat the indexes
+            models.Index(fields=('run_after', 'id'), name='jobs_pending_idx', condition=models.Q(status='pending')),
+            models.Index(fields=('lease_expires',), name='jobs_running_idx', condition=models.Q(status='running')),
+            models.Index(fields=('key', '-id'), name='jobs_key_idx'),
+        )
+        constraints = (
+            models.UniqueConstraint(fields=('key',), name='jobs_active_key_uniq',
+                                    condition=models.Q(status__in=('pending', 'running'))),
+        )
@@ -0,0 +1,157 @@
+"""
+Queue of background jobs stored in the database.
+
+Workers (`manage.py run_jobs`) claim jobs by `SELECT ... FOR UPDATE SKIP LOCKED`, so concurrent workers take
+different jobs without waiting for each other. The row is locked only while the job is claimed: the job itself
+runs outside of the claim transaction with a lease of `JOBS_LEASE_SECONDS`, long jobs extend it by `heartbeat()`.
+A running job with expired lease (its worker crashed) is claimed again, so handlers must be idempotent.
+
+Failed jobs are retried with exponential backoff up to `JOBS_MAX_ATTEMPTS` times.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import typing as t
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import JobModel
+
+
+__all__ = (
+    'claim',
+    'enqueue',
+    'heartbeat',
+    'register',
+    'run_job',
+    'work',
+)
+
+
+logger = logging.getLogger(__name__)
+
+# handler(job, **payload) returns JSON serializable result of the job
+Handler = t.Callable[..., t.Any]
+
+_handlers: t.Dict[str, Handler] = {}
+
+
+def register(kind: str) -> t.Callable[[Handler], Handler]:
+    def decorator(handler: Handler) -> Handler:
+        _handlers[kind] = handler
+        return handler
+
+    return decorator
+
+
+def enqueue(kind: str, key: t.Optional[str] = None, **payload: t.Any) -> JobModel:
+    """
+    Queues the job. If a pending or running job with the same key exists, it is returned instead.
+    The job is visible to workers once the current transaction commits.
+    """
+    if key is None:
+        return JobModel.objects.create(kind=kind, payload=payload)
+
+    try:
+        with transaction.atomic():
+            return JobModel.objects.create(kind=kind, key=key, payload=payload)
+
+    except IntegrityError:
+        # only active jobs are unique by key, see JobModel.Meta.constraints
+        active = JobModel.objects.filter(key=key, status__in=(JobModel.PENDING, JobModel.RUNNING)).first()
+
+        if active is None:
+            raise
+
+        return active
+
+
+def claim() -> t.Optional[JobModel]:
+    """
+    Marks the next due job as running and returns it, `None` if there are no due jobs not claimed by other workers
+    """
+    now = timezone.now()
+    queryset = JobModel.objects.select_for_update(skip_locked=True)
+
+    with transaction.atomic():
+        job = queryset.filter(status=JobModel.PENDING, run_after__lte=now).order_by('run_after', 'id').first() \
+            or queryset.filter(status=JobModel.RUNNING, lease_expires__lt=now).order_by('lease_expires').first()
+
+        if job is None:
+            return None
+
+        job.status = JobModel.RUNNING
+        job.attempts += 1
+        job.started = now
+        job.lease_expires = now + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+        job.save(update_fields=('status', 'attempts', 'started', 'lease_expires'))
+
+    return job
+
+
+def _update_claimed(job: JobModel, **fields: t.Any) -> bool:
+    # the job could have been claimed again by another worker after its lease expired
+    return bool(
+        JobModel.objects.filter(pk=job.pk, status=JobModel.RUNNING, attempts=job.attempts).update(**fields)
+    )
+
+
+def heartbeat(job: JobModel, progress: t.Any = None) -> None:
+    """
+    Extends the lease of the running job and stores its progress
+    """
+    _update_claimed(job, lease_expires=timezone.now() + timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+                    progress=progress)
+
+
+def run_job(job: JobModel) -> None:
+    handler = _handlers.get(job.kind)
+
+    try:
+        if handler is None:
+            raise LookupError(f'Unknown job kind {job.kind}')
+
+        result = handler(job, **job.payload)
+
+    except Exception as exc:
+        logger.exception('Job %s (%s) failed, attempt %s', job.pk, job.kind, job.attempts)
+
+        error = f'{type(exc).__name__}: {exc}'
+
+        if job.attempts >= settings.JOBS_MAX_ATTEMPTS:
+            _update_claimed(job, status=JobModel.FAILED, finished=timezone.now(), lease_expires=None, error=error)
+        else:
+            retry_after = timedelta(seconds=min(2 ** job.attempts, 300))
+            _update_claimed(job, status=JobModel.PENDING, run_after=timezone.now() + retry_after,
+                            lease_expires=None, error=error)
+
+        return
+
+    _update_claimed(job, status=JobModel.DONE, finished=timezone.now(), lease_expires=None, result=result, error='')
+
+
+def work(stop: threading.Event, poll_interval: float, burst: bool = False) -> int:
+    """
+    Runs claimed jobs one by one till `stop` is set, or till there are no due jobs if `burst` is set.
+    Returns the number of jobs run.
+    """
+    processed = 0
+
+    while not stop.is_set():
+        job = claim()
+
+        if job is None:
+            if burst:
+                break
+
+            stop.wait(poll_interval)
+            continue
+
+        run_job(job)
+        processed += 1
+
+    return processed
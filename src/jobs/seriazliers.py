@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from rest_framework import serializers
+
+from .models import JobModel
+
+
+__all__ = (
+    'JobSerializer',
+)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = JobModel
+        fields = ('id', 'kind', 'status', 'attempts', 'progress', 'result', 'error', 'created', 'started', 'finished')
+        read_only_fields = fields
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import threading
+import typing as t
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.utils import timezone
+
+from .models import JobModel
+from .queue import (
+    claim,
+    enqueue,
+    heartbeat,
+    register,
+    run_job,
+)
+
+
+@register('test_sum')
+def sum_job(job: JobModel, values: t.List[int]) -> int:
+    return sum(values)
+
+
+@register('test_fail')
+def fail_job(job: JobModel) -> None:
+    raise ValueError('failed')
+
+
+class JobsQueueTest(TestCase):
+    def test_run(self):
+        job = enqueue('test_sum', values=[1, 2])
+
+        claimed = claim()
+        run_job(claimed)
+        job.refresh_from_db()
+
+        assert claimed.pk == job.pk
+        assert job.status == JobModel.DONE
+        assert job.result == 3
+        assert job.attempts == 1
+        assert claim() is None
+
+    def test_order(self):
+        later = enqueue('test_sum', values=[])
+        JobModel.objects.filter(pk=later.pk).update(run_after=timezone.now() - timedelta(seconds=1))
+        earlier = enqueue('test_sum', values=[])
+        JobModel.objects.filter(pk=earlier.pk).update(run_after=timezone.now() - timedelta(seconds=2))
+
+        assert claim().pk == earlier.pk
+        assert claim().pk == later.pk
+
+    def test_not_due(self):
+        job = enqueue('test_sum', values=[])
+        JobModel.objects.filter(pk=job.pk).update(run_after=timezone.now() + timedelta(minutes=1))
+
+        assert claim() is None
+
+    @override_settings(JOBS_MAX_ATTEMPTS=2)
+    def test_retry(self):
+        job = enqueue('test_fail')
+
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            run_job(claim())
+
+        job.refresh_from_db()
+
+        assert job.status == JobModel.PENDING
+        assert job.error == 'ValueError: failed'
+        assert job.run_after > timezone.now()
+
+        JobModel.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            run_job(claim())
+
+        job.refresh_from_db()
+
+        assert job.status == JobModel.FAILED
+        assert job.attempts == 2
+
+    def test_unknown_kind(self):
+        job = enqueue('test_unknown')
+
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            run_job(claim())
+
+        job.refresh_from_db()
+
+        assert job.error == 'LookupError: Unknown job kind test_unknown'
+
+    def test_expired_lease_claimed_again(self):
+        job = enqueue('test_sum', values=[])
+        claim()
+
+        assert claim() is None
+
+        JobModel.objects.filter(pk=job.pk).update(lease_expires=timezone.now() - timedelta(seconds=1))
+        claimed = claim()
+
+        assert claimed.pk == job.pk
+        assert claimed.attempts == 2
+
+    def test_heartbeat(self):
+        enqueue('test_sum', values=[])
+        job = claim()
+
+        heartbeat(job, progress={'done': 1})
+        lease_expires = job.lease_expires
+        job.refresh_from_db()
+
+        assert job.progress == {'done': 1}
+        assert job.lease_expires > lease_expires
+
+    def test_finished_job_of_expired_lease_not_overwritten(self):
+        enqueue('test_sum', values=[1])
+        job = claim()
+        JobModel.objects.filter(pk=job.pk).update(lease_expires=timezone.now() - timedelta(seconds=1))
+        claim()
+
+        run_job(job)
+        job.refresh_from_db()
+
+        assert job.status == JobModel.RUNNING
+
+    def test_enqueue_same_key(self):
+        first = enqueue('test_sum', key='sum', values=[])
+        second = enqueue('test_sum', key='sum', values=[])
+
+        assert first.pk == second.pk
+
+        run_job(claim())
+        third = enqueue('test_sum', key='sum', values=[])
+
+        assert third.pk != first.pk
+
+
+class JobsWorkersTest(TransactionTestCase):
+    def test_skip_locked(self):
+        first = enqueue('test_sum', values=[])
+        second = enqueue('test_sum', values=[])
+        locked = threading.Event()
+        release = threading.Event()
+
+        def lock_first() -> None:
+            try:
+                with transaction.atomic():
+                    JobModel.objects.select_for_update().get(pk=first.pk)
+                    locked.set()
+                    release.wait(5)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=lock_first)
+        thread.start()
+        locked.wait(5)
+
+        try:
+            assert claim().pk == second.pk
+        finally:
+            release.set()
+            thread.join()
+
+    def test_run_jobs_concurrency(self):
+        for i in range(10):
+            enqueue('test_sum', values=[i])
+
+        stdout = StringIO()
+        call_command('run_jobs', '--burst', '--concurrency=3', stdout=stdout)
+
+        assert 'Jobs run: 10' in stdout.getvalue()
+        assert set(JobModel.objects.values_list('status', flat=True)) == {JobModel.DONE}
+        assert sorted(JobModel.objects.values_list('result', flat=True)) == list(range(10))
@@ -0,0 +1,53 @@
+"""
+Versioned cache of resources read responses.
+
+Resources of every owner have a version and there is a version of all the resources (used for staff users, who
+see resources of everybody). Versions are part of the cache keys and are replaced on every change of resources,
+so the cached responses are never invalidated explicitly: entries of old versions are just not requested anymore
+and are evicted by the cache backend.
+
+Responses are stored in `RESOURCES_CACHE_ALIAS` cache (local memory bounded by `MAX_ENTRIES` by default),
+versions are stored in `VERSIONS_CACHE_ALIAS` cache shared by all the processes of the app.
+"""
+from __future__ import annotations
+
+import hashlib
+import typing as t
+
+from django.conf import settings
+from django.core.cache import caches
+
+from common.cache import CacheStats, ChangeVersions
+
+
+__all__ = (
+    'get_cache_key',
+    'get_cached',
+    'resources_versions',
+    'response_cache_stats',
+    'set_cached',
+)
+
+
+resources_versions = ChangeVersions('resources')
+
+response_cache_stats = CacheStats()
+
+
+def get_cache_key(*parts: t.Any) -> str:
+    return 'resources:response:' + hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def get_cached(key: str) -> t.Any:
+    data = caches[settings.RESOURCES_CACHE_ALIAS].get(key)
+
+    if data is None:
+        response_cache_stats.miss()
+    else:
+        response_cache_stats.hit()
+
+    return data
+
+
+def set_cached(key: str, data: t.Any) -> None:
+    caches[settings.RESOURCES_CACHE_ALIAS].set(key, data, settings.RESOURCES_CACHE_TIMEOUT)
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import json
+import math
+import statistics
+import time
+import typing as t
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from users.models import UserModel, UserOptionsModel
+
+from ...models import ResourceModel
+
+
+class Rollback(Exception):
+    pass
+
+
+def get_percentile(values: t.Sequence[float], percent: float) -> float:
+    """
+    Percentile of sorted values interpolated between the closest ranks (as `inclusive` method of
+    `statistics.quantiles`, which is missing in Python 3.7)
+    """
+    position = (len(values) - 1) * percent / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class Endpoint(t.NamedTuple):
+    name: str
+    method: str
+    # returns path and data of the i-th request, may create the data the request needs (not measured)
+    prepare: t.Callable[[int], t.Tuple[str, t.Any]]
+    client: str
+    status: int
+
+
+class Command(BaseCommand):
+    help = 'Measures latency, throughput and number of SQL queries of every API endpoint. ' \
+           'Requests go through the whole Django stack in-process. All the data is created inside a transaction ' \
+           'that is rolled back in the end, so requests run inside of it: on_commit callbacks are never run and ' \
+           'all the reads go to the primary database, unlike in production. ' \
+           'Exits with non-zero code if results regressed against the baseline.'
+
+    password = 'pw-7Qz-Lm2-x9K'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--users', type=int, default=1000, help='Number of seeded users')
+        parser.add_argument('--resources', type=int, default=10000,
+                            help='Number of seeded resources, a half of them belongs to the benchmark user')
+        parser.add_argument('--requests', type=int, default=50, help='Number of measured requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=5, help='Number of not measured requests per endpoint')
+        parser.add_argument('--endpoints', nargs='+', help='Names of endpoints to measure, all by default')
+        parser.add_argument('--no-response-cache', action='store_true',
+                            help='Disable resources responses cache, so every read runs the queries')
+        parser.add_argument('--output', help='Path to write results as JSON')
+        parser.add_argument('--baseline', help='Path to JSON results to compare with')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed relative increase of p50 and p95 latency against the baseline')
+
+    def handle(self, *args: t.Any, **options: t.Any) -> None:
+        if options['requests'] < 2:
+            raise CommandError('At least 2 requests per endpoint are required to calculate percentiles')
+
+        results = {}
+
+        try:
+            # requests of the benchmark come from one client, so rate limits would reject most of them
+            with transaction.atomic(), override_settings(
+                    RESOURCES_CACHE_ENABLED=settings.RESOURCES_CACHE_ENABLED and not options['no_response_cache'],
+                    THROTTLING_ENABLED=False):
+                results = self._run(options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+        report = {
+            'params': {key: options[key] for key in ('users', 'resources', 'requests', 'no_response_cache')},
+            'endpoints': results,
+        }
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = self._compare(json.load(baseline), report, options['tolerance'])
+
+            for regression in regressions:
+                self.stderr.write(regression)
+
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+
+    def _seed(self, users: int, resources: int) -> None:
+        self.user = UserModel(email='benchmark-api-user@example.com')
+        self.admin = UserModel(email='benchmark-api-admin@example.com', is_staff=True)
+
+        for user in (self.user, self.admin):
+            user.set_password(self.password)
+            user.save()
+
+        others = UserModel.objects.bulk_create(
+            UserModel(email=f'benchmark-api-{i}@example.com') for i in range(max(users - 2, 1))
+        )
+        owners = [self.user, self.admin, *others]
+
+        UserOptionsModel.objects.bulk_create(UserOptionsModel(user=owner) for owner in owners)
+
+        ResourceModel.objects.bulk_create(
+            (ResourceModel(name=f'seed-{i}', owner=self.user if i % 2 else owners[i % len(owners)])
+             for i in range(resources)),
+            batch_size=5000,
+        )
+
+        # resource counters are used by quota checks and released on deletions
+        call_command('reconcile_resource_counts', stdout=StringIO())
+
+    def _get_client(self, email: str) -> APIClient:
+        client = APIClient()
+        response = client.post('/api/v1/auth/login', {'email': email, 'password': self.password})
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["access"]}')
+        return client
+
+    def _create_resource(self) -> int:
+        return ResourceModel.objects.create(name='benchmark', owner=self.user).pk
+
+    def _create_user(self, i: int) -> int:
+        user = UserModel.objects.create(email=f'benchmark-api-delete-{i}@example.com')
+        return user.pk
+
+    def _get_endpoints(self) -> t.List[Endpoint]:
+        user_id = self.user.pk
+        some_resources = list(ResourceModel.objects.filter(owner=self.user).values_list('pk', flat=True)[:100])
+        some_resource = some_resources[0] if some_resources else None
+
+        def fixed(path: str, data: t.Any = None) -> t.Callable[[int], t.Tuple[str, t.Any]]:
+            return lambda i: (path, data)
+
+        return [
+            Endpoint('auth.register', 'post',
+                     lambda i: ('/api/v1/auth/register',
+                                {'email': f'benchmark-api-register-{i}@example.com', 'password': self.password}),
+                     'anonymous', 201),
+            Endpoint('auth.login', 'post',
+                     fixed('/api/v1/auth/login', {'email': self.user.email, 'password': self.password}),
+                     'anonymous', 201),
+            Endpoint('auth.cache_stats', 'get', fixed('/api/v1/auth/cache-stats'), 'admin', 200),
+            Endpoint('users.me', 'get', fixed('/api/v1/users/me'), 'user', 200),
+            Endpoint('users.me_update', 'patch', fixed('/api/v1/users/me', {'first_name': 'benchmark'}), 'user', 200),
+            Endpoint('users.list', 'get', fixed('/api/v1/users?limit=100'), 'admin', 200),
+            Endpoint('users.list_keyset', 'get', fixed('/api/v1/users?cursor=&limit=100'), 'admin', 200),
+            Endpoint('users.list_usage', 'get',
+                     fixed('/api/v1/users?include=usage&usage_ratio__gte=0.9&ordering=-usage_ratio&limit=100'),
+                     'admin', 200),
+            Endpoint('users.create', 'post',
+                     lambda i: ('/api/v1/users',
+                                {'email': f'benchmark-api-create-{i}@example.com', 'password': self.password}),
+                     'admin', 201),
+            Endpoint('users.bulk_create', 'post',
+                     lambda i: ('/api/v1/users/bulk',
+                                {'users': [
+                                    {'email': f'benchmark-api-bulk-{i}-{j}@example.com', 'password': self.password}
+                                    for j in range(10)
+                                ]}),
+                     'admin', 200),
+            Endpoint('users.retrieve', 'get', fixed(f'/api/v1/users/{user_id}'), 'admin', 200),
+            Endpoint('users.destroy', 'delete', lambda i: (f'/api/v1/users/{self._create_user(i)}', None),
+                     'admin', 202),
+            Endpoint('users.options', 'get', fixed(f'/api/v1/users/{user_id}/options'), 'admin', 200),
+            Endpoint('users.options_update', 'patch', fixed(f'/api/v1/users/{user_id}/options', {'quota': None}),
+                     'admin', 200),
+            Endpoint('resources.create', 'post', fixed('/api/v1/resources', {'name': 'benchmark'}), 'user', 201),
+            Endpoint('resources.list', 'get', fixed('/api/v1/resources?limit=100'), 'user', 200),
+            Endpoint('resources.list_keyset', 'get', fixed('/api/v1/resources?cursor=&limit=100'), 'user', 200),
+            Endpoint('resources.search', 'get', fixed('/api/v1/resources?search=bench&limit=100'), 'user', 200),
+            Endpoint('resources.multi_get', 'get',
+                     fixed('/api/v1/resources?ids=' + ','.join(map(str, some_resources))), 'user', 200),
+            Endpoint('resources.retrieve', 'get', fixed(f'/api/v1/resources/{some_resource}'), 'user', 200),
+            Endpoint('resources.destroy', 'delete', lambda i: (f'/api/v1/resources/{self._create_resource()}', None),
+                     'user', 204),
+            Endpoint('resources.bulk_create', 'post',
+                     fixed('/api/v1/resources/bulk', {'names': ['benchmark'] * 100}), 'user', 201),
+            Endpoint('resources.bulk_destroy', 'delete',
+                     lambda i: (f'/api/v1/resources/bulk?ids={self._create_resource()},{self._create_resource()}',
+                                None),
+                     'user', 200),
+            Endpoint('resources.export', 'get', fixed('/api/v1/resources/export?format=ndjson'), 'user', 200),
+            Endpoint('resources.cache_stats', 'get', fixed('/api/v1/resources/cache-stats'), 'admin', 200),
+            Endpoint('batch', 'post',
+                     fixed('/api/v1/batch', {'requests': [
+                         {'method': 'GET', 'path': '/api/v1/users/me'},
+                         {'method': 'GET', 'path': '/api/v1/resources?limit=100'},
+                         {'method': 'POST', 'path': '/api/v1/resources', 'body': {'name': 'benchmark'}},
+                     ]}),
+                     'user', 200),
+        ]
+
+    def _run(self, options: t.Dict[str, t.Any]) -> t.Dict[str, t.Dict[str, float]]:
+        self._seed(options['users'], options['resources'])
+
+        clients = {
+            'anonymous': APIClient(),
+            'user': self._get_client(self.user.email),
+            'admin': self._get_client(self.admin.email),
+        }
+        endpoints = self._get_endpoints()
+
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - {endpoint.name for endpoint in endpoints}
+
+            if unknown:
+                raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+
+            endpoints = [endpoint for endpoint in endpoints if endpoint.name in options['endpoints']]
+
+        self.stdout.write(f'{"endpoint":<26} {"p50, ms":>9} {"p95, ms":>9} {"p99, ms":>9} {"rps":>9} {"queries":>8}')
+
+        results = {}
+
+        for endpoint in endpoints:
+            results[endpoint.name] = result = self._measure(endpoint, clients[endpoint.client],
+                                                            options['warmup'], options['requests'])
+            self.stdout.write(
+                f'{endpoint.name:<26} '
+                f'{result["p50"]:>9.3f} {result["p95"]:>9.3f} {result["p99"]:>9.3f} '
+                f'{result["rps"]:>9.1f} {result["queries"]:>8.1f}'
+            )
+
+        return results
+
+    def _measure(self, endpoint: Endpoint, client: APIClient, warmup: int, requests: int) -> t.Dict[str, float]:
+        timings = []
+        queries = 0
+
+        for i in range(warmup + requests):
+            path, data = endpoint.prepare(i)
+
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = getattr(client, endpoint.method)(path, data, format='json')
+
+                if response.streaming:
+                    b''.join(response.streaming_content)
+
+                elapsed = time.perf_counter() - started
+
+            if response.status_code != endpoint.status:
+                raise CommandError(f'{endpoint.name}: unexpected response {response.status_code} {response.content!r}')
+
+            if i >= warmup:
+                timings.append(elapsed * 1000)
+                queries += len(captured)
+
+        timings.sort()
+
+        return {
+            'p50': get_percentile(timings, 50),
+            'p95': get_percentile(timings, 95),
+            'p99': get_percentile(timings, 99),
+            'mean': statistics.mean(timings),
+            # requests are made one by one, so it is the throughput of a single worker
+            'rps': len(timings) / (sum(timings) / 1000),
+            'queries': queries / len(timings),
+        }
+
+    def _compare(self, baseline: t.Dict[str, t.Any], report: t.Dict[str, t.Any], tolerance: float) -> t.List[str]:
+        regressions = []
+
+        if baseline['params'] != report['params']:
+            self.stderr.write(f'Baseline was measured with different params: {baseline["params"]}')
+
+        for name, result in report['endpoints'].items():
+            expected = baseline['endpoints'].get(name)
+
+            if expected is None:
+                continue
+
+            for metric in ('p50', 'p95'):
+                if result[metric] > expected[metric] * (1 + tolerance):
+                    regressions.append(f'{name}: {metric} {result[metric]:.3f} ms > {expected[metric]:.3f} ms')
+
+            # number of queries does not depend on the environment, so any increase is a regression
+            if result['queries'] > expected['queries']:
+                regressions.append(f'{name}: queries {result["queries"]:.1f} > {expected["queries"]:.1f}')
+
+        return regressions
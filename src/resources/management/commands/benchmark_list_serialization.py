@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import statistics
+import time
+import typing as t
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.status import HTTP_200_OK
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.viewsets import GenericViewSet
+
+from users.models import UserModel, UserOptionsModel
+from users.views import UsersView
+
+from ...models import ResourceModel
+from ...views import ResourcesView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compares latency of resources and users lists rendered via serializers and via values_list() fast path. ' \
+           'All the data is created inside a transaction that is rolled back in the end.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--rows', type=int, default=1000, help='Number of rows in every list')
+        parser.add_argument('--requests', type=int, default=50, help='Number of measured requests per path')
+
+    def handle(self, *args: t.Any, rows: int, requests: int, **options: t.Any) -> None:
+        try:
+            with transaction.atomic(), override_settings(RESOURCES_CACHE_ENABLED=False):
+                self._run(rows, requests)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _run(self, rows: int, requests: int) -> None:
+        admin = UserModel.objects.create(email='benchmark-list-serialization@example.com', is_staff=True)
+        UserOptionsModel.objects.create(user=admin)
+
+        ResourceModel.objects.bulk_create(
+            (ResourceModel(name=f'seed-{i}', owner=admin) for i in range(rows)),
+            batch_size=5000,
+        )
+        UserModel.objects.bulk_create(
+            (UserModel(email=f'benchmark-list-serialization-{i}@example.com') for i in range(rows - 1)),
+            batch_size=5000,
+        )
+
+        self.stdout.write(f'{"list":>10} {"path":>12} {"p50, ms":>10} {"p95, ms":>10} {"speedup":>10}')
+
+        for name, view_class, url in (('resources', ResourcesView, '/api/v1/resources'),
+                                      ('users', UsersView, '/api/v1/users')):
+            serializer_p50 = None
+
+            for path, values_list in (('serializer', False), ('values_list', True)):
+                with patch.object(view_class, 'values_list', values_list):
+                    timings = self._measure(view_class, url, admin, requests)
+
+                p50 = statistics.median(timings)
+                serializer_p50 = serializer_p50 or p50
+
+                self.stdout.write(
+                    f'{name:>10} {path:>12} '
+                    f'{p50:>10.3f} '
+                    f'{timings[int(len(timings) * 0.95) - 1]:>10.3f} '
+                    f'{serializer_p50 / p50:>9.2f}x'
+                )
+
+    def _measure(self, view_class: t.Type[GenericViewSet], url: str, user: UserModel,
+                 requests: int) -> t.List[float]:
+        factory = APIRequestFactory()
+        view = view_class.as_view({'get': 'list'})
+        timings = []
+
+        for _ in range(requests):
+            request = factory.get(url)
+            force_authenticate(request, user=user)
+
+            started = time.perf_counter()
+            response = view(request).render()
+            timings.append((time.perf_counter() - started) * 1000)
+
+            assert response.status_code == HTTP_200_OK, response.data
+
+        return sorted(timings)
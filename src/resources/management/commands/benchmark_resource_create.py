@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import statistics
+import time
+import typing as t
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+from rest_framework.status import HTTP_201_CREATED
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from users.models import UserModel, UserOptionsModel
+
+from ...models import ResourceModel
+from ...views import ResourcesView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measures resource creation latency depending on number of resources the owner already has. ' \
+           'All the data is created inside a transaction that is rolled back in the end.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--sizes', type=int, nargs='+', default=[0, 1000, 10000, 100000],
+                            help='Numbers of pre-existing resources of the owner')
+        parser.add_argument('--requests', type=int, default=200, help='Number of measured creations per size')
+
+    def handle(self, *args: t.Any, sizes: t.List[int], requests: int, **options: t.Any) -> None:
+        try:
+            with transaction.atomic():
+                self._run(sorted(sizes), requests)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _run(self, sizes: t.List[int], requests: int) -> None:
+        user = UserModel.objects.create(email='benchmark-resource-create@example.com')
+        UserOptionsModel.objects.create(user=user)
+
+        factory = APIRequestFactory()
+        view = ResourcesView.as_view({'post': 'create'})
+        existing = 0
+
+        self.stdout.write(f'{"resources":>10} {"p50, ms":>10} {"p95, ms":>10} {"max, ms":>10}')
+
+        for size in sizes:
+            ResourceModel.objects.bulk_create(
+                (ResourceModel(name=f'seed-{i}', owner=user) for i in range(existing, size)),
+                batch_size=5000,
+            )
+            UserOptionsModel.objects.filter(user=user).update(resource_count=size)
+            existing = size
+
+            timings = []
+            for _ in range(requests):
+                request = factory.post('/api/v1/resources', {'name': 'benchmark'}, format='json')
+                force_authenticate(request, user=user)
+
+                started = time.perf_counter()
+                response = view(request)
+                timings.append((time.perf_counter() - started) * 1000)
+
+                assert response.status_code == HTTP_201_CREATED, response.data
+
+            # measured creations must not affect the next size
+            ResourceModel.objects.filter(owner=user, name='benchmark').delete()
+            UserOptionsModel.objects.filter(user=user).update(resource_count=size)
+
+            timings.sort()
+            self.stdout.write(
+                f'{size:>10} '
+                f'{statistics.median(timings):>10.3f} '
+                f'{timings[int(len(timings) * 0.95) - 1]:>10.3f} '
+                f'{timings[-1]:>10.3f}'
+            )
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import typing as t
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+from django.db.models import (
+    Count,
+    OuterRef,
+    Subquery,
+)
+from django.db.models.functions import Coalesce
+
+from users.models import UserOptionsModel
+
+from ...models import ResourceModel
+
+
+class Command(BaseCommand):
+    help = 'Repairs drift between UserOptionsModel.resource_count and the actual number of user\'s resources'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of options rows locked at once')
+        parser.add_argument('--dry-run', action='store_true', help='Only report drifted rows')
+
+    def handle(self, *args: t.Any, batch_size: int, dry_run: bool, **options: t.Any) -> None:
+        actual_count = ResourceModel.objects.filter(owner_id=OuterRef('user_id')) \
+            .order_by() \
+            .values('owner_id') \
+            .annotate(count=Count('id')) \
+            .values('count')
+
+        last_pk = 0
+        repaired = 0
+
+        while True:
+            with transaction.atomic():
+                # options rows are locked, so no resource can be created or deleted for the batch meanwhile
+                batch = UserOptionsModel.objects.filter(pk__gt=last_pk) \
+                    .order_by('pk') \
+                    .select_for_update() \
+                    .annotate(actual_count=Coalesce(Subquery(actual_count), 0)) \
+                    .values_list('pk', 'user_id', 'resource_count', 'actual_count')[:batch_size]
+
+                batch = list(batch)
+
+                if not batch:
+                    break
+
+                for pk, user_id, resource_count, actual in batch:
+                    if resource_count == actual:
+                        continue
+
+                    repaired += 1
+                    self.stdout.write(f'user {user_id}: resource_count {resource_count} -> {actual}')
+
+                    if not dry_run:
+                        UserOptionsModel.objects.filter(pk=pk).update(resource_count=actual)
+
+                last_pk = batch[-1][0]
+
+        self.stdout.write(self.style.SUCCESS(f'Drifted rows {"found" if dry_run else "repaired"}: {repaired}'))
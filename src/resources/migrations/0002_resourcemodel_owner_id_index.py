@@ -0,0 +1,27 @@
+# Generated by Django 2.2.6 on 2026-10-18 10:36
+
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0001_initial'),
+    ]
+
+    operations = [
+        # composite index is created before dropping the single column one, so filtering by owner is never unindexed
+        migrations.AddIndex(
+            model_name='resourcemodel',
+            index=models.Index(fields=['owner', 'id'], name='resources_owner_id_id_idx'),
+        ),
+        migrations.AlterField(
+            model_name='resourcemodel',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='resources', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # expression indexes are not supported by Django models, the expression is the one of ResourcesView.search
+    atomic = False
+
+    dependencies = [
+        ('resources', '0002_resourcemodel_owner_id_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # GiST rather than GIN: besides LIKE it serves ordering by trigram distance, so a page of ranked
+        # results is read from the index without ranking every match
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS resources_name_trgm_idx ON resources_resourcemodel '
+            'USING gist (UPPER(name) gist_trgm_ops)',
+            'DROP INDEX CONCURRENTLY IF EXISTS resources_name_trgm_idx',
+        ),
+    ]
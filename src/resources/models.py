@@ -17,4 +17,11 @@ __all__ = (
 
 class ResourceModel(models.Model):
     name = models.CharField(max_length=100, blank=False, null=False)
-    owner = models.ForeignKey(UserModel, editable=False, null=False, on_delete=models.PROTECT, related_name='resources')
+    owner = models.ForeignKey(UserModel, editable=False, null=False, on_delete=models.PROTECT, related_name='resources',
+                              db_index=False)
+
+    class Meta:
+        indexes = (
+            # serves filtering by owner as well as keyset pagination ordered by (owner_id, id)
+            models.Index(fields=('owner', 'id'), name='resources_owner_id_id_idx'),
+        )
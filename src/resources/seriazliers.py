@@ -1,38 +1,51 @@
 from __future__ import annotations
 
+import time
 import typing as t
 
+from django.conf import settings
 from django.db import transaction
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
 
+from common.fields import CommaSeparatedListField
+from users.metrics import quota_lock_wait_seconds
 from users.models import UserModel, UserOptionsModel
 
 from .models import ResourceModel
 
+from resources_api.db.replicas import use_primary
+
 
 __all__ = (
+    'BulkCreateResourceSerializer',
+    'BulkDestroyResourceSerializer',
     'CreateResourceSerializer',
     'DetailResourceSerializer',
+    'MultiGetResourceSerializer',
     'ResourceQuotaExceeded',
 )
 
 
+MAX_BULK_CREATE_SIZE = 1000
+MAX_BULK_DESTROY_IDS = 1000
+
+
 class ResourceQuotaExceeded(Exception):
     def __init__(self, quota: int) -> None:
         self.quota = quota
 
 
-class CreateResourceSerializer(serializers.ModelSerializer):
+class BaseOwnerSerializer(serializers.Serializer):
+    """
+    Provides `owner_id` field that can be set only by staff users and reserves resources within owner's quota.
+    """
     owner_id = serializers.PrimaryKeyRelatedField(
         source='owner',
         queryset=UserModel.objects.all(),
         default=serializers.CreateOnlyDefault(serializers.CurrentUserDefault()),
     )
 
-    class Meta:
-        model = ResourceModel
-        fields = ('pk', 'name', 'owner_id',)
-
     def _get_request_user(self) -> UserModel:
         return self.context["request"].user
 
@@ -44,18 +57,87 @@ class CreateResourceSerializer(serializers.ModelSerializer):
 
         return owner
 
+    def _acquire_resources(self, owner: UserModel, count: int = 1) -> None:
+        # quota and counter are never read from a lagging replica
+        with use_primary():
+            started = time.perf_counter()
+            acquired = UserOptionsModel.objects.acquire_resources(owner.id, count)
+            quota_lock_wait_seconds.observe(time.perf_counter() - started, operation='acquire')
+
+            if not acquired:
+                quota = UserOptionsModel.objects.values_list('quota', flat=True).get(user_id=owner.id)
+                raise ResourceQuotaExceeded(quota)
+
+
+class CreateResourceSerializer(BaseOwnerSerializer, serializers.ModelSerializer):
+    class Meta:
+        model = ResourceModel
+        fields = ('pk', 'name', 'owner_id',)
+
     @transaction.atomic()
     def create(self, validated_data: t.Dict[str, t.Any]) -> ResourceModel:
+        self._acquire_resources(validated_data['owner'])
+
+        return super().create(validated_data)
+
+
+class BulkCreateResourceSerializer(BaseOwnerSerializer):
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        allow_empty=False,
+        max_length=MAX_BULK_CREATE_SIZE,
+        write_only=True,
+    )
+    pks = serializers.ListField(child=serializers.IntegerField(), read_only=True)
+
+    @transaction.atomic()
+    def create(self, validated_data: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
         owner = validated_data['owner']
-        options = UserOptionsModel.objects.filter(user_id=owner.id).select_for_update().get()
+        names = validated_data['names']
 
-        if options.quota is not None and owner.resources.count() >= options.quota:
-            raise ResourceQuotaExceeded(options.quota)
+        # quota is checked once for the whole batch, so either all resources are created or none
+        self._acquire_resources(owner, len(names))
+
+        resources = ResourceModel.objects.bulk_create([ResourceModel(name=name, owner=owner) for name in names])
+
+        return {'owner': owner, 'pks': [resource.pk for resource in resources]}
+
+    def update(self, instance: t.Any, validated_data: t.Dict[str, t.Any]) -> None:
+        raise NotImplementedError()
 
-        return super().create(validated_data)
+
+class BulkDestroyResourceSerializer(serializers.Serializer):
+    ids = CommaSeparatedListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=MAX_BULK_DESTROY_IDS,
+        write_only=True,
+    )
+    deleted = serializers.IntegerField(read_only=True)
 
 
 class DetailResourceSerializer(serializers.ModelSerializer):
     class Meta:
         model = ResourceModel
         fields = ('pk', 'name', 'owner_id',)
+
+
+class MultiGetResourceSerializer(serializers.Serializer):
+    ids = CommaSeparatedListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        write_only=True,
+    )
+    results = DetailResourceSerializer(many=True, read_only=True)
+    # ids of resources that do not exist or are not available to the user, as retrieve does not tell them apart
+    missing = serializers.ListField(child=serializers.IntegerField(), read_only=True)
+
+    def validate_ids(self, ids: t.List[int]) -> t.List[int]:
+        max_ids = settings.RESOURCES_MULTI_GET_MAX_IDS
+
+        if len(ids) > max_ids:
+            raise ValidationError(f'Ensure this field has no more than {max_ids} elements.')
+
+        # order of the first occurrences
+        return list(dict.fromkeys(ids))
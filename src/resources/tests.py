@@ -1,16 +1,43 @@
 from __future__ import annotations
 
+import csv
+import gzip
+import json
+import tempfile
+import typing as t
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
 from rest_framework.status import (
     HTTP_200_OK,
     HTTP_201_CREATED,
     HTTP_204_NO_CONTENT,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_400_BAD_REQUEST,
     HTTP_403_FORBIDDEN,
+    HTTP_404_NOT_FOUND,
 )
-from rest_framework.test import APITestCase
-
-from common.test_utils import UsersTestMixin, get_random_string
+from rest_framework.test import APIClient, APITestCase
+
+from common.query_budget import QueryBudgetExceeded
+from common.test_utils import (
+    UsersTestMixin,
+    get_action_queries,
+    get_random_string,
+    run_in_process,
+)
+from users.models import UserOptionsModel
 
+from .cache import resources_versions
+from .management.commands.benchmark_api import get_percentile
 from .models import ResourceModel
+from .seriazliers import DetailResourceSerializer
+from .views import ResourcesView
 
 
 class ResourcesEndpointsTest(UsersTestMixin, APITestCase):
@@ -24,6 +51,7 @@ class ResourcesEndpointsTest(UsersTestMixin, APITestCase):
 
         assert response.status_code == HTTP_201_CREATED
         assert expected.items() <= actual.items()
+        assert get_action_queries(response) == 2
 
     def test_resources_create_for_another_user__user(self):
         name = get_random_string()
@@ -58,6 +86,7 @@ class ResourcesEndpointsTest(UsersTestMixin, APITestCase):
         assert response.status_code == HTTP_200_OK
         assert len(response.json()) == 1
         assert response.json()[0]['name'] == user_resource.name
+        assert get_action_queries(response) == 2
 
     def test_resources_delete__user(self):
         user_resource = ResourceModel.objects.create(name=get_random_string(), owner=self.user)
@@ -66,6 +95,7 @@ class ResourcesEndpointsTest(UsersTestMixin, APITestCase):
 
         assert response.status_code == HTTP_204_NO_CONTENT
         assert not ResourceModel.objects.filter(pk=user_resource.id).exists()
+        assert get_action_queries(response) == 3
 
     def test_resources_create_admin(self):
         name = get_random_string()
@@ -129,3 +159,655 @@ class ResourcesEndpointsTest(UsersTestMixin, APITestCase):
 
         assert response.status_code == HTTP_204_NO_CONTENT
         assert not ResourceModel.objects.filter(pk=user_resource.id).exists()
+
+
+class ResourceCountTest(UsersTestMixin, APITestCase):
+    def get_resource_count(self) -> int:
+        return UserOptionsModel.objects.get(user=self.user).resource_count
+
+    def test_resource_count_incremented_on_create(self):
+        self.user_client.post('/api/v1/resources', {'name': get_random_string()})
+        self.admin_client.post('/api/v1/resources', {'name': get_random_string(), 'owner_id': self.user.id})
+
+        assert self.get_resource_count() == 2
+
+    def test_resource_count_decremented_on_delete(self):
+        response = self.user_client.post('/api/v1/resources', {'name': get_random_string()})
+
+        self.user_client.delete(f'/api/v1/resources/{response.json()["pk"]}')
+
+        assert self.get_resource_count() == 0
+
+    def test_resource_count_not_decremented_on_delete_of_deleted(self):
+        self.user_client.post('/api/v1/resources', {'name': get_random_string()})
+        response = self.user_client.post('/api/v1/resources', {'name': get_random_string()})
+        # the resource is loaded by a concurrent request before it is deleted
+        resource = ResourceModel.objects.get(pk=response.json()['pk'])
+        self.user_client.delete(f'/api/v1/resources/{resource.pk}')
+
+        with patch.object(ResourcesView, 'get_object', return_value=resource):
+            response = self.user_client.delete(f'/api/v1/resources/{resource.pk}')
+
+        assert response.status_code == HTTP_204_NO_CONTENT
+        assert self.get_resource_count() == 1
+
+    def test_quota_checked_against_resource_count(self):
+        UserOptionsModel.objects.filter(user=self.user).update(quota=2, resource_count=2)
+
+        response = self.user_client.post('/api/v1/resources', {'name': get_random_string()})
+
+        assert response.status_code == HTTP_403_FORBIDDEN
+        assert self.get_resource_count() == 2
+
+    def test_create_does_not_count_resources(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.user_client.post('/api/v1/resources', {'name': get_random_string()})
+
+        assert response.status_code == HTTP_201_CREATED
+        assert not [q for q in queries if 'COUNT(' in q['sql']]
+
+    def test_reconcile_resource_counts(self):
+        ResourceModel.objects.bulk_create([ResourceModel(name=get_random_string(), owner=self.user) for _ in range(3)])
+        UserOptionsModel.objects.filter(user=self.admin).update(resource_count=5)
+
+        call_command('reconcile_resource_counts', batch_size=1, stdout=StringIO())
+
+        assert self.get_resource_count() == 3
+        assert UserOptionsModel.objects.get(user=self.admin).resource_count == 0
+
+
+class ResourcesBulkCreateTest(UsersTestMixin, APITestCase):
+    def test_bulk_create__user(self):
+        names = [get_random_string() for _ in range(3)]
+
+        response = self.user_client.post('/api/v1/resources/bulk', {'names': names, 'owner_id': self.admin.id},
+                                         format='json')
+
+        pks = response.json()['pks']
+
+        assert response.status_code == HTTP_201_CREATED
+        assert response.json()['owner_id'] == self.user.id
+        assert [ResourceModel.objects.get(pk=pk).name for pk in pks] == names
+        assert UserOptionsModel.objects.get(user=self.user).resource_count == 3
+
+    def test_bulk_create_for_another_user__admin(self):
+        response = self.admin_client.post('/api/v1/resources/bulk',
+                                          {'names': [get_random_string()], 'owner_id': self.user.id},
+                                          format='json')
+
+        assert response.status_code == HTTP_201_CREATED
+        assert ResourceModel.objects.filter(owner=self.user, pk__in=response.json()['pks']).count() == 1
+
+    def test_bulk_create_when_quota_exceeded__user(self):
+        UserOptionsModel.objects.filter(user=self.user).update(quota=2)
+
+        response = self.user_client.post('/api/v1/resources/bulk', {'names': ['a', 'b', 'c']}, format='json')
+
+        assert response.status_code == HTTP_403_FORBIDDEN
+        assert not ResourceModel.objects.filter(owner=self.user).exists()
+        assert UserOptionsModel.objects.get(user=self.user).resource_count == 0
+
+    def test_bulk_create_empty__user(self):
+        response = self.user_client.post('/api/v1/resources/bulk', {'names': []}, format='json')
+
+        assert response.status_code == HTTP_400_BAD_REQUEST
+
+
+class ResourcesKeysetPaginationTest(UsersTestMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        ResourceModel.objects.bulk_create([
+            ResourceModel(name=get_random_string(), owner=owner)
+            for owner in (self.user, self.admin) for _ in range(5)
+        ])
+
+    def get_all_pages(self, client: APIClient, url: str) -> t.List[t.List[t.Dict[str, t.Any]]]:
+        pages = []
+
+        while url:
+            response = client.get(url)
+
+            assert response.status_code == HTTP_200_OK
+
+            pages.append(response.json()['results'])
+            url = response.json()['next']
+
+        return pages
+
+    def test_keyset_pagination__admin(self):
+        pages = self.get_all_pages(self.admin_client, '/api/v1/resources?cursor=&limit=3')
+
+        expected = list(ResourceModel.objects.order_by('owner_id', 'id').values_list('pk', flat=True))
+        actual = [resource['pk'] for page in pages for resource in page]
+
+        assert [len(page) for page in pages] == [3, 3, 3, 1]
+        assert actual == expected
+
+    def test_keyset_pagination_filtered_by_owner__admin(self):
+        pages = self.get_all_pages(self.admin_client, f'/api/v1/resources?cursor=&limit=2&owner_id={self.user.id}')
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert all(resource['owner_id'] == self.user.id for page in pages for resource in page)
+
+    def test_keyset_pagination_only_owned__user(self):
+        pages = self.get_all_pages(self.user_client, '/api/v1/resources?cursor=&limit=4')
+
+        assert [len(page) for page in pages] == [4, 1]
+        assert all(resource['owner_id'] == self.user.id for page in pages for resource in page)
+
+    def test_keyset_pagination_page_cost_does_not_depend_on_position__admin(self):
+        with CaptureQueriesContext(connection) as first_page_queries:
+            response = self.admin_client.get('/api/v1/resources?cursor=&limit=2')
+
+        for _ in range(3):
+            next_url = response.json()['next']
+            with CaptureQueriesContext(connection) as last_page_queries:
+                response = self.admin_client.get(next_url)
+
+        first_page_resources_queries = [q['sql'] for q in first_page_queries if 'resources_resourcemodel' in q['sql']]
+        resources_queries = [q['sql'] for q in last_page_queries if 'resources_resourcemodel' in q['sql']]
+
+        assert len(first_page_resources_queries) == 1
+        assert len(resources_queries) == 1
+        assert 'COUNT(' not in resources_queries[0]
+        assert 'OFFSET' not in resources_queries[0]
+
+    def test_keyset_pagination_invalid_cursor__user(self):
+        response = self.user_client.get('/api/v1/resources?cursor=invalid')
+
+        assert response.status_code == HTTP_404_NOT_FOUND
+
+
+class ResourcesMultiGetTest(UsersTestMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.own = [ResourceModel.objects.create(name=f'own-{i}', owner=self.user) for i in range(3)]
+        self.other = ResourceModel.objects.create(name='other', owner=self.admin)
+
+    def as_dict(self, resource: ResourceModel) -> t.Dict[str, t.Any]:
+        return {'pk': resource.pk, 'name': resource.name, 'owner_id': resource.owner_id}
+
+    def test_multi_get__user(self):
+        missing_id = self.other.pk + 1000
+        ids = [self.own[2].pk, self.other.pk, self.own[0].pk, missing_id, self.own[2].pk]
+
+        response = self.user_client.get(f'/api/v1/resources?ids={",".join(map(str, ids))}')
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json() == {
+            'results': [self.as_dict(self.own[2]), self.as_dict(self.own[0])],
+            'missing': [self.other.pk, missing_id],
+        }
+        assert get_action_queries(response) == 1
+
+    def test_multi_get__admin(self):
+        response = self.admin_client.get(f'/api/v1/resources?ids={self.own[1].pk},{self.other.pk}')
+
+        assert response.json() == {'results': [self.as_dict(self.own[1]), self.as_dict(self.other)], 'missing': []}
+
+    def test_multi_get_filtered_by_owner__admin(self):
+        response = self.admin_client.get(f'/api/v1/resources?ids={self.own[1].pk},{self.other.pk}'
+                                         f'&owner_id={self.admin.id}')
+
+        assert response.json() == {'results': [self.as_dict(self.other)], 'missing': [self.own[1].pk]}
+
+    def test_multi_get_post__user(self):
+        ids = [resource.pk for resource in self.own]
+
+        response = self.user_client.post('/api/v1/resources/multi-get', {'ids': ids}, format='json')
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json() == {'results': [self.as_dict(resource) for resource in self.own], 'missing': []}
+        assert get_action_queries(response) == 1
+
+    @override_settings(RESOURCES_MULTI_GET_MAX_IDS=2)
+    def test_multi_get_too_many_ids__user(self):
+        response = self.user_client.get('/api/v1/resources?ids=1,2,3')
+
+        assert response.status_code == HTTP_400_BAD_REQUEST
+        assert response.json() == {'ids': ['Ensure this field has no more than 2 elements.']}
+
+    def test_multi_get_invalid_ids__user(self):
+        for query in ('ids=', 'ids=a', 'ids=0'):
+            response = self.user_client.get(f'/api/v1/resources?{query}')
+
+            assert response.status_code == HTTP_400_BAD_REQUEST, query
+
+    def test_multi_get_not_modified__user(self):
+        url = f'/api/v1/resources?ids={self.own[0].pk}'
+        etag = self.user_client.get(url)['ETag']
+
+        assert self.user_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == HTTP_304_NOT_MODIFIED
+        assert self.user_client.get('/api/v1/resources')['ETag'] != etag
+
+
+class ResourcesBulkDestroyTest(UsersTestMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        for owner, client in ((self.user, self.user_client), (self.admin, self.admin_client)):
+            client.post('/api/v1/resources/bulk', {'names': ['a', 'b', 'c'], 'owner_id': owner.id}, format='json')
+
+        self.user_resources = list(ResourceModel.objects.filter(owner=self.user).values_list('pk', flat=True))
+        self.admin_resources = list(ResourceModel.objects.filter(owner=self.admin).values_list('pk', flat=True))
+
+    def test_bulk_destroy_by_ids__user(self):
+        ids = ','.join(map(str, self.user_resources[:2] + self.admin_resources))
+
+        response = self.user_client.delete(f'/api/v1/resources/bulk?ids={ids}')
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json() == {'deleted': 2}
+        assert list(ResourceModel.objects.filter(owner=self.user).values_list('pk', flat=True)) == \
+            self.user_resources[2:]
+        assert ResourceModel.objects.filter(owner=self.admin).count() == 3
+        assert UserOptionsModel.objects.get(user=self.user).resource_count == 1
+
+    def test_bulk_destroy_by_filter__user(self):
+        response = self.user_client.delete(f'/api/v1/resources/bulk?owner_id={self.admin.id}')
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json() == {'deleted': 0}
+        assert ResourceModel.objects.count() == 6
+
+    def test_bulk_destroy_without_ids_and_filters__user(self):
+        response = self.user_client.delete('/api/v1/resources/bulk')
+
+        assert response.status_code == HTTP_400_BAD_REQUEST
+        assert ResourceModel.objects.count() == 6
+
+    def test_bulk_destroy_by_empty_filter(self):
+        for client in (self.user_client, self.admin_client):
+            response = client.delete('/api/v1/resources/bulk?owner_id=')
+
+            assert response.status_code == HTTP_400_BAD_REQUEST
+
+        assert ResourceModel.objects.count() == 6
+
+    def test_bulk_destroy_by_filter__admin(self):
+        with patch.object(ResourcesView, 'bulk_destroy_batch_size', 2):
+            response = self.admin_client.delete(f'/api/v1/resources/bulk?owner_id={self.user.id}')
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json() == {'deleted': 3}
+        assert not ResourceModel.objects.filter(owner=self.user).exists()
+        assert ResourceModel.objects.filter(owner=self.admin).count() == 3
+        assert UserOptionsModel.objects.get(user=self.user).resource_count == 0
+        assert UserOptionsModel.objects.get(user=self.admin).resource_count == 3
+
+    def test_bulk_destroy_by_ids__admin(self):
+        ids = ','.join(map(str, self.user_resources[:1] + self.admin_resources[:1]))
+
+        response = self.admin_client.delete(f'/api/v1/resources/bulk?ids={ids}')
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json() == {'deleted': 2}
+        assert UserOptionsModel.objects.get(user=self.user).resource_count == 2
+        assert UserOptionsModel.objects.get(user=self.admin).resource_count == 2
+
+
+class ResourcesExportTest(UsersTestMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        ResourceModel.objects.bulk_create([
+            ResourceModel(name=get_random_string(), owner=owner)
+            for owner in (self.user, self.admin) for _ in range(5)
+        ])
+
+    def get_expected(self, **filters: t.Any) -> t.List[t.Dict[str, t.Any]]:
+        return [
+            {'pk': pk, 'name': name, 'owner_id': owner_id}
+            for pk, name, owner_id in ResourceModel.objects.filter(**filters).order_by('pk')
+                .values_list('pk', 'name', 'owner_id')
+        ]
+
+    def test_export_ndjson_only_owned__user(self):
+        with patch.object(ResourcesView, 'export_chunk_size', 2):
+            response = self.user_client.get('/api/v1/resources/export?format=ndjson')
+            content = b''.join(response.streaming_content).decode()
+
+        assert response.status_code == HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson; charset=utf-8'
+        assert [json.loads(line) for line in content.splitlines()] == self.get_expected(owner=self.user)
+
+    def test_export_csv_filtered_by_owner__admin(self):
+        response = self.admin_client.get(f'/api/v1/resources/export?format=csv&owner_id={self.user.id}')
+        content = b''.join(response.streaming_content).decode()
+
+        expected = [{key: str(value) for key, value in row.items()} for row in self.get_expected(owner=self.user)]
+
+        assert response.status_code == HTTP_200_OK
+        assert response['Content-Type'] == 'text/csv; charset=utf-8'
+        assert list(csv.DictReader(StringIO(content))) == expected
+
+    def test_export_gzip__admin(self):
+        response = self.admin_client.get('/api/v1/resources/export?format=ndjson', HTTP_ACCEPT_ENCODING='gzip')
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+
+        assert response.status_code == HTTP_200_OK
+        assert response['Content-Encoding'] == 'gzip'
+        assert [json.loads(line) for line in content.splitlines()] == self.get_expected()
+
+    def test_export_unknown_format__user(self):
+        response = self.user_client.get('/api/v1/resources/export?format=xml')
+
+        assert response.status_code == HTTP_404_NOT_FOUND
+
+
+class ResourcesSearchTest(UsersTestMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.names = {}
+
+        for owner, name in ((self.user, 'Backup server'), (self.user, 'backup'), (self.user, 'Mail server'),
+                            (self.admin, 'Offsite backups')):
+            self.names[name] = ResourceModel.objects.create(name=name, owner=owner).pk
+
+    def search(self, client: APIClient, query: str) -> t.List[str]:
+        response = client.get(f'/api/v1/resources?{query}')
+
+        assert response.status_code == HTTP_200_OK
+
+        return [resource['name'] for resource in response.json()]
+
+    def test_search_ranked_by_similarity__user(self):
+        response = self.user_client.get('/api/v1/resources?search=BACKUP')
+
+        assert [resource['name'] for resource in response.json()] == ['backup', 'Backup server']
+        assert get_action_queries(response) == 2
+
+    def test_search_substring__admin(self):
+        assert self.search(self.admin_client, 'search=ckup') == ['backup', 'Backup server', 'Offsite backups']
+        assert self.search(self.admin_client, 'search=server') == ['Mail server', 'Backup server']
+
+    def test_search_filtered_by_owner__admin(self):
+        assert self.search(self.admin_client, f'search=backup&owner_id={self.admin.id}') == ['Offsite backups']
+
+    def test_search_escapes_wildcards__user(self):
+        assert self.search(self.user_client, 'search=%25%25%25') == []
+
+    @override_settings(RESOURCES_SEARCH_MAX_RESULTS=1)
+    def test_search_max_results__admin(self):
+        response = self.admin_client.get('/api/v1/resources?search=backup&limit=10')
+
+        assert response.json()['count'] == 1
+        assert [resource['name'] for resource in response.json()['results']] == ['backup']
+
+    def test_search_too_short__user(self):
+        response = self.user_client.get('/api/v1/resources?search=%20ba%20')
+
+        assert response.status_code == HTTP_400_BAD_REQUEST
+        assert 'search' in response.json()
+
+    def test_search_in_cursor_mode__user(self):
+        response = self.user_client.get('/api/v1/resources?search=backup&cursor=')
+
+        assert response.status_code == HTTP_400_BAD_REQUEST
+
+
+class ResourcesCacheTest(UsersTestMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.resource = ResourceModel.objects.create(name=get_random_string(), owner=self.user)
+
+    def get_resources_queries(self, client: APIClient, url: str) -> t.List[str]:
+        with CaptureQueriesContext(connection) as queries:
+            assert client.get(url).status_code == HTTP_200_OK
+
+        return [q['sql'] for q in queries if 'resources_resourcemodel' in q['sql']]
+
+    def test_list_cached__user(self):
+        assert self.get_resources_queries(self.user_client, '/api/v1/resources')
+        assert not self.get_resources_queries(self.user_client, '/api/v1/resources')
+
+    def test_retrieve_cached__user(self):
+        url = f'/api/v1/resources/{self.resource.pk}'
+
+        assert self.get_resources_queries(self.user_client, url)
+        assert not self.get_resources_queries(self.user_client, url)
+
+    def test_query_params_are_part_of_key__admin(self):
+        self.admin_client.get('/api/v1/resources')
+
+        response = self.admin_client.get(f'/api/v1/resources?owner_id={self.admin.id}')
+
+        assert response.json() == []
+
+    def test_users_do_not_share_entries(self):
+        self.admin_client.get('/api/v1/resources')
+        other_client = self.get_authorized_client(self.admin_email, self.admin_password)
+        self.user_client.get('/api/v1/resources')
+
+        assert len(self.user_client.get('/api/v1/resources').json()) == 1
+        assert len(other_client.get('/api/v1/resources').json()) == 1
+
+        ResourceModel.objects.create(name=get_random_string(), owner=self.admin)
+
+        assert len(self.user_client.get('/api/v1/resources').json()) == 1
+
+    def test_create_bumps_version__user(self):
+        self.user_client.get('/api/v1/resources')
+
+        self.user_client.post('/api/v1/resources', {'name': get_random_string()})
+
+        assert len(self.user_client.get('/api/v1/resources').json()) == 2
+
+    def test_create_bumps_version_of_all_resources__admin(self):
+        self.admin_client.get('/api/v1/resources')
+
+        self.user_client.post('/api/v1/resources', {'name': get_random_string()})
+
+        assert len(self.admin_client.get('/api/v1/resources').json()) == 2
+
+    def test_destroy_bumps_version__user(self):
+        url = f'/api/v1/resources/{self.resource.pk}'
+        self.user_client.get(url)
+
+        self.user_client.delete(url)
+
+        assert self.user_client.get(url).status_code == HTTP_404_NOT_FOUND
+
+    def test_bulk_destroy_bumps_version__admin(self):
+        self.user_client.get('/api/v1/resources')
+
+        self.admin_client.delete(f'/api/v1/resources/bulk?owner_id={self.user.id}')
+
+        assert self.user_client.get('/api/v1/resources').json() == []
+
+    def test_version_bumped_by_another_process__user(self):
+        assert self.get_resources_queries(self.user_client, '/api/v1/resources')
+
+        run_in_process(resources_versions.bump, [self.user.id])
+
+        assert self.get_resources_queries(self.user_client, '/api/v1/resources')
+
+    def test_cache_stats__admin(self):
+        self.admin_client.get('/api/v1/resources')
+        self.admin_client.get('/api/v1/resources')
+
+        response = self.admin_client.get('/api/v1/resources/cache-stats')
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json()['hits'] > 0
+        assert 0 < response.json()['hit_ratio'] <= 1
+
+    def test_cache_stats__user(self):
+        response = self.user_client.get('/api/v1/resources/cache-stats')
+
+        assert response.status_code == HTTP_403_FORBIDDEN
+
+
+class ResourcesETagTest(UsersTestMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.resource = ResourceModel.objects.create(name=get_random_string(), owner=self.user)
+
+    def test_list_not_modified__user(self):
+        etag = self.user_client.get('/api/v1/resources')['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.user_client.get('/api/v1/resources', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert not response.content
+        assert not [q for q in queries if 'resources_resourcemodel' in q['sql']]
+
+    def test_retrieve_not_modified__user(self):
+        url = f'/api/v1/resources/{self.resource.pk}'
+        etag = self.user_client.get(url)['ETag']
+
+        assert self.user_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == HTTP_304_NOT_MODIFIED
+
+    def test_list_modified_by_create__user(self):
+        etag = self.user_client.get('/api/v1/resources')['ETag']
+
+        self.user_client.post('/api/v1/resources', {'name': get_random_string()})
+        response = self.user_client.get('/api/v1/resources', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == HTTP_200_OK
+        assert len(response.json()) == 2
+
+    def test_list_of_other_owner_not_modified__user(self):
+        etag = self.user_client.get('/api/v1/resources')['ETag']
+
+        self.admin_client.post('/api/v1/resources', {'name': get_random_string()})
+
+        assert self.user_client.get('/api/v1/resources', HTTP_IF_NONE_MATCH=etag).status_code == HTTP_304_NOT_MODIFIED
+
+    def test_list_modified_by_create_of_other_owner__admin(self):
+        etag = self.admin_client.get('/api/v1/resources')['ETag']
+
+        self.user_client.post('/api/v1/resources', {'name': get_random_string()})
+
+        assert self.admin_client.get('/api/v1/resources', HTTP_IF_NONE_MATCH=etag).status_code == HTTP_200_OK
+
+    def test_etag_depends_on_query_params__admin(self):
+        etag = self.admin_client.get('/api/v1/resources')['ETag']
+
+        response = self.admin_client.get(f'/api/v1/resources?owner_id={self.user.id}', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == HTTP_200_OK
+
+    def test_no_etag_on_not_found__user(self):
+        response = self.user_client.get('/api/v1/resources/0')
+
+        assert response.status_code == HTTP_404_NOT_FOUND
+        assert not response.has_header('ETag')
+
+
+@override_settings(RESOURCES_CACHE_ENABLED=False)
+class ResourcesValuesListTest(UsersTestMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        for owner in (self.user, self.admin):
+            ResourceModel.objects.bulk_create(
+                ResourceModel(name=name, owner=owner) for name in ('a', 'ресурс "b"', get_random_string())
+            )
+
+    def assert_same_content(self, client: APIClient, url: str) -> None:
+        fast_response = client.get(url)
+
+        with patch.object(ResourcesView, 'values_list', False):
+            response = client.get(url)
+
+        assert fast_response.status_code == HTTP_200_OK
+        assert fast_response.content == response.content
+
+    def test_list__user(self):
+        self.assert_same_content(self.user_client, '/api/v1/resources')
+
+    def test_list__admin(self):
+        self.assert_same_content(self.admin_client, '/api/v1/resources')
+        self.assert_same_content(self.admin_client, f'/api/v1/resources?owner_id={self.user.id}')
+
+    def test_list_limit_offset__admin(self):
+        self.assert_same_content(self.admin_client, '/api/v1/resources?limit=2&offset=1')
+
+    def test_list_search__admin(self):
+        self.assert_same_content(self.admin_client, '/api/v1/resources?search=%D1%80%D0%B5%D1%81&limit=2&offset=1')
+
+    def test_list_keyset__admin(self):
+        self.assert_same_content(self.admin_client, '/api/v1/resources?cursor=&limit=4')
+
+        next_url = self.admin_client.get('/api/v1/resources?cursor=&limit=4').json()['next']
+        self.assert_same_content(self.admin_client, next_url)
+
+    def test_no_serializer__admin(self):
+        with patch.object(DetailResourceSerializer, 'to_representation') as to_representation:
+            self.admin_client.get('/api/v1/resources')
+
+        to_representation.assert_not_called()
+
+
+class BenchmarkApiCommandTest(APITestCase):
+    def run_benchmark(self, *args: str) -> t.Dict[str, t.Any]:
+        with tempfile.NamedTemporaryFile('r', suffix='.json') as output:
+            call_command('benchmark_api', '--users=3', '--resources=10', '--requests=2', '--warmup=0',
+                         '--endpoints', 'users.me', 'resources.list', f'--output={output.name}', *args,
+                         stdout=StringIO(), stderr=StringIO())
+            return json.load(output)
+
+    def test_report(self):
+        report = self.run_benchmark()
+
+        assert set(report['endpoints']) == {'users.me', 'resources.list'}
+        assert {'p50', 'p95', 'p99', 'rps', 'queries'} <= set(report['endpoints']['resources.list'])
+        assert not ResourceModel.objects.exists()
+
+    def test_regression(self):
+        baseline = self.run_benchmark('--no-response-cache')
+
+        for result in baseline['endpoints'].values():
+            result['p50'] = result['p95'] = 0.000001
+
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as baseline_file:
+            json.dump(baseline, baseline_file)
+            baseline_file.flush()
+
+            with self.assertRaises(CommandError):
+                self.run_benchmark('--no-response-cache', f'--baseline={baseline_file.name}')
+
+    def test_percentile(self):
+        assert get_percentile([1, 2, 3, 4, 5], 50) == 3
+        assert get_percentile([1, 2, 3, 4], 50) == 2.5
+        assert get_percentile([10, 20], 95) == 19.5
+
+
+class OwnerEmailResourceSerializer(DetailResourceSerializer):
+    owner_email = serializers.EmailField(source='owner.email')
+
+    class Meta(DetailResourceSerializer.Meta):
+        fields = (*DetailResourceSerializer.Meta.fields, 'owner_email')
+
+
+@patch.object(ResourcesView, 'values_list', False)
+@patch.object(ResourcesView, 'get_serializer_class', lambda self: OwnerEmailResourceSerializer)
+class ResourcesQueryBudgetTest(UsersTestMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        ResourceModel.objects.bulk_create(ResourceModel(name=get_random_string(), owner=self.user) for _ in range(5))
+
+    def test_n_plus_one_raises__user(self):
+        with self.assertRaisesRegex(QueryBudgetExceeded, r'ResourcesView\.list: .* query repeated 5 times'):
+            self.user_client.get('/api/v1/resources')
+
+    def test_budget_exceeded_raises__user(self):
+        with self.assertRaisesRegex(QueryBudgetExceeded, r'7 queries exceed the budget of 3'):
+            self.user_client.get('/api/v1/resources')
+
+    @override_settings(QUERY_BUDGET_RAISE=False)
+    def test_n_plus_one_logged__user(self):
+        with self.assertLogs('common.query_budget', 'WARNING') as logs:
+            response = self.user_client.get('/api/v1/resources')
+
+        assert response.status_code == HTTP_200_OK
+        assert 'FROM "users_usermodel"' in logs.output[0]
@@ -8,5 +8,9 @@ from .views import ResourcesView
 
 urlpatterns = [
     path(r'', ResourcesView.as_view({'post': 'create', 'get': 'list'})),
+    path(r'/bulk', ResourcesView.as_view({'post': 'bulk_create', 'delete': 'bulk_destroy'})),
+    path(r'/multi-get', ResourcesView.as_view({'post': 'multi_get'})),
+    path(r'/export', ResourcesView.as_view({'get': 'export'})),
+    path(r'/cache-stats', ResourcesView.as_view({'get': 'cache_stats'})),
     path(r'/<int:pk>', ResourcesView.as_view({'get': 'retrieve', 'delete': 'destroy'})),
 ]
@@ -1,47 +1,360 @@
 from __future__ import annotations
 
+import re
 import typing as t
+from collections import Counter
+from itertools import islice
 
+from django.conf import settings
+from django.contrib.postgres.search import TrigramDistance
+from django.db import transaction
 from django.db.models import QuerySet
-from rest_framework import mixins
-from rest_framework.exceptions import PermissionDenied
-from rest_framework.permissions import IsAuthenticated
+from django.db.models.functions import Upper
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import mixins, status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.permissions import (
+    BasePermission,
+    IsAdminUser,
+    IsAuthenticated,
+)
+from rest_framework.renderers import BaseRenderer
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.serializers import Serializer
 from rest_framework.viewsets import GenericViewSet
 
+from common.etags import ETagMixin
+from common.listing import ValuesListMixin
+from common.pagination import KeysetPagination
+from common.query_budget import QueryBudgetMixin
+from common.renderers import (
+    CSVRenderer,
+    NDJSONRenderer,
+    StreamingRenderer,
+)
+from common.swagger import swagger_schema
+from users.metrics import quota_exceeded_total
+from users.models import UserOptionsModel
+
+from .cache import (
+    get_cache_key,
+    get_cached,
+    resources_versions,
+    response_cache_stats,
+    set_cached,
+)
 from .models import ResourceModel
 from .seriazliers import (
+    BulkCreateResourceSerializer,
+    BulkDestroyResourceSerializer,
     CreateResourceSerializer,
     DetailResourceSerializer,
+    MultiGetResourceSerializer,
     ResourceQuotaExceeded,
 )
 
 
-class ResourcesView(mixins.CreateModelMixin,
+re_accepts_gzip = re.compile(r'\bgzip\b')
+
+
+class ResourcesView(QueryBudgetMixin,
+                    ETagMixin,
+                    mixins.CreateModelMixin,
                     mixins.RetrieveModelMixin,
-                    mixins.ListModelMixin,
+                    ValuesListMixin,
                     mixins.DestroyModelMixin,
                     GenericViewSet):
     queryset = ResourceModel.objects.all()
     permission_classes = (IsAuthenticated,)
+    action2permission_classes = {
+        'cache_stats': (IsAdminUser,),
+    }
+    # owner_id filter selects the owner, limit/offset pagination counts rows
+    action2query_budget = {
+        'list': 3,
+        'retrieve': 1,
+        'multi_get': 2,
+        'create': 3,
+        'bulk_create': 3,
+        'destroy': 3,
+        'export': 1,
+        'cache_stats': 0,
+    }
+    # bulk deletion runs the same queries for every batch and owner
+    action2query_repeat_limit = {
+        'bulk_destroy': None,
+    }
+    # see DEFAULT_THROTTLE_RATES
+    action2throttle_scope = {
+        'create': 'resources_create',
+        'bulk_create': 'resources_create',
+    }
     filterset_fields = ('owner_id',)
+    # serializers of the list return model fields as is, see ValuesListMixin
+    values_list = True
+    multi_get_query_param = 'ids'
+    search_query_param = 'search'
+    # shorter strings have no trigrams, so their search could not use the index
+    search_min_length = 3
+    pagination_class = KeysetPagination
+    keyset_ordering = ('owner_id', 'id')
+    bulk_destroy_batch_size = 1000
+    export_renderer_classes = (NDJSONRenderer, CSVRenderer)
+    export_chunk_size = 2000
+
+    def get_permissions(self) -> t.List[BasePermission]:
+        perms_classes = self.action2permission_classes.get(self.action, self.permission_classes)
+        return [p() for p in perms_classes]
 
     def get_serializer_class(self) -> t.Type[Serializer]:
         return {
             'create': CreateResourceSerializer,
+            'bulk_create': BulkCreateResourceSerializer,
+            'bulk_destroy': BulkDestroyResourceSerializer,
+            'multi_get': MultiGetResourceSerializer,
         }.get(self.action, DetailResourceSerializer)
 
+    @property
+    def paginator(self) -> t.Optional[BasePagination]:
+        # export is never paginated
+        if self.action == 'export':
+            return None
+
+        return super().paginator
+
+    def get_renderers(self) -> t.List[BaseRenderer]:
+        if self.action == 'export':
+            return [renderer() for renderer in self.export_renderer_classes]
+
+        return super().get_renderers()
+
     def filter_queryset(self, queryset: QuerySet) -> QuerySet:
-        if self.request.user.is_staff:
-            return super().filter_queryset(queryset)
+        queryset = super().filter_queryset(queryset)
+
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(owner=self.request.user)
+
+        if self.action == 'list' and self.search_query_param in self.request.query_params:
+            queryset = self.search(queryset, self.request.query_params[self.search_query_param].strip())
+
+        return queryset
+
+    def search(self, queryset: QuerySet, text: str) -> QuerySet:
+        """
+        Case-insensitive substring search by name ranked by trigram similarity, best matches first.
+        Both matching and ranking are served by `resources_name_trgm_idx`, and at most `RESOURCES_SEARCH_MAX_RESULTS`
+        best matches are returned, so the search reads a bounded number of rows however many resources match.
+        """
+        if len(text) < self.search_min_length:
+            raise ValidationError({
+                self.search_query_param: [f'Ensure this field has at least {self.search_min_length} characters.'],
+            })
+
+        if self.paginator.cursor_query_param in self.request.query_params:
+            raise ValidationError({self.search_query_param: ['Search is not supported in cursor mode']})
+
+        queryset = queryset.filter(name__icontains=text).order_by(TrigramDistance(Upper('name'), text), 'id')
+
+        return queryset[:settings.RESOURCES_SEARCH_MAX_RESULTS]
+
+    @swagger_schema(lambda openapi: dict(
+        manual_parameters=[
+            openapi.Parameter('search', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description='Part of the name, at least 3 characters, best matches go first'),
+            openapi.Parameter('ids', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description='Comma separated ids, the response is the one of multi-get'),
+        ],
+    ))
+    def list(self, request: Request, *args: t.Any, **kwargs: t.Any) -> Response:
+        if self.multi_get_query_param in request.query_params:
+            # budget, ETag and cache entries are the ones of multi-get
+            self.action = 'multi_get'
+            return self._get_cached_response(self.multi_get, request, *args, **kwargs)
+
+        return self._get_cached_response(super().list, request, *args, **kwargs)
+
+    @swagger_schema(lambda openapi: dict(
+        request_body=MultiGetResourceSerializer,
+        responses={status.HTTP_200_OK: MultiGetResourceSerializer},
+    ))
+    def multi_get(self, request: Request, *args: t.Any, **kwargs: t.Any) -> Response:
+        """
+        Resources by ids in the order of the ids, fetched by one query. Ids of resources that do not exist
+        or are not available to the user are returned as `missing`. Also available as `GET ?ids=1,2,3`.
+        """
+        serializer = self.get_serializer(data=request.query_params if request.method == 'GET' else request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+
+        fields = DetailResourceSerializer.Meta.fields
+        rows = self.filter_queryset(self.get_queryset()).filter(pk__in=ids).values_list(*fields, named=True)
+        found = {row.pk: dict(zip(fields, row)) for row in rows}
+
+        return Response({
+            'results': [found[pk] for pk in ids if pk in found],
+            'missing': [pk for pk in ids if pk not in found],
+        })
+
+    def retrieve(self, request: Request, *args: t.Any, **kwargs: t.Any) -> Response:
+        return self._get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_etag_version(self) -> str:
+        user = self.request.user
+        return resources_versions.get(resources_versions.ALL if user.is_staff else user.id)
+
+    def _get_cached_response(self, action: t.Callable[..., Response], request: Request,
+                             *args: t.Any, **kwargs: t.Any) -> Response:
+        """
+        Answers `If-None-Match` by ETag and returns data of successful responses from cache, see `resources.cache`.
+        Both ETag and cache key are derived from the version of the resources available to the user.
+        """
+        etag = self.get_etag()
+
+        def get_response() -> Response:
+            if not settings.RESOURCES_CACHE_ENABLED:
+                return action(request, *args, **kwargs)
+
+            key = get_cache_key(etag)
+            data = get_cached(key)
+
+            if data is not None:
+                return Response(data)
+
+            response = action(request, *args, **kwargs)
+
+            if response.status_code == status.HTTP_200_OK:
+                set_cached(key, response.data)
 
-        return super().filter_queryset(queryset).filter(owner=self.request.user)
+            return response
+
+        return self.get_conditional_response(etag, get_response)
 
     def create(self, request: Request, *args: t.Any, **kwargs: t.Any) -> Response:
         try:
             return super().create(request, *args, **kwargs)
 
         except ResourceQuotaExceeded as exc:
+            quota_exceeded_total.inc()
             raise PermissionDenied(f'Maximum number of resources is reached: {exc.quota}')
+
+    def perform_create(self, serializer: Serializer) -> None:
+        super().perform_create(serializer)
+        resources_versions.bump([serializer.validated_data['owner'].id])
+
+    def bulk_create(self, request: Request, *args: t.Any, **kwargs: t.Any) -> Response:
+        return self.create(request, *args, **kwargs)
+
+    @transaction.atomic()
+    def perform_destroy(self, instance: ResourceModel) -> None:
+        # a concurrent request may have deleted the resource after it was loaded, the slot is released once
+        deleted, _ = ResourceModel.objects.filter(pk=instance.pk).delete()
+
+        if deleted:
+            UserOptionsModel.objects.release_resources(instance.owner_id)
+            resources_versions.bump([instance.owner_id])
+
+    @swagger_schema(lambda openapi: dict(
+        manual_parameters=[
+            openapi.Parameter('ids', openapi.IN_QUERY, description='Comma separated ids', type=openapi.TYPE_STRING),
+        ],
+        responses={status.HTTP_200_OK: BulkDestroyResourceSerializer},
+    ))
+    def bulk_destroy(self, request: Request, *args: t.Any, **kwargs: t.Any) -> Response:
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if 'ids' in serializer.validated_data:
+            queryset = queryset.filter(pk__in=serializer.validated_data['ids'])
+
+        elif not self.has_filter_values(queryset):
+            raise ValidationError('Either ids or filters must be specified')
+
+        deleted = self.perform_bulk_destroy(queryset)
+
+        return Response(self.get_serializer({'deleted': deleted}).data)
+
+    def has_filter_values(self, queryset: QuerySet) -> bool:
+        """
+        Whether any filter of the request has a value, filters with empty values (`?owner_id=`) are ignored by
+        django-filter and do not narrow the queryset
+        """
+        filterset = DjangoFilterBackend().get_filterset(self.request, queryset, self)
+
+        return filterset is not None and filterset.is_valid() and \
+            any(value not in (None, '') for value in filterset.form.cleaned_data.values())
+
+    def perform_bulk_destroy(self, queryset: QuerySet) -> int:
+        """
+        Deletes resources in batches, each one in its own short transaction.
+        """
+        queryset = queryset.order_by('pk').select_for_update()
+        deleted = 0
+
+        while True:
+            with transaction.atomic():
+                batch = list(queryset.values_list('pk', 'owner_id')[:self.bulk_destroy_batch_size])
+
+                if not batch:
+                    return deleted
+
+                ResourceModel.objects.filter(pk__in=[pk for pk, _ in batch]).delete()
+
+                # options rows are locked in the same order by all the bulk deletions to avoid deadlocks
+                for owner_id, count in sorted(Counter(owner_id for _, owner_id in batch).items()):
+                    UserOptionsModel.objects.release_resources(owner_id, count)
+
+                resources_versions.bump(owner_id for _, owner_id in batch)
+
+            deleted += len(batch)
+
+    @swagger_schema(lambda openapi: dict(
+        manual_parameters=[
+            openapi.Parameter('format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['ndjson', 'csv']),
+        ],
+        responses={status.HTTP_200_OK: 'Stream of resources in requested format'},
+    ))
+    def export(self, request: Request, *args: t.Any, **kwargs: t.Any) -> StreamingHttpResponse:
+        """
+        Streams all the resources available to the user. Rows are read by a server-side cursor, so memory
+        consumption does not depend on the number of rows. The stream is gzipped if the client accepts it.
+        """
+        renderer = request.accepted_renderer
+        queryset = self.filter_queryset(self.get_queryset()).order_by('pk')
+        fields = DetailResourceSerializer.Meta.fields
+
+        content = (chunk.encode(renderer.charset) for chunk in self._stream_rows(renderer, queryset, fields))
+
+        gzipped = bool(re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+
+        response = StreamingHttpResponse(compress_sequence(content) if gzipped else content,
+                                         content_type=f'{renderer.media_type}; charset={renderer.charset}')
+        response['Content-Disposition'] = f'attachment; filename="resources.{renderer.format}"'
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+
+        return response
+
+    def _stream_rows(self, renderer: StreamingRenderer, queryset: QuerySet,
+                     fields: t.Sequence[str]) -> t.Iterator[str]:
+        yield renderer.render_header(fields)
+
+        rows = queryset.values_list(*fields).iterator(chunk_size=self.export_chunk_size)
+
+        # rows are rendered by chunks, so gzip is flushed once per chunk rather than per row
+        for chunk in iter(lambda: list(islice(rows, self.export_chunk_size)), []):
+            yield renderer.render_rows(fields, chunk)
+
+    def cache_stats(self, request: Request) -> JsonResponse:
+        """
+        Hits and misses of the resources responses cache of the worker process that handles the request
+        """
+        return JsonResponse(response_cache_stats.as_dict())
@@ -0,0 +1,142 @@
+"""
+Batch of API requests dispatched in-process in one round trip.
+
+Sub-requests are resolved by the URLconf and passed to their views directly, so middleware runs once for the batch.
+They are authenticated as the user of the batch without verifying the token again, and their reads go to the primary
+database like reads of any unsafe request. Query budgets, rate limits and permissions apply to every sub-request.
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import time
+import typing as t
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.request import Request
+
+from common.cache import atomic_rebumping_versions
+from common.query_budget import QueryBudgetExceeded
+
+
+__all__ = (
+    'run_batch',
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+API_PATH_PREFIX = '/api/'
+# copied from the environ of the batch request, so sub-requests have the same client and server
+ENVIRON_KEYS = (
+    'REMOTE_ADDR',
+    'HTTP_X_FORWARDED_FOR',
+    'SERVER_NAME',
+    'SERVER_PORT',
+    'SERVER_PROTOCOL',
+    'wsgi.url_scheme',
+)
+
+
+def _get_sub_request(request: Request, method: str, path: str, body: t.Any) -> HttpRequest:
+    url = urlsplit(path)
+    content = b'' if body is None else json.dumps(body).encode()
+
+    environ = {key: request.META[key] for key in ENVIRON_KEYS if key in request.META}
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(content)),
+        'wsgi.input': BytesIO(content),
+    })
+
+    sub_request = WSGIRequest(environ)
+    # DRF authenticates the request as the given user instead of running the authentication classes
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+
+    return sub_request
+
+
+def _error(status_code: int, detail: str) -> t.Dict[str, t.Any]:
+    return {'status': status_code, 'headers': {}, 'body': {'detail': detail}}
+
+
+def _dispatch(request: Request, method: str, path: str, body: t.Any) -> t.Dict[str, t.Any]:
+    if not path.startswith(API_PATH_PREFIX):
+        return _error(status.HTTP_404_NOT_FOUND, 'Not found.')
+
+    sub_request = _get_sub_request(request, method, path, body)
+
+    try:
+        match = resolve(sub_request.path_info)
+    except Resolver404:
+        return _error(status.HTTP_404_NOT_FOUND, 'Not found.')
+
+    if match.func is request.resolver_match.func:
+        return _error(status.HTTP_400_BAD_REQUEST, 'Batches cannot be nested.')
+
+    try:
+        response: HttpResponse = match.func(sub_request, *match.args, **match.kwargs)
+
+        if hasattr(response, 'render'):
+            response.render()
+
+    except QueryBudgetExceeded:
+        # raised only if QUERY_BUDGET_RAISE is set, so budget regressions of sub-requests fail tests
+        raise
+
+    except Exception:
+        logger.exception('Sub-request %s %s of batch failed', method, path)
+        return _error(status.HTTP_500_INTERNAL_SERVER_ERROR, 'A server error occurred.')
+
+    if response.streaming:
+        return _error(status.HTTP_400_BAD_REQUEST, 'Streaming responses are not supported in batch.')
+
+    if not response.content:
+        body = None
+    elif response.get('Content-Type', '').startswith('application/json'):
+        body = json.loads(response.content)
+    else:
+        body = response.content.decode(response.charset)
+
+    return {
+        'status': response.status_code,
+        'headers': {header: value for header, value in response.items() if header != 'Content-Type'},
+        'body': body,
+    }
+
+
+def run_batch(request: Request, requests: t.List[t.Dict[str, t.Any]], atomic: bool) -> t.Dict[str, t.Any]:
+    """
+    Runs sub-requests `{"method": ..., "path": ..., "body": ...}` one by one in their order and returns their
+    responses with durations. In atomic mode the sub-requests run in one transaction: the first failed one
+    (status >= 400) rolls back all of them and the rest are not run. Versions bumped by the rolled back sub-requests
+    are bumped again, so responses cached and ETags given by the later ones are not served.
+    """
+    responses: t.List[t.Dict[str, t.Any]] = []
+    rolled_back = False
+
+    with atomic_rebumping_versions() if atomic else contextlib.nullcontext():
+        for sub_request in requests:
+            started = time.perf_counter()
+            response = _dispatch(request, sub_request['method'], sub_request['path'], sub_request.get('body'))
+            response['duration_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            responses.append(response)
+
+            if atomic and response['status'] >= 400:
+                transaction.set_rollback(True)
+                rolled_back = True
+                break
+
+    return {'responses': responses, 'rolled_back': rolled_back}
@@ -0,0 +1,4 @@
+"""
+PostgreSQL database backend with a process-wide connection pool, see `base.DatabaseWrapper` and `pool.ConnectionPool`.
+"""
+from __future__ import annotations
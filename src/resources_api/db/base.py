@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import typing as t
+
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql.base import Database
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgreSQLDatabaseWrapper
+from django.db.backends.postgresql.creation import DatabaseCreation as PostgreSQLDatabaseCreation
+from psycopg2.extensions import connection as Connection
+
+from .pool import (
+    ConnectionPool,
+    close_pools,
+    get_pool,
+)
+
+
+__all__ = (
+    'DatabaseWrapper',
+)
+
+
+class DatabaseCreation(PostgreSQLDatabaseCreation):
+    def _destroy_test_db(self, test_database_name: str, verbosity: int) -> None:
+        # idle pooled connections to the test database (including ones of test mirrors) would block DROP DATABASE
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(PostgreSQLDatabaseWrapper):
+    """
+    PostgreSQL backend taking connections from a process-wide pool instead of opening a new one for every request.
+
+    Connection is returned to the pool when Django closes it, i.e. at the end of the request (`CONN_MAX_AGE = 0`).
+    Pool is configured by `POOL` key of the database settings, see `ConnectionPool` for the options.
+    """
+    creation_class = DatabaseCreation
+
+    pool: t.Optional[ConnectionPool] = None
+
+    def get_pool(self, conn_params: t.Dict[str, t.Any]) -> ConnectionPool:
+        return get_pool(
+            self.alias,
+            tuple(sorted(conn_params.items())),
+            lambda: ConnectionPool(lambda: Database.connect(**conn_params), **self.settings_dict.get('POOL', {})),
+        )
+
+    def get_new_connection(self, conn_params: t.Dict[str, t.Any]) -> Connection:
+        if self.alias == NO_DB_ALIAS:
+            # short-living connections to the maintenance database made by migrations and tests
+            return super().get_new_connection(conn_params)
+
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.checkout()
+
+        options = self.settings_dict['OPTIONS']
+
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+    def _close(self) -> None:
+        if self.connection is None or self.pool is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            # connection closed inside of atomic block stays referenced by the wrapper, so it cannot be reused
+            self.pool.checkin(self.connection, discard=self.in_atomic_block)
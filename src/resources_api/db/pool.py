@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+import typing as t
+from collections import deque
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+from psycopg2.extensions import connection as Connection
+
+
+__all__ = (
+    'ConnectionPool',
+    'close_pools',
+    'get_pool',
+    'get_pools_stats',
+)
+
+
+VALIDATION_NONE = 'none'
+# checks connection state known by the client, does not make a round trip to the server
+VALIDATION_STATUS = 'status'
+# runs `SELECT 1` on every checkout
+VALIDATION_PING = 'ping'
+
+
+class PooledConnection(t.NamedTuple):
+    connection: Connection
+    created_at: float
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections with the same connection parameters.
+
+    Checkout waits up to `timeout` seconds for a free connection if `max_size` connections are open.
+    Connections older than `max_lifetime` seconds and the ones failed validation are closed and replaced.
+    """
+
+    def __init__(self, connect: t.Callable[[], Connection], min_size: int = 0, max_size: int = 10,
+                 max_lifetime: float = 3600, timeout: float = 10, validation: str = VALIDATION_STATUS) -> None:
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.validation = validation
+
+        self._idle: t.Deque[PooledConnection] = deque()
+        self._in_use: t.Dict[int, PooledConnection] = {}
+        self._condition = threading.Condition()
+
+        self.stats = {
+            'checkouts': 0,
+            'created': 0,
+            'closed': 0,
+            'validation_failures': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+        for _ in range(min_size):
+            self._idle.append(self._create())
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._in_use)
+
+    def _create(self) -> PooledConnection:
+        connection = self.connect()
+        self.stats['created'] += 1
+        return PooledConnection(connection, time.monotonic())
+
+    def _close(self, pooled: PooledConnection) -> None:
+        self.stats['closed'] += 1
+
+        try:
+            pooled.connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_expired(self, pooled: PooledConnection) -> bool:
+        return time.monotonic() - pooled.created_at > self.max_lifetime
+
+    def _is_valid(self, pooled: PooledConnection) -> bool:
+        connection = pooled.connection
+
+        if self.validation == VALIDATION_NONE:
+            return True
+
+        if connection.closed or connection.get_transaction_status() == TRANSACTION_STATUS_UNKNOWN:
+            return False
+
+        if self.validation == VALIDATION_PING:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            except psycopg2.Error:
+                return False
+
+        return True
+
+    def _acquire_idle(self) -> t.Optional[PooledConnection]:
+        # called with the lock held, may close expired idle connections
+        while self._idle:
+            pooled = self._idle.pop()
+
+            if not self._is_expired(pooled):
+                return pooled
+
+            self._close(pooled)
+
+        return None
+
+    def checkout(self) -> Connection:
+        started = None
+
+        with self._condition:
+            while True:
+                pooled = self._acquire_idle()
+
+                if pooled is not None or self.size < self.max_size:
+                    break
+
+                if started is None:
+                    started = time.monotonic()
+                    self.stats['waits'] += 1
+
+                remaining = self.timeout - (time.monotonic() - started)
+
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    self.stats['timeouts'] += 1
+                    raise psycopg2.OperationalError(
+                        f'Connection pool is exhausted: {self.max_size} connections are in use'
+                    )
+
+            if started is not None:
+                waited = time.monotonic() - started
+                self.stats['wait_time_total'] += waited
+                self.stats['wait_time_max'] = max(self.stats['wait_time_max'], waited)
+
+            self.stats['checkouts'] += 1
+
+            # slot is reserved under the lock, connection itself is created or validated outside of it
+            placeholder = PooledConnection(None, 0)
+            self._in_use[id(placeholder)] = placeholder
+
+        try:
+            if pooled is not None and not self._is_valid(pooled):
+                self.stats['validation_failures'] += 1
+                self._close(pooled)
+                pooled = None
+
+            if pooled is None:
+                pooled = self._create()
+
+        except BaseException:
+            with self._condition:
+                del self._in_use[id(placeholder)]
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            del self._in_use[id(placeholder)]
+            self._in_use[id(pooled.connection)] = pooled
+
+        return pooled.connection
+
+    def checkin(self, connection: Connection, discard: bool = False) -> None:
+        with self._condition:
+            pooled = self._in_use.pop(id(connection), None)
+
+        if pooled is None:
+            # connection does not belong to the pool anymore, e.g. the pool was reset after fork
+            connection.close()
+            return
+
+        if not discard and not connection.closed and connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        if discard or connection.closed or self._is_expired(pooled):
+            self._close(pooled)
+            pooled = None
+
+        with self._condition:
+            if pooled is not None:
+                self._idle.append(pooled)
+
+            self._condition.notify()
+
+    def close(self) -> None:
+        """
+        Closes idle connections. Connections in use are closed on checkin.
+        """
+        with self._condition:
+            while self._idle:
+                self._close(self._idle.pop())
+
+            self._in_use.clear()
+
+    def get_stats(self) -> t.Dict[str, t.Any]:
+        with self._condition:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                **self.stats,
+            }
+
+
+_pools: t.Dict[t.Tuple[str, t.Any], ConnectionPool] = {}
+_pools_pid = os.getpid()
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias: str, key: t.Any, create: t.Callable[[], ConnectionPool]) -> ConnectionPool:
+    """
+    Returns the pool of the database alias for given connection parameters, creating it if needed.
+    Pools are not shared with forked processes: a child process starts with no pools.
+    """
+    global _pools_pid
+
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # connections inherited from the parent must not be used nor closed by the child
+            _pools.clear()
+            _pools_pid = os.getpid()
+
+        pool = _pools.get((alias, key))
+
+        if pool is None:
+            pool = _pools[(alias, key)] = create()
+
+        return pool
+
+
+def close_pools(alias: t.Optional[str] = None) -> None:
+    with _pools_lock:
+        for pool_alias, key in list(_pools):
+            if alias is None or pool_alias == alias:
+                _pools.pop((pool_alias, key)).close()
+
+
+def get_pools_stats() -> t.Dict[str, t.List[t.Dict[str, t.Any]]]:
+    stats: t.Dict[str, t.List[t.Dict[str, t.Any]]] = {}
+
+    with _pools_lock:
+        pools = list(_pools.items())
+
+    for (alias, key), pool in pools:
+        stats.setdefault(alias, []).append(pool.get_stats())
+
+    return stats
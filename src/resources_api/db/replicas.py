@@ -0,0 +1,139 @@
+"""
+Routing of reads to replicas (`DATABASE_REPLICAS`) and of writes to the primary (`default`) database.
+
+Reads go to the primary if any of:
+* the request is not safe (POST, PUT, DELETE, ...), see `ReplicaRoutingMiddleware`;
+* the code runs inside of `use_primary()` or of a transaction on the primary;
+* the request user made a successful write less than `DB_REPLICA_PIN_SECONDS` ago,
+  so the user reads own writes regardless of replication lag. Pins are kept in `DB_REPLICA_PIN_CACHE_ALIAS` cache
+  shared by all the processes, as the next request of the user may be handled by another worker.
+"""
+from __future__ import annotations
+
+import contextlib
+import random
+import threading
+import typing as t
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Model
+from django.http import HttpRequest, HttpResponse
+
+
+__all__ = (
+    'PrimaryReplicaRouter',
+    'ReplicaRoutingMiddleware',
+    'pin_user',
+    'set_request_user',
+    'use_primary',
+)
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState(threading.local):
+    def __init__(self) -> None:
+        self.primary_depth = 0
+        self.user_id: t.Any = None
+        self.user_pinned: t.Optional[bool] = None
+
+
+_state = RoutingState()
+
+
+@contextlib.contextmanager
+def use_primary() -> t.Iterator[None]:
+    """
+    Routes all reads of the current thread to the primary database.
+    """
+    _state.primary_depth += 1
+
+    try:
+        yield
+    finally:
+        _state.primary_depth -= 1
+
+
+def _get_pin_cache_key(user_id: t.Any) -> str:
+    return f'db:pin:{user_id}'
+
+
+def pin_user(user_id: t.Any) -> None:
+    """
+    Routes reads of the user's requests to the primary database for `DB_REPLICA_PIN_SECONDS`.
+    """
+    if settings.DATABASE_REPLICAS:
+        caches[settings.DB_REPLICA_PIN_CACHE_ALIAS].set(_get_pin_cache_key(user_id), True,
+                                                        settings.DB_REPLICA_PIN_SECONDS)
+
+
+def set_request_user(user_id: t.Any) -> None:
+    """
+    Sets the user of the current request, is called by authentication.
+    """
+    if _state.user_id != user_id:
+        _state.user_id = user_id
+        _state.user_pinned = None
+
+
+def _is_primary_required() -> bool:
+    if _state.primary_depth or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return True
+
+    if _state.user_id is None:
+        return False
+
+    if _state.user_pinned is None:
+        # looked up once per request
+        _state.user_pinned = bool(
+            caches[settings.DB_REPLICA_PIN_CACHE_ALIAS].get(_get_pin_cache_key(_state.user_id))
+        )
+
+    return _state.user_pinned
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model: t.Type[Model], **hints: t.Any) -> str:
+        if not settings.DATABASE_REPLICAS or _is_primary_required():
+            return DEFAULT_DB_ALIAS
+
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model: t.Type[Model], **hints: t.Any) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Model, obj2: Model, **hints: t.Any) -> bool:
+        # replicas contain the same data as the primary
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints: t.Any) -> bool:
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Routes reads of unsafe requests to the primary and pins the user to the primary after a successful one.
+    """
+
+    def __init__(self, get_response: t.Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if request.method in SAFE_METHODS:
+            context = contextlib.nullcontext()
+        else:
+            context = use_primary()
+
+        try:
+            with context:
+                response = self.get_response(request)
+
+            if request.method not in SAFE_METHODS and response.status_code < 400 and _state.user_id is not None:
+                pin_user(_state.user_id)
+
+            return response
+        finally:
+            set_request_user(None)
@@ -0,0 +1,118 @@
+"""
+API docs: swagger/redoc UI and OpenAPI schema.
+
+The schema is generated once per process (or loaded from `API_SCHEMA_FILE` written by `manage.py generate_swagger`)
+and served from memory with ETag. UI pages load the schema from `/swagger.json`, so they do not generate it either.
+The module is imported only if `API_DOCS_ENABLED` is set.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import typing as t
+from collections import OrderedDict
+
+from django.conf import settings
+from django.conf.urls import url
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.http import condition
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, yaml_sane_dump
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+
+__all__ = (
+    'api_info',
+    'docs_urlpatterns',
+    'schema_document',
+)
+
+
+api_info = openapi.Info(
+    title="Snippets API",
+    default_version='v1',
+    description="Test description",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@snippets.local"),
+    license=openapi.License(name="BSD License"),
+)
+
+
+class RenderedSchema(t.NamedTuple):
+    content: bytes
+    content_type: str
+    etag: str
+
+
+class SchemaDocument:
+    renderers = {
+        '.json': ('application/json', lambda spec: json.dumps(spec).encode()),
+        '.yaml': ('application/yaml', lambda spec: yaml_sane_dump(spec, binary=True)),
+    }
+
+    def __init__(self) -> None:
+        self._spec: t.Optional[t.Dict[str, t.Any]] = None
+        self._rendered: t.Dict[str, RenderedSchema] = {}
+        self._lock = threading.Lock()
+
+    def _load_spec(self) -> t.Dict[str, t.Any]:
+        if settings.API_SCHEMA_FILE:
+            with open(settings.API_SCHEMA_FILE) as schema_file:
+                return json.load(schema_file, object_pairs_hook=OrderedDict)
+
+        # anonymous mock request, so serializer fields depending on request (e.g. CurrentUserDefault) can be inspected
+        request = APIView().initialize_request(APIRequestFactory().get('/swagger.json'))
+        schema = OpenAPISchemaGenerator(api_info).get_schema(request=request, public=True)
+
+        spec = OpenAPICodecJson(validators=[]).generate_swagger_object(schema)
+
+        # host of the mock request is meaningless, clients use the host they requested the schema from
+        spec.pop('host', None)
+        spec.pop('schemes', None)
+
+        return spec
+
+    def get(self, format: str) -> RenderedSchema:
+        if format not in self._rendered:
+            with self._lock:
+                if self._spec is None:
+                    self._spec = self._load_spec()
+
+                if format not in self._rendered:
+                    content_type, render = self.renderers[format]
+                    content = render(self._spec)
+                    self._rendered[format] = RenderedSchema(content, content_type, hashlib.sha1(content).hexdigest())
+
+        return self._rendered[format]
+
+
+schema_document = SchemaDocument()
+
+
+@condition(etag_func=lambda request, format: schema_document.get(format).etag)
+def schema_spec_view(request: HttpRequest, format: str) -> HttpResponse:
+    schema = schema_document.get(format)
+
+    response = HttpResponse(schema.content, content_type=schema.content_type)
+    # clients may keep the schema but have to revalidate it
+    response['Cache-Control'] = 'no-cache'
+
+    return response
+
+
+schema_view = get_schema_view(
+    api_info,
+    public=True,
+    permission_classes=(permissions.AllowAny,),
+)
+
+docs_urlpatterns = [
+    url(r'^swagger(?P<format>\.json|\.yaml)$', schema_spec_view, name='schema-json'),
+    url(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    url(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+]
@@ -9,12 +9,21 @@ from rest_framework.response import Response
 from rest_framework.views import exception_handler
 
 
+# Validation errors for known unique constraints, so the constraint can be relied on instead of a pre-check query
+UNIQUE_VIOLATION_DETAILS = {
+    'users_usermodel_email_key': {'email': ['User with such email already exists']},
+}
+
+
 def get_api_exception_by_psycopg_exception(exc: t.Any) -> APIException:
     error_code = getattr(exc, 'pgcode', None)
 
     if error_code is None:
         return APIException()
 
+    if error_code == errorcodes.UNIQUE_VIOLATION and exc.diag.constraint_name in UNIQUE_VIOLATION_DETAILS:
+        return ValidationError(UNIQUE_VIOLATION_DETAILS[exc.diag.constraint_name])
+
     if error_code in (errorcodes.UNIQUE_VIOLATION, errorcodes.NOT_NULL_VIOLATION):
         return ValidationError(exc.pgerror)
 
@@ -0,0 +1,306 @@
+"""
+Prometheus metrics aggregated across worker processes.
+
+Every thread of every process writes its own memory mapped file in `METRICS_DIR`, so incrementing a metric takes
+no lock. `/metrics` endpoint sums values of all the files. Files of finished processes are kept, so counters
+never go down; the directory should be emptied on deploy. The endpoint is served only to `METRICS_ALLOWED_NETWORKS`
+and to requests with `METRICS_TOKEN`.
+"""
+from __future__ import annotations
+
+import glob
+import hmac
+import ipaddress
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import typing as t
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseForbidden,
+)
+
+
+__all__ = (
+    'Counter',
+    'Histogram',
+    'MetricsMiddleware',
+    'get_view_name',
+    'metrics_view',
+)
+
+
+class MmapedValues:
+    """
+    Append-only mapping of string keys to float values stored in a memory mapped file.
+    The file is written by a single thread and can be read by any process at any time: an entry is written
+    before the used size in the header is updated.
+
+    Layout: used size (uint32, padded to 8 bytes), then entries: key size (uint32), key (padded to 8 bytes), value.
+    """
+    initial_size = 64 * 1024
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, 'a+b')
+
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(self.initial_size)
+
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._used = struct.unpack_from('I', self._map, 0)[0] or 8
+        # a file of a finished process with the same pid is continued, so its counters are not lost
+        self._positions = {key: position for key, _, position in _read_entries(self._map, self._used)}
+
+    def inc(self, key: str, amount: float) -> None:
+        position = self._positions.get(key)
+
+        if position is None:
+            position = self._add(key)
+
+        struct.pack_into('d', self._map, position, struct.unpack_from('d', self._map, position)[0] + amount)
+
+    def _add(self, key: str) -> int:
+        encoded = key.encode()
+        padded = len(encoded) + (8 - (len(encoded) + 4) % 8) % 8
+        size = 4 + padded + 8
+
+        if self._used + size > len(self._map):
+            new_size = max(len(self._map) * 2, self._used + size)
+            self._map.close()
+            self._file.truncate(new_size)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+
+        struct.pack_into(f'I{padded}sd', self._map, self._used, len(encoded), encoded, 0.0)
+        position = self._used + 4 + padded
+
+        self._used += size
+        struct.pack_into('I', self._map, 0, self._used)
+
+        self._positions[key] = position
+        return position
+
+
+def _read_entries(data: t.Union[bytes, mmap.mmap], used: int) -> t.Iterator[t.Tuple[str, float, int]]:
+    offset = 8
+
+    while offset < used:
+        key_size = struct.unpack_from('I', data, offset)[0]
+        padded = key_size + (8 - (key_size + 4) % 8) % 8
+        key = bytes(data[offset + 4:offset + 4 + key_size]).decode()
+        position = offset + 4 + padded
+
+        yield key, struct.unpack_from('d', data, position)[0], position
+
+        offset = position + 8
+
+
+def read_values(path: str) -> t.Iterator[t.Tuple[str, float]]:
+    with open(path, 'rb') as values_file:
+        data = values_file.read()
+
+    if len(data) < 8:
+        return
+
+    for key, value, _ in _read_entries(data, struct.unpack_from('I', data, 0)[0]):
+        yield key, value
+
+
+_local = threading.local()
+
+
+def _get_values() -> MmapedValues:
+    directory = settings.METRICS_DIR
+    pid = os.getpid()
+
+    # a forked process or a changed directory gets a new file
+    if getattr(_local, 'owner', None) != (pid, directory):
+        os.makedirs(directory, exist_ok=True)
+        _local.values = MmapedValues(os.path.join(directory, f'{pid}_{threading.get_ident()}.db'))
+        _local.owner = (pid, directory)
+
+    return _local.values
+
+
+def _get_key(name: str, labels: t.Dict[str, t.Any]) -> str:
+    return json.dumps([name, sorted((key, str(value)) for key, value in labels.items())])
+
+
+class Metric:
+    type = ''
+    registry: t.Dict[str, Metric] = {}
+
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name = name
+        self.documentation = documentation
+        Metric.registry[name] = self
+
+    def render(self, samples: t.Dict[t.Tuple[str, t.Tuple[t.Tuple[str, str], ...]], float]) -> t.List[str]:
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+
+
+def _format_sample(name: str, labels: t.Iterable[t.Tuple[str, str]], value: float) -> str:
+    labels_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels)
+    return f'{name}{{{labels_text}}} {value!r}' if labels_text else f'{name} {value!r}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels: t.Any) -> None:
+        if settings.METRICS_ENABLED:
+            _get_values().inc(_get_key(self.name, labels), amount)
+
+    def render(self, samples: t.Dict[t.Tuple[str, t.Tuple[t.Tuple[str, str], ...]], float]) -> t.List[str]:
+        return super().render(samples) + [
+            _format_sample(name, labels, value) for (name, labels), value in sorted(samples.items())
+            if name == self.name
+        ]
+
+
+class Histogram(Metric):
+    type = 'histogram'
+    default_buckets = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+    def __init__(self, name: str, documentation: str, buckets: t.Sequence[float] = default_buckets) -> None:
+        super().__init__(name, documentation)
+        self.buckets = (*sorted(buckets), float('inf'))
+
+    def observe(self, value: float, **labels: t.Any) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+
+        values = _get_values()
+        # buckets are stored not cumulative, so an observation is 3 writes regardless of the number of buckets
+        bucket = next(bucket for bucket in self.buckets if value <= bucket)
+
+        values.inc(_get_key(f'{self.name}_bucket', {**labels, 'le': bucket}), 1)
+        values.inc(_get_key(f'{self.name}_sum', labels), value)
+        values.inc(_get_key(f'{self.name}_count', labels), 1)
+
+    def render(self, samples: t.Dict[t.Tuple[str, t.Tuple[t.Tuple[str, str], ...]], float]) -> t.List[str]:
+        lines = super().render(samples)
+        buckets: t.Dict[t.Tuple[t.Tuple[str, str], ...], t.Dict[float, float]] = defaultdict(dict)
+
+        for (name, labels), value in samples.items():
+            if name == f'{self.name}_bucket':
+                le = float(dict(labels)['le'])
+                buckets[tuple(label for label in labels if label[0] != 'le')][le] = value
+
+        for labels in sorted({labels for name, labels in samples if name == f'{self.name}_count'}):
+            cumulative = 0.0
+
+            for bucket in self.buckets:
+                cumulative += buckets[labels].get(bucket, 0.0)
+                le = '+Inf' if bucket == float('inf') else repr(bucket)
+                lines.append(_format_sample(f'{self.name}_bucket', (*labels, ('le', le)), cumulative))
+
+            lines.append(_format_sample(f'{self.name}_sum', labels, samples[(f'{self.name}_sum', labels)]))
+            lines.append(_format_sample(f'{self.name}_count', labels, samples[(f'{self.name}_count', labels)]))
+
+        return lines
+
+
+def collect() -> str:
+    samples: t.Dict[t.Tuple[str, t.Tuple[t.Tuple[str, str], ...]], float] = defaultdict(float)
+
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.db')):
+        for key, value in read_values(path):
+            name, labels = json.loads(key)
+            samples[(name, tuple(tuple(label) for label in labels))] += value
+
+    lines = []
+
+    for name in sorted(Metric.registry):
+        lines.extend(Metric.registry[name].render(samples))
+
+    return '\n'.join(lines) + '\n'
+
+
+def _is_scraper(request: HttpRequest) -> bool:
+    token = settings.METRICS_TOKEN
+
+    if token and hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return True
+
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+
+    return any(address in ipaddress.ip_network(network.strip()) for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    if not settings.METRICS_ENABLED:
+        raise Http404()
+
+    if not _is_scraper(request):
+        return HttpResponseForbidden()
+
+    return HttpResponse(collect(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+http_requests_total = Counter('http_requests_total', 'Number of handled requests.')
+http_request_errors_total = Counter('http_request_errors_total', 'Number of requests failed with 5xx status.')
+http_request_duration_seconds = Histogram('http_request_duration_seconds', 'Request handling time in seconds.')
+
+
+def get_view_name(view_func: t.Callable, method: str) -> str:
+    """
+    Name of the view handling the request, `ViewSet.action` for viewsets, e.g. `ResourcesView.create`.
+    """
+    view_class = getattr(view_func, 'cls', None)
+
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+
+    # viewsets map methods to actions
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method.lower(), method.lower())}'
+
+
+class MetricsMiddleware:
+    """
+    Counts requests and their latency by view (`ResourcesView.create`, `AuthViewSet.obtain_jwt`, ...).
+    Requests not resolved to a view are counted as `unresolved`. Enabled by `METRICS_ENABLED`.
+    """
+
+    def __init__(self, get_response: t.Callable[[HttpRequest], HttpResponse]) -> None:
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        started = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        view = getattr(request, '_metrics_view', 'unresolved')
+
+        http_requests_total.inc(view=view, method=request.method, status=response.status_code)
+        http_request_duration_seconds.observe(duration, view=view)
+
+        if response.status_code >= 500:
+            http_request_errors_total.inc(view=view)
+
+        return response
+
+    def process_view(self, request: HttpRequest, view_func: t.Callable, *args: t.Any) -> None:
+        request._metrics_view = get_view_name(view_func, request.method)
@@ -0,0 +1,315 @@
+"""
+Sampling profiler of live requests.
+
+A background thread of the worker process takes stacks of threads handling profiled requests every
+`PROFILING_INTERVAL` seconds, so a profiled request is not slowed down by tracing. Stacks are aggregated by view
+(`ResourcesView.create`, `AuthViewSet.register`, ...) and written in collapsed format (`frame;frame;frame count`,
+the input of flamegraph.pl and speedscope) to `PROFILING_DIR`.
+
+A request is profiled if it is sampled by the sample rate of the worker or there is an active profile session
+of its view. Both are state of the worker process handling the request.
+"""
+from __future__ import annotations
+
+import collections
+import os
+import random
+import sys
+import threading
+import time
+import typing as t
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse
+from django.urls import (
+    URLPattern,
+    URLResolver,
+    get_resolver,
+)
+
+from .metrics import get_view_name
+
+
+__all__ = (
+    'ProfilingMiddleware',
+    'ProfileSession',
+    'get_view_names',
+    'profiler',
+)
+
+
+Stacks = t.Counter[str]
+
+
+def _collapse(frame: t.Any) -> str:
+    frames = []
+
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f'{code.co_name} ({code.co_filename}:{frame.f_lineno})')
+        frame = frame.f_back
+
+    return ';'.join(reversed(frames))
+
+
+def _format(stacks: Stacks) -> str:
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+
+class ProfileSession:
+    """
+    Time-boxed profile of every request of one view.
+    """
+
+    def __init__(self, view: str, duration: float) -> None:
+        self.id = uuid.uuid4().hex
+        self.view = view
+        self.started = time.time()
+        self.ends = self.started + duration
+        self.stacks: Stacks = collections.Counter()
+        self.requests = 0
+        self.written = False
+
+    @property
+    def finished(self) -> bool:
+        return time.time() >= self.ends
+
+    def as_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            'id': self.id,
+            'view': self.view,
+            'started': self.started,
+            'ends': self.ends,
+            'finished': self.finished,
+            'requests': self.requests,
+            'samples': sum(list(self.stacks.values())),
+        }
+
+
+class Profiler:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid: t.Optional[int] = None
+        # thread identifier -> sampled view (if the request is sampled by the rate) and stacks of its sessions
+        self._threads: t.Dict[int, t.Tuple[t.Optional[str], t.List[Stacks]]] = {}
+        self._views: t.Dict[str, Stacks] = collections.defaultdict(collections.Counter)
+        self._sessions: t.Dict[str, ProfileSession] = {}
+        self._changed: t.Set[str] = set()
+        self._flushed = 0.0
+        self._sample_rate: t.Optional[float] = None
+
+    @property
+    def sample_rate(self) -> float:
+        return settings.PROFILING_SAMPLE_RATE if self._sample_rate is None else self._sample_rate
+
+    @sample_rate.setter
+    def sample_rate(self, value: t.Optional[float]) -> None:
+        """
+        Overrides `PROFILING_SAMPLE_RATE` for the worker process, `None` resets it to the setting
+        """
+        self._sample_rate = value
+
+    def start_session(self, view: str, duration: float) -> ProfileSession:
+        session = ProfileSession(view, duration)
+
+        with self._lock:
+            self._prune_sessions()
+            self._sessions[session.id] = session
+
+        return session
+
+    def _prune_sessions(self) -> None:
+        # finished sessions are dropped after `PROFILING_SESSION_TTL`, so the worker does not keep all of them
+        now = time.time()
+        finished = [session for session in self._sessions.values() if now >= session.ends]
+        expired = len(finished) - settings.PROFILING_MAX_FINISHED_SESSIONS
+
+        # the earliest finished ones go first when there are too many
+        for session in sorted(finished, key=lambda session: session.ends):
+            if expired <= 0 and now - session.ends < settings.PROFILING_SESSION_TTL:
+                break
+
+            del self._sessions[session.id]
+            expired -= 1
+
+    def get_session(self, session_id: str) -> t.Optional[ProfileSession]:
+        return self._sessions.get(session_id)
+
+    def get_sessions(self) -> t.List[ProfileSession]:
+        return list(self._sessions.values())
+
+    def get_collapsed(self, session: ProfileSession) -> str:
+        # requests begun before the end of the session may still be sampled
+        with self._lock:
+            return _format(session.stacks)
+
+    def get_views_samples(self) -> t.Dict[str, int]:
+        with self._lock:
+            return {view: sum(stacks.values()) for view, stacks in self._views.items()}
+
+    def begin(self, view: str) -> bool:
+        """
+        Starts sampling of the current thread if the request of the view is profiled
+        """
+        sessions = [
+            session for session in list(self._sessions.values())
+            if session.view == view and not session.finished
+        ]
+        sample_rate = self.sample_rate
+        sampled = bool(sample_rate) and random.random() < sample_rate
+
+        if not sessions and not sampled:
+            return False
+
+        with self._lock:
+            for session in sessions:
+                session.requests += 1
+
+            self._threads[threading.get_ident()] = (view if sampled else None,
+                                                    [session.stacks for session in sessions])
+
+        self._ensure_sampler()
+        self._wakeup.set()
+        return True
+
+    def end(self) -> None:
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+
+    def flush(self) -> None:
+        """
+        Writes collapsed stacks of views sampled since the last flush and of finished sessions
+        """
+        directory = settings.PROFILING_DIR
+        os.makedirs(directory, exist_ok=True)
+
+        with self._lock:
+            views = {view: _format(self._views[view]) for view in self._changed}
+            sessions = {
+                session: _format(session.stacks) for session in self._sessions.values()
+                if session.finished and not session.written
+            }
+            self._changed = set()
+            self._flushed = time.monotonic()
+
+        # every worker process writes its own files
+        pid = os.getpid()
+
+        for view, collapsed in views.items():
+            self._write(os.path.join(directory, f'{view}.{pid}.collapsed'), collapsed)
+
+        for session, collapsed in sessions.items():
+            self._write(os.path.join(directory, f'session.{session.view}.{session.id}.collapsed'), collapsed)
+            session.written = True
+
+    def _write(self, path: str, content: str) -> None:
+        # readers never see a partially written file
+        with open(f'{path}.tmp', 'w') as collapsed_file:
+            collapsed_file.write(content)
+
+        os.replace(f'{path}.tmp', path)
+
+    def _ensure_sampler(self) -> None:
+        # threads do not survive fork, a forked worker starts its own sampler
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            self._pid = os.getpid()
+            threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True).start()
+
+    def _sample_loop(self) -> None:
+        while True:
+            if not self._threads:
+                # cleared before the check, so a request begun after the check wakes the sampler up
+                self._wakeup.clear()
+
+                if not self._threads:
+                    self.flush()
+                    self._wakeup.wait(settings.PROFILING_FLUSH_INTERVAL)
+
+                continue
+
+            frames = sys._current_frames()
+
+            with self._lock:
+                for thread_ident, (view, sessions_stacks) in self._threads.items():
+                    frame = frames.get(thread_ident)
+
+                    if frame is None:
+                        continue
+
+                    stack = _collapse(frame)
+
+                    for stacks in sessions_stacks:
+                        stacks[stack] += 1
+
+                    if view is not None:
+                        self._views[view][stack] += 1
+                        self._changed.add(view)
+
+            # frames keep their locals alive
+            del frames
+
+            if time.monotonic() - self._flushed >= settings.PROFILING_FLUSH_INTERVAL:
+                self.flush()
+
+            time.sleep(settings.PROFILING_INTERVAL)
+
+
+profiler = Profiler()
+
+
+def _iter_view_names(patterns: t.Iterable[t.Any]) -> t.Iterator[str]:
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _iter_view_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            view_class = getattr(pattern.callback, 'cls', None)
+
+            if view_class is None:
+                yield get_view_name(pattern.callback, 'get')
+                continue
+
+            methods = getattr(pattern.callback, 'actions', None) or [
+                method for method in view_class.http_method_names if hasattr(view_class, method)
+            ]
+
+            for method in methods:
+                yield get_view_name(pattern.callback, method)
+
+
+def get_view_names() -> t.Set[str]:
+    """
+    Names of all the views that can be profiled
+    """
+    return set(_iter_view_names(get_resolver().url_patterns))
+
+
+class ProfilingMiddleware:
+    """
+    Samples stacks of profiled requests. Enabled by `PROFILING_ENABLED`, requests are profiled only if
+    `PROFILING_SAMPLE_RATE` is set or profiling is started by `api/v1/profiling` endpoint.
+    """
+
+    def __init__(self, get_response: t.Callable[[HttpRequest], HttpResponse]) -> None:
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        try:
+            return self.get_response(request)
+        finally:
+            if getattr(request, '_profiled', False):
+                profiler.end()
+
+    def process_view(self, request: HttpRequest, view_func: t.Callable, *args: t.Any) -> None:
+        request._profiled = profiler.begin(get_view_name(view_func, request.method))
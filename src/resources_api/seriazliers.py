@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import typing as t
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .profiling import get_view_names
+
+
+__all__ = (
+    'BatchSerializer',
+    'ProfilingSerializer',
+    'ProfileSessionSerializer',
+)
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=('GET', 'POST', 'PUT', 'PATCH', 'DELETE'))
+    # path with query string, e.g. /api/v1/resources?limit=10
+    path = serializers.CharField()
+    body = serializers.JSONField(allow_null=True, default=None)
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = serializers.ListField(child=SubRequestSerializer(), allow_empty=False)
+    atomic = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value: t.List[t.Dict[str, t.Any]]) -> t.List[t.Dict[str, t.Any]]:
+        max_requests = settings.BATCH_MAX_REQUESTS
+
+        if len(value) > max_requests:
+            raise ValidationError(f'Ensure this field has no more than {max_requests} elements.')
+
+        return value
+
+
+class ProfilingSerializer(serializers.Serializer):
+    # null resets the sample rate of the worker to PROFILING_SAMPLE_RATE setting
+    sample_rate = serializers.FloatField(min_value=0, max_value=1, allow_null=True)
+
+
+class ProfileSessionSerializer(serializers.Serializer):
+    view = serializers.CharField()
+    duration = serializers.FloatField(min_value=0, default=30)
+
+    def validate_view(self, value: str) -> str:
+        if value not in get_view_names():
+            raise ValidationError('Unknown view, expected a name like AuthViewSet.register')
+
+        return value
+
+    def validate_duration(self, value: float) -> float:
+        max_duration = settings.PROFILING_MAX_SESSION_SECONDS
+
+        if value > max_duration:
+            raise ValidationError(f'Ensure this value is less than or equal to {max_duration}.')
+
+        return value
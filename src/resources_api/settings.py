@@ -13,6 +13,10 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 from __future__ import annotations
 
 import os
+import sys
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
 
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -27,6 +31,8 @@ SECRET_KEY = 'p$3lp7#vl@4f@vuwt1!5fi4e!6olwx7+f(xs=-g4_6)gi3*k1z'
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.environ.get('DEBUG', False)
 
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = ['*']
 
 # Application definition
@@ -38,13 +44,17 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
-    'drf_yasg',
     'users',
     'resources',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'resources_api.timing.ServerTimingMiddleware',
+    'resources_api.metrics.MetricsMiddleware',
+    'resources_api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'resources_api.db.replicas.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -77,16 +87,49 @@ WSGI_APPLICATION = 'resources_api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+DB_POOL_ENABLED = os.environ.get('DB_POOL_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'resources_api.db' if DB_POOL_ENABLED else 'django.db.backends.postgresql_psycopg2',
         'NAME': 'postgres',
         'HOST': os.environ.get('DB_HOST', 'localhost'),
         'USER': os.environ.get('DB_USER', 'postgres'),
         'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        # used by `resources_api.db` backend only, connections are returned to the pool at the end of request
+        'POOL': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 0)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            # seconds
+            'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 3600)),
+            # seconds to wait for a free connection when `max_size` connections are in use
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            # none | status | ping
+            'validation': os.environ.get('DB_POOL_VALIDATION', 'status'),
+        },
     }
 }
 
+# Read replicas, comma separated hosts with the same credentials as the primary, see resources_api.db.replicas
+# Tests use the primary database for replicas (`MIRROR`)
+
+DATABASE_REPLICAS = []
+
+for replica_number, replica_host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASE_REPLICAS.append(f'replica_{replica_number}')
+    DATABASES[f'replica_{replica_number}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['resources_api.db.replicas.PrimaryReplicaRouter']
+
+# seconds after a write during which reads of the user go to the primary
+DB_REPLICA_PIN_SECONDS = float(os.environ.get('DB_REPLICA_PIN_SECONDS', 5))
+# the next request of the user may be handled by another worker process, so the cache has to be shared
+DB_REPLICA_PIN_CACHE_ALIAS = 'shared'
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -113,13 +156,170 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     "EXCEPTION_HANDLER": ("resources_api.exceptions.handle_exception"),
+    # see common.throttling, rates are token buckets of the client of the action scope or of the client in general
+    'DEFAULT_THROTTLE_CLASSES': (
+        'common.throttling.ClientThrottle',
+    ),
+    # number of proxies in front of the app adding X-Forwarded-For, the header is not trusted by default,
+    # so clients cannot get fresh rate limit buckets by sending it
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+    'DEFAULT_THROTTLE_RATES': {
+        'user': '100/s',
+        'ip': '200/s',
+        # password hashing
+        'login.ip': '20/min',
+        'register.ip': '20/min',
+        # lock of the quota row of the owner
+        'resources_create.user': '20/s',
+        **dict(
+            rate.split('=', 1) for rate in filter(None, os.environ.get('THROTTLE_RATES', '').split(','))
+        ),
+    },
 }
 
+THROTTLING_ENABLED = os.environ.get('THROTTLING_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+THROTTLING_FILE = os.environ.get('THROTTLING_FILE', os.path.join(tempfile.gettempdir(), 'resources_api_throttling'))
+THROTTLING_SLOTS = int(os.environ.get('THROTTLING_SLOTS', 65536))
+
 CORS_ORIGIN_ALLOW_ALL = True
 
+# API docs (swagger/redoc), see resources_api.docs
+# API-only workers can disable them to skip drf_yasg import and docs routes
+
+API_DOCS_ENABLED = os.environ.get('API_DOCS_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+# Schema artifact written by `manage.py generate_swagger -f json <path>`, generated in process if not set
+API_SCHEMA_FILE = os.environ.get('API_SCHEMA_FILE')
+
+if API_DOCS_ENABLED:
+    INSTALLED_APPS.append('drf_yasg')
+
+SWAGGER_SETTINGS = {
+    'DEFAULT_INFO': 'resources_api.docs.api_info',
+    'SPEC_URL': '/swagger.json',
+}
+
+REDOC_SETTINGS = {
+    'SPEC_URL': '/swagger.json',
+}
+
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # state that has to be seen by all the processes of the app (API workers and jobs): versions of data, users of
+    # the authentication cache and replica pins. The backend has to be set by env (e.g. memcached), files in a private
+    # directory of the host are the default for development and tests only
+    'shared': {
+        'BACKEND': os.environ.get('SHARED_CACHE_BACKEND', 'common.cache.PrivateFileBasedCache'),
+        'LOCATION': os.environ.get('SHARED_CACHE_LOCATION',
+                                   os.path.join(tempfile.gettempdir(), 'resources_api_cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('SHARED_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+    # responses of resources reads, local memory by default, a shared backend can be set by env
+    'resources': {
+        'BACKEND': os.environ.get('RESOURCES_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('RESOURCES_CACHE_LOCATION', 'resources'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('RESOURCES_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+}
+
+# Authentication caches (see users.authentication.CachedJWTAuthentication)
+
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))
+# users are invalidated on their changes by any process, so the cache has to be shared
+AUTH_USER_CACHE_ALIAS = 'shared'
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 30))
+
+# Versions of data used in cache keys and ETags (see common.cache.ChangeVersions), the cache has to be shared
+
+VERSIONS_CACHE_ALIAS = 'shared'
+
+if CACHES['shared']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache':
+    # every worker process would serve its own versions of data, so cached responses and ETags would stay stale
+    raise ImproperlyConfigured('SHARED_CACHE_BACKEND has to be shared by processes, local memory is not')
+
+if 'SHARED_CACHE_BACKEND' not in os.environ and not (DEBUG or TESTING):
+    # the files are shared by the processes of one host only and every write lists the directory to cull it,
+    # so they are not a fallback for production
+    raise ImproperlyConfigured('SHARED_CACHE_BACKEND has to be set (e.g. to memcached) unless DEBUG is on')
+
+# Resources responses cache (see resources.cache)
+
+RESOURCES_CACHE_ENABLED = os.environ.get('RESOURCES_CACHE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+RESOURCES_CACHE_ALIAS = 'resources'
+RESOURCES_CACHE_TIMEOUT = int(os.environ.get('RESOURCES_CACHE_TIMEOUT', 300))
+
+# Search of resources by name (see resources.views.ResourcesView.search)
+
+RESOURCES_SEARCH_MAX_RESULTS = int(os.environ.get('RESOURCES_SEARCH_MAX_RESULTS', 1000))
+
+# Maximum number of ids of multi-get of resources (see resources.views.ResourcesView.multi_get)
+
+RESOURCES_MULTI_GET_MAX_IDS = int(os.environ.get('RESOURCES_MULTI_GET_MAX_IDS', 1000))
+
+# Maximum number of requests of a batch (see resources_api.batch)
+
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+
+# Server-Timing header of API responses (see resources_api.timing)
+
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'false').lower() not in ('0', 'false', 'no')
+SERVER_TIMING_PATH_PREFIX = '/api/v1/'
+# requests slower than the threshold are logged with their slowest queries, not logged if not set
+SERVER_TIMING_SLOW_REQUEST_MS = float(os.environ['SERVER_TIMING_SLOW_REQUEST_MS']) \
+    if os.environ.get('SERVER_TIMING_SLOW_REQUEST_MS') else None
+SERVER_TIMING_SLOW_QUERIES = int(os.environ.get('SERVER_TIMING_SLOW_QUERIES', 5))
+
+# Viewsets exceeding their query budgets (see common.query_budget) raise in tests and are logged otherwise
+
+QUERY_BUDGET_RAISE = os.environ.get('QUERY_BUDGET_RAISE', 'false').lower() not in ('0', 'false', 'no')
+TEST_RUNNER = 'resources_api.test_runner.TestRunner'
+
+# Background jobs (see jobs.queue) are run by `manage.py run_jobs`
+
+JOBS_LEASE_SECONDS = int(os.environ.get('JOBS_LEASE_SECONDS', 300))
+JOBS_MAX_ATTEMPTS = int(os.environ.get('JOBS_MAX_ATTEMPTS', 5))
+JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', 1))
+USERS_PURGE_BATCH_SIZE = 1000
+
+# Bulk users creation (see users.provisioning), passwords are hashed by that many processes
+
+USERS_PROVISION_PROCESSES = int(os.environ.get('USERS_PROVISION_PROCESSES', 0)) or os.cpu_count() or 1
+
+# Prometheus metrics (see resources_api.metrics), files of all worker processes of the host are kept in METRICS_DIR
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'resources_api_metrics'))
+# /metrics is served to clients of the networks (comma separated, local ones by default)
+# and to requests with `Authorization: Bearer <METRICS_TOKEN>` if the token is set
+METRICS_ALLOWED_NETWORKS = list(filter(None, os.environ.get(
+    'METRICS_ALLOWED_NETWORKS', '127.0.0.0/8,::1/128',
+).split(',')))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Sampling profiler (see resources_api.profiling), requests are profiled only if the sample rate is set
+# or a profile session is started by api/v1/profiling endpoint
+
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_INTERVAL = float(os.environ.get('PROFILING_INTERVAL', 0.005))
+PROFILING_FLUSH_INTERVAL = float(os.environ.get('PROFILING_FLUSH_INTERVAL', 10))
+PROFILING_MAX_SESSION_SECONDS = 300
+# finished sessions are kept for the seconds, up to the number of the last ones
+PROFILING_SESSION_TTL = float(os.environ.get('PROFILING_SESSION_TTL', 3600))
+PROFILING_MAX_FINISHED_SESSIONS = int(os.environ.get('PROFILING_MAX_FINISHED_SESSIONS', 100))
+PROFILING_DIR = os.environ.get('PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'resources_api_profiles'))
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
 
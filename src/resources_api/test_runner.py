@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import tempfile
+import typing as t
+import uuid
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+__all__ = (
+    'TestRunner',
+)
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Test runner failing requests that exceed query budgets of their viewset actions, see `common.query_budget`.
+    Rate limits and metrics are disabled, tests of throttling and of metrics enable them. The shared cache is separated
+    from the one of the app, so cached users and versions of the app are not mixed with the ones of the test database.
+    """
+
+    def setup_test_environment(self, **kwargs: t.Any) -> None:
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_RAISE = True
+        settings.THROTTLING_ENABLED = False
+        settings.METRICS_ENABLED = False
+
+        shared_cache = {**settings.CACHES['shared'], 'KEY_PREFIX': f'test-{uuid.uuid4().hex}'}
+
+        if shared_cache['BACKEND'].endswith('FileBasedCache'):
+            self.shared_cache_dir = tempfile.TemporaryDirectory()
+            shared_cache['LOCATION'] = self.shared_cache_dir.name
+
+        settings.CACHES = {**settings.CACHES, 'shared': shared_cache}
+
+    def teardown_test_environment(self, **kwargs: t.Any) -> None:
+        super().teardown_test_environment(**kwargs)
+
+        if hasattr(self, 'shared_cache_dir'):
+            self.shared_cache_dir.cleanup()
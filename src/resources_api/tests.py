@@ -0,0 +1,767 @@
+from __future__ import annotations
+
+import glob
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
+from unittest import skipUnless
+from unittest.mock import patch
+
+import psycopg2
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, connections
+from django.test import (
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_202_ACCEPTED,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_401_UNAUTHORIZED,
+    HTTP_403_FORBIDDEN,
+    HTTP_404_NOT_FOUND,
+    HTTP_429_TOO_MANY_REQUESTS,
+)
+from rest_framework.test import APITestCase
+
+from common.cache import PrivateFileBasedCache
+from common.query_budget import QueryBudgetExceeded
+from common.test_utils import UsersTestMixin, run_in_process
+from common.throttling import TokenBuckets
+from resources.models import ResourceModel
+from resources.views import ResourcesView
+from users.models import UserModel
+
+from .db.pool import ConnectionPool
+from .db.replicas import (
+    PrimaryReplicaRouter,
+    pin_user,
+    set_request_user,
+    use_primary,
+)
+from .metrics import (
+    MmapedValues,
+    http_requests_total,
+    read_values,
+)
+from .profiling import get_view_names, profiler
+
+
+def consume_tokens(path: str, count: int) -> int:
+    buckets = TokenBuckets(path, 1024)
+    return sum(not buckets.consume('client', 25, 0.001) for _ in range(count))
+
+
+class TokenBucketsTest(SimpleTestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'buckets')
+
+    def test_consume(self):
+        buckets = TokenBuckets(self.path, 1024)
+
+        assert [buckets.consume('client', 2, 0.5, now=100) for _ in range(3)] == [0, 0, 2]
+        assert buckets.consume('other', 2, 0.5, now=100) == 0
+        assert buckets.consume('client', 2, 0.5, now=101) == 1
+        assert buckets.consume('client', 2, 0.5, now=102) == 0
+
+    def test_consume_all(self):
+        buckets = TokenBuckets(self.path, 1024)
+
+        assert buckets.consume_all([('user', 2, 0.5), ('ip', 1, 0.5)], now=100) == [0, 0]
+        assert buckets.consume_all([('user', 2, 0.5), ('ip', 1, 0.5)], now=100) == [0, 2]
+        # the rejected request took no token of the other bucket
+        assert buckets.consume('user', 2, 0.5, now=100) == 0
+
+    def test_shared_by_processes(self):
+        with ProcessPoolExecutor(4, mp_context=multiprocessing.get_context('fork')) as pool:
+            allowed = sum(pool.map(consume_tokens, [self.path] * 4, [10] * 4))
+
+        assert allowed == 25
+
+    def test_shared_by_threads(self):
+        buckets = TokenBuckets(self.path, 1024)
+        allowed = []
+
+        def consume() -> None:
+            allowed.append(sum(not buckets.consume('client', 25, 0.001) for _ in range(10)))
+
+        threads = [threading.Thread(target=consume) for _ in range(4)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sum(allowed) == 25
+
+    def test_least_recently_updated_bucket_is_evicted(self):
+        # every key has the same probe window of 8 slots
+        buckets = TokenBuckets(self.path, 1)
+
+        buckets.consume('client', 1, 0.001, now=100)
+        assert buckets.consume('client', 1, 0.001, now=101) > 0
+
+        for i in range(8):
+            buckets.consume(f'other-{i}', 1, 0.001, now=102 + i)
+
+        assert buckets.consume('client', 1, 0.001, now=110) == 0
+
+
+class PrivateFileBasedCacheTest(SimpleTestCase):
+    def test_permissions(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # created by someone else beforehand
+        os.chmod(directory.name, 0o777)
+
+        cache = PrivateFileBasedCache(directory.name, {})
+        cache.set('key', 'value')
+
+        assert os.stat(directory.name).st_mode & 0o777 == 0o700
+        assert all(os.stat(path).st_mode & 0o077 == 0 for path in glob.glob(os.path.join(directory.name, '*')))
+        assert cache.get('key') == 'value'
+
+
+@skipUnless(settings.API_DOCS_ENABLED, 'API docs are disabled')
+class DocsEndpointsTest(APITestCase):
+    def test_schema_json(self):
+        response = self.client.get('/swagger.json')
+
+        assert response.status_code == HTTP_200_OK
+        assert response['ETag']
+        assert '/resources' in response.json()['paths']
+
+    def test_schema_yaml(self):
+        response = self.client.get('/swagger.yaml')
+
+        assert response.status_code == HTTP_200_OK
+        assert response['Content-Type'] == 'application/yaml'
+
+    def test_schema_not_modified(self):
+        etag = self.client.get('/swagger.json')['ETag']
+
+        response = self.client.get('/swagger.json', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == HTTP_304_NOT_MODIFIED
+        assert not response.content
+
+    def test_swagger_ui_uses_precomputed_schema(self):
+        response = self.client.get('/swagger/')
+
+        assert response.status_code == HTTP_200_OK
+        assert b'/swagger.json' in response.content
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    databases = {'default'}
+
+    def create_pool(self, **kwargs) -> ConnectionPool:
+        conn_params = connection.get_connection_params()
+        pool = ConnectionPool(lambda: psycopg2.connect(**conn_params), **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_reuse(self):
+        pool = self.create_pool(max_size=1)
+
+        first = pool.checkout()
+        pool.checkin(first)
+        second = pool.checkout()
+
+        assert first is second
+        assert pool.get_stats()['created'] == 1
+        assert pool.get_stats()['checkouts'] == 2
+
+    def test_min_size(self):
+        pool = self.create_pool(min_size=2, max_size=3)
+
+        assert pool.get_stats()['idle'] == 2
+
+    def test_checkin_rollbacks(self):
+        pool = self.create_pool(max_size=1)
+
+        conn = pool.checkout()
+        conn.cursor().execute('SELECT 1')
+        pool.checkin(conn)
+
+        assert conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def test_broken_connection_replaced(self):
+        pool = self.create_pool(max_size=1, validation='ping')
+
+        conn = pool.checkout()
+        pool.checkin(conn)
+        conn.close()
+
+        assert pool.checkout() is not conn
+        assert pool.get_stats()['validation_failures'] == 1
+
+    def test_expired_connection_replaced(self):
+        pool = self.create_pool(max_size=1, max_lifetime=0)
+
+        conn = pool.checkout()
+        pool.checkin(conn)
+
+        assert pool.checkout() is not conn
+        assert conn.closed
+
+    def test_exhausted(self):
+        pool = self.create_pool(max_size=1, timeout=0.01)
+        pool.checkout()
+
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.checkout()
+
+        assert pool.get_stats()['timeouts'] == 1
+
+    def test_wait_for_checkin(self):
+        pool = self.create_pool(max_size=1, timeout=5)
+        conn = pool.checkout()
+
+        timer = threading.Timer(0.05, pool.checkin, (conn,))
+        timer.start()
+        self.addCleanup(timer.join)
+
+        assert pool.checkout() is conn
+        assert pool.get_stats()['waits'] == 1
+        assert pool.get_stats()['wait_time_max'] > 0
+
+
+@skipUnless(settings.DB_POOL_ENABLED, 'DB pool is disabled')
+class DBPoolStatsTest(UsersTestMixin, APITestCase):
+    def test_admin(self):
+        response = self.admin_client.get('/api/v1/db-pool-stats')
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json()['default'][0]['in_use'] >= 1
+
+    def test_user(self):
+        response = self.user_client.get('/api/v1/db-pool-stats')
+
+        assert response.status_code == HTTP_403_FORBIDDEN
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    def setUp(self) -> None:
+        self.router = PrimaryReplicaRouter()
+        self.addCleanup(set_request_user, None)
+        self.addCleanup(caches[settings.DB_REPLICA_PIN_CACHE_ALIAS].clear)
+
+    def test_read(self):
+        assert self.router.db_for_read(ResourceModel) in ('replica_1', 'replica_2')
+
+    def test_write(self):
+        assert self.router.db_for_write(ResourceModel) == 'default'
+
+    def test_use_primary(self):
+        with use_primary():
+            assert self.router.db_for_read(ResourceModel) == 'default'
+
+        assert self.router.db_for_read(ResourceModel) != 'default'
+
+    def test_pinned_user(self):
+        pin_user(1)
+
+        set_request_user(1)
+        assert self.router.db_for_read(ResourceModel) == 'default'
+
+        set_request_user(2)
+        assert self.router.db_for_read(ResourceModel) != 'default'
+
+    def test_user_pinned_by_another_process(self):
+        run_in_process(pin_user, 1)
+
+        set_request_user(1)
+        assert self.router.db_for_read(ResourceModel) == 'default'
+
+    @override_settings(DB_REPLICA_PIN_SECONDS=0.01)
+    def test_pin_expired(self):
+        pin_user(1)
+        threading.Event().wait(0.02)
+
+        set_request_user(1)
+        assert self.router.db_for_read(ResourceModel) != 'default'
+
+    def test_no_replicas(self):
+        with self.settings(DATABASE_REPLICAS=[]):
+            assert self.router.db_for_read(ResourceModel) == 'default'
+
+    def test_migrate(self):
+        assert self.router.allow_migrate('default', 'resources')
+        assert not self.router.allow_migrate('replica_1', 'resources')
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'DB replicas are not configured (DB_REPLICA_HOSTS)')
+class ReplicaRoutingTest(UsersTestMixin, TransactionTestCase):
+    databases = {'default', *settings.DATABASE_REPLICAS}
+
+    def setUp(self) -> None:
+        caches[settings.DB_REPLICA_PIN_CACHE_ALIAS].clear()
+        super().setUp()
+        caches[settings.DB_REPLICA_PIN_CACHE_ALIAS].clear()
+
+    def capture_replicas_queries(self) -> t.List[CaptureQueriesContext]:
+        contexts = [CaptureQueriesContext(connections[alias]) for alias in settings.DATABASE_REPLICAS]
+
+        for context in contexts:
+            context.__enter__()
+            self.addCleanup(context.__exit__, None, None, None)
+
+        return contexts
+
+    def test_read_from_replica(self):
+        contexts = self.capture_replicas_queries()
+
+        response = self.user_client.get('/api/v1/resources')
+
+        assert response.status_code == HTTP_200_OK
+        assert sum(len(context) for context in contexts) > 0
+
+    def test_read_own_writes(self):
+        response = self.user_client.post('/api/v1/resources', {'name': 'resource'})
+        assert response.status_code == HTTP_201_CREATED
+
+        contexts = self.capture_replicas_queries()
+
+        response = self.user_client.get('/api/v1/resources')
+
+        assert response.status_code == HTTP_200_OK
+        assert [r['name'] for r in response.json()] == ['resource']
+        assert sum(len(context) for context in contexts) == 0
+
+
+@override_settings(SERVER_TIMING_ENABLED=True)
+class ServerTimingTest(UsersTestMixin, APITestCase):
+    def get_metrics(self, response) -> t.Dict[str, str]:
+        return {metric.split(';')[0].strip(): metric for metric in response['Server-Timing'].split(',')}
+
+    def test_header(self):
+        response = self.user_client.get('/api/v1/resources')
+
+        assert set(self.get_metrics(response)) == {'db', 'auth', 'view', 'total'}
+
+    def test_queries_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.admin_client.get('/api/v1/users?limit=10')
+
+        assert f'desc="{len(queries)} queries"' in self.get_metrics(response)['db']
+
+    def test_not_api_path(self):
+        response = self.client.get('/swagger.json')
+
+        assert not response.has_header('Server-Timing')
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_disabled(self):
+        response = self.user_client.get('/api/v1/resources')
+
+        assert not response.has_header('Server-Timing')
+
+    @override_settings(SERVER_TIMING_SLOW_REQUEST_MS=0, SERVER_TIMING_SLOW_QUERIES=1)
+    def test_slow_request_logged(self):
+        with self.assertLogs('resources_api.timing', 'WARNING') as logs:
+            self.admin_client.get('/api/v1/users?limit=10')
+
+        assert 'Slow request GET /api/v1/users?limit=10 200' in logs.output[0]
+        assert logs.output[0].count(' ms: ') == 1
+
+
+class MetricsStoreTest(SimpleTestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'values.db')
+
+    def test_values(self):
+        values = MmapedValues(self.path)
+        values.inc('a', 1)
+        values.inc('b', 2.5)
+        values.inc('a', 1)
+
+        assert dict(read_values(self.path)) == {'a': 2, 'b': 2.5}
+
+    def test_reopen(self):
+        MmapedValues(self.path).inc('a', 1)
+        MmapedValues(self.path).inc('a', 1)
+
+        assert dict(read_values(self.path)) == {'a': 2}
+
+    def test_grow(self):
+        values = MmapedValues(self.path)
+
+        for i in range(5000):
+            values.inc(f'key-{i}', i)
+
+        assert dict(read_values(self.path)) == {f'key-{i}': i for i in range(5000)}
+
+
+class MetricsTest(UsersTestMixin, APITestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        settings_override = self.settings(METRICS_ENABLED=True, METRICS_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        super().setUp()
+
+    def get_metrics(self) -> str:
+        response = self.client.get('/metrics')
+
+        assert response.status_code == HTTP_200_OK
+        return response.content.decode()
+
+    def test_not_allowed_network(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+
+        assert response.status_code == HTTP_403_FORBIDDEN
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=[], METRICS_TOKEN='secret')
+    def test_token(self):
+        assert self.client.get('/metrics').status_code == HTTP_403_FORBIDDEN
+        assert self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code == HTTP_403_FORBIDDEN
+        assert self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code == HTTP_200_OK
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        assert self.client.get('/metrics').status_code == HTTP_404_NOT_FOUND
+
+    def test_requests_by_action(self):
+        self.user_client.post('/api/v1/resources', {'name': 'resource'})
+        self.user_client.get('/api/v1/resources')
+
+        metrics = self.get_metrics()
+
+        assert 'http_requests_total{method="POST",status="201",view="ResourcesView.create"} 1.0' in metrics
+        assert 'http_requests_total{method="GET",status="200",view="ResourcesView.list"} 1.0' in metrics
+        assert 'http_request_duration_seconds_count{view="ResourcesView.create"} 1.0' in metrics
+        assert 'http_request_duration_seconds_bucket{view="ResourcesView.create",le="+Inf"} 1.0' in metrics
+
+    def test_login_action(self):
+        metrics = self.get_metrics()
+
+        # both clients of UsersTestMixin log in
+        assert 'http_requests_total{method="POST",status="201",view="AuthViewSet.obtain_jwt"} 2.0' in metrics
+
+    def test_quota(self):
+        self.user.options.quota = 0
+        self.user.options.save()
+
+        self.user_client.post('/api/v1/resources', {'name': 'resource'})
+
+        metrics = self.get_metrics()
+
+        assert 'resources_quota_exceeded_total 1.0' in metrics
+        assert 'resources_quota_lock_wait_seconds_count{operation="acquire"} 1.0' in metrics
+
+    def test_threads_aggregated(self):
+        threads = [threading.Thread(target=http_requests_total.inc, kwargs={'view': 'test'}) for _ in range(3)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert 'http_requests_total{view="test"} 3.0' in self.get_metrics()
+
+
+list_resources = ResourcesView.list
+
+
+def slow_list(self, request, *args, **kwargs):
+    time.sleep(0.05)
+    return list_resources(self, request, *args, **kwargs)
+
+
+@patch.object(ResourcesView, 'list', slow_list)
+class ProfilingTest(UsersTestMixin, APITestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        settings_override = self.settings(PROFILING_DIR=directory.name, PROFILING_INTERVAL=0.001)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.addCleanup(setattr, profiler, 'sample_rate', None)
+
+        super().setUp()
+
+    def test_view_names(self):
+        view_names = get_view_names()
+
+        assert {'AuthViewSet.register', 'ResourcesView.list', 'DBPoolStatsView.get'} <= view_names
+
+    def test_session(self):
+        response = self.admin_client.post('/api/v1/profiling/sessions', {'view': 'ResourcesView.list', 'duration': 0.5})
+
+        assert response.status_code == HTTP_201_CREATED
+
+        session = response.json()
+        self.user_client.get('/api/v1/resources')
+
+        response = self.admin_client.get(f'/api/v1/profiling/sessions/{session["id"]}')
+
+        assert response.status_code == HTTP_202_ACCEPTED
+        assert response.json()['requests'] == 1
+
+        time.sleep(max(session['ends'] - time.time(), 0))
+        response = self.admin_client.get(f'/api/v1/profiling/sessions/{session["id"]}')
+
+        assert response.status_code == HTTP_200_OK
+        assert response['Content-Disposition'].startswith('attachment')
+        assert 'slow_list' in response.content.decode()
+
+    @override_settings(PROFILING_SESSION_TTL=60, PROFILING_MAX_FINISHED_SESSIONS=2)
+    def test_finished_sessions_dropped(self):
+        self.addCleanup(setattr, profiler, '_sessions', profiler._sessions)
+        profiler._sessions = {}
+        sessions = [profiler.start_session('ResourcesView.list', 0) for _ in range(3)]
+        running = profiler.start_session('ResourcesView.list', 60)
+
+        assert profiler.get_sessions() == [*sessions[1:], running]
+
+        sessions[1].ends -= 60
+        profiler.start_session('ResourcesView.list', 60)
+
+        assert profiler.get_session(sessions[1].id) is None
+        assert profiler.get_session(sessions[2].id) is sessions[2]
+        assert profiler.get_session(running.id) is running
+
+    def test_session_unknown_view(self):
+        response = self.admin_client.post('/api/v1/profiling/sessions', {'view': 'UnknownView.list'})
+
+        assert response.status_code == HTTP_400_BAD_REQUEST
+        assert 'view' in response.json()
+
+    def test_sample_rate(self):
+        response = self.admin_client.patch('/api/v1/profiling', {'sample_rate': 1})
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json()['sample_rate'] == 1
+
+        self.user_client.get('/api/v1/resources')
+        profiler.flush()
+
+        assert self.admin_client.get('/api/v1/profiling').json()['views']['ResourcesView.list'] > 0
+
+        with open(os.path.join(settings.PROFILING_DIR, f'ResourcesView.list.{os.getpid()}.collapsed')) as collapsed:
+            assert 'slow_list' in collapsed.read()
+
+    def test_user(self):
+        assert self.user_client.get('/api/v1/profiling').status_code == HTTP_403_FORBIDDEN
+        assert self.user_client.patch('/api/v1/profiling', {'sample_rate': 1}).status_code == HTTP_403_FORBIDDEN
+
+
+class ThrottlingTest(UsersTestMixin, APITestCase):
+    def setUp(self) -> None:
+        super().setUp()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        settings_override = self.settings(THROTTLING_ENABLED=True,
+                                          THROTTLING_FILE=os.path.join(directory.name, 'buckets'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def set_rates(self, **rates: str) -> None:
+        settings_override = self.settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def login(self) -> t.Any:
+        return self.client.post('/api/v1/auth/login', {'email': self.user_email, 'password': self.user_password})
+
+    def test_login_by_ip(self):
+        self.set_rates(**{'login.ip': '2/min', 'ip': '100/s'})
+
+        assert [self.login().status_code for _ in range(2)] == [HTTP_201_CREATED] * 2
+
+        response = self.login()
+
+        assert response.status_code == HTTP_429_TOO_MANY_REQUESTS
+        assert response['Retry-After'] == '30'
+        # other actions have their own buckets
+        assert self.client.get('/api/v1/resources').status_code != HTTP_429_TOO_MANY_REQUESTS
+
+    def test_login_by_forwarded_ip(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1,
+                                               'DEFAULT_THROTTLE_RATES': {'login.ip': '1/min'}}):
+            statuses = [
+                self.client.post('/api/v1/auth/login', {'email': self.user_email, 'password': self.user_password},
+                                 HTTP_X_FORWARDED_FOR=ip).status_code
+                for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.1')
+            ]
+
+        assert statuses == [HTTP_201_CREATED, HTTP_201_CREATED, HTTP_429_TOO_MANY_REQUESTS]
+
+    def test_spoofed_forwarded_ip(self):
+        self.set_rates(**{'login.ip': '2/min'})
+
+        statuses = [
+            self.client.post('/api/v1/auth/login', {'email': self.user_email, 'password': self.user_password},
+                             HTTP_X_FORWARDED_FOR=ip).status_code
+            for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3')
+        ]
+
+        assert statuses == [HTTP_201_CREATED, HTTP_201_CREATED, HTTP_429_TOO_MANY_REQUESTS]
+
+    def test_rejected_request_takes_no_token(self):
+        self.set_rates(user='2/min', ip='1/min')
+
+        assert self.user_client.get('/api/v1/users/me').status_code == HTTP_200_OK
+        assert self.user_client.get('/api/v1/users/me').status_code == HTTP_429_TOO_MANY_REQUESTS
+
+        # the user bucket still has a token for a request from another address
+        assert self.user_client.get('/api/v1/users/me', REMOTE_ADDR='10.0.0.1').status_code == HTTP_200_OK
+
+    def test_resource_create_by_user(self):
+        self.set_rates(**{'resources_create.user': '1/min', 'user': '100/s'})
+
+        assert self.user_client.post('/api/v1/resources', {'name': 'first'}).status_code == HTTP_201_CREATED
+        assert self.user_client.post('/api/v1/resources', {'name': 'second'}).status_code == \
+            HTTP_429_TOO_MANY_REQUESTS
+        assert self.user_client.post('/api/v1/resources/bulk', {'names': ['third']}, format='json').status_code == \
+            HTTP_429_TOO_MANY_REQUESTS
+        assert self.user_client.get('/api/v1/resources').status_code == HTTP_200_OK
+        assert self.admin_client.post('/api/v1/resources', {'name': 'admin'}).status_code == HTTP_201_CREATED
+
+    def test_default_rate_by_user(self):
+        self.set_rates(user='2/min')
+
+        statuses = [self.user_client.get('/api/v1/users/me').status_code for _ in range(3)]
+
+        assert statuses == [HTTP_200_OK, HTTP_200_OK, HTTP_429_TOO_MANY_REQUESTS]
+        assert self.admin_client.get('/api/v1/users/me').status_code == HTTP_200_OK
+
+    def test_disabled(self):
+        self.set_rates(**{'login.ip': '1/min'})
+
+        with override_settings(THROTTLING_ENABLED=False):
+            assert [self.login().status_code for _ in range(3)] == [HTTP_201_CREATED] * 3
+
+
+class BatchTest(UsersTestMixin, APITestCase):
+    def batch(self, *requests: t.Dict[str, t.Any], atomic: bool = False, client=None):
+        client = client or self.user_client
+        return client.post('/api/v1/batch', {'requests': requests, 'atomic': atomic}, format='json')
+
+    def test_batch(self):
+        response = self.batch(
+            {'method': 'GET', 'path': '/api/v1/users/me'},
+            {'method': 'POST', 'path': '/api/v1/resources', 'body': {'name': 'first'}},
+            {'method': 'POST', 'path': '/api/v1/resources', 'body': {'name': 'second'}},
+            {'method': 'GET', 'path': '/api/v1/resources?limit=10'},
+        )
+        me, first, second, resources = response.json()['responses']
+
+        assert response.status_code == HTTP_200_OK
+        assert not response.json()['rolled_back']
+        assert [me['status'], first['status'], second['status'], resources['status']] == \
+            [HTTP_200_OK, HTTP_201_CREATED, HTTP_201_CREATED, HTTP_200_OK]
+        assert me['body']['email'] == self.user_email
+        assert first['body']['owner_id'] == self.user.id
+        assert {resource['name'] for resource in resources['body']['results']} == {'first', 'second'}
+        assert all(sub_response['duration_ms'] >= 0 for sub_response in response.json()['responses'])
+
+    def test_atomic_rolled_back(self):
+        self.user.options.quota = 1
+        self.user.options.save()
+
+        response = self.batch(
+            {'method': 'POST', 'path': '/api/v1/resources', 'body': {'name': 'first'}},
+            {'method': 'POST', 'path': '/api/v1/resources', 'body': {'name': 'second'}},
+            {'method': 'GET', 'path': '/api/v1/users/me'},
+            atomic=True,
+        )
+
+        assert response.json()['rolled_back']
+        assert [sub_response['status'] for sub_response in response.json()['responses']] == \
+            [HTTP_201_CREATED, HTTP_403_FORBIDDEN]
+        assert not ResourceModel.objects.filter(owner=self.user).exists()
+
+    def test_atomic_rolled_back_data_not_cached(self):
+        self.user.options.quota = 1
+        self.user.options.save()
+
+        response = self.batch(
+            {'method': 'POST', 'path': '/api/v1/resources', 'body': {'name': 'first'}},
+            {'method': 'GET', 'path': '/api/v1/resources'},
+            {'method': 'POST', 'path': '/api/v1/resources', 'body': {'name': 'second'}},
+            atomic=True,
+        )
+        etag = response.json()['responses'][1]['headers']['ETag']
+
+        assert response.json()['rolled_back']
+        assert [resource['name'] for resource in response.json()['responses'][1]['body']] == ['first']
+        assert self.user_client.get('/api/v1/resources').json() == []
+        assert self.user_client.get('/api/v1/resources', HTTP_IF_NONE_MATCH=etag).status_code == HTTP_200_OK
+
+    def test_query_budget_exceeded_raises(self):
+        with patch.dict(ResourcesView.action2query_budget, list=0), \
+                self.assertRaises(QueryBudgetExceeded):
+            self.batch({'method': 'GET', 'path': '/api/v1/resources'})
+
+    def test_not_atomic_continues_after_failure(self):
+        response = self.batch(
+            {'method': 'GET', 'path': '/api/v1/users'},
+            {'method': 'POST', 'path': '/api/v1/resources', 'body': {'name': 'first'}},
+        )
+
+        assert not response.json()['rolled_back']
+        assert [sub_response['status'] for sub_response in response.json()['responses']] == \
+            [HTTP_403_FORBIDDEN, HTTP_201_CREATED]
+        assert ResourceModel.objects.filter(owner=self.user, name='first').exists()
+
+    def test_sub_requests_of_batch_user(self):
+        resource = ResourceModel.objects.create(name='admin', owner=self.admin)
+
+        response = self.batch({'method': 'DELETE', 'path': f'/api/v1/resources/{resource.id}'})
+
+        assert response.json()['responses'][0]['status'] == HTTP_404_NOT_FOUND
+        assert ResourceModel.objects.filter(id=resource.id).exists()
+
+    def test_unknown_path(self):
+        response = self.batch(
+            {'method': 'GET', 'path': '/api/v1/unknown'},
+            {'method': 'GET', 'path': '/metrics'},
+        )
+
+        assert [sub_response['status'] for sub_response in response.json()['responses']] == \
+            [HTTP_404_NOT_FOUND, HTTP_404_NOT_FOUND]
+
+    def test_not_supported_sub_requests(self):
+        response = self.batch(
+            {'method': 'POST', 'path': '/api/v1/batch', 'body': {'requests': []}},
+            {'method': 'GET', 'path': '/api/v1/resources/export?format=ndjson'},
+        )
+
+        assert [sub_response['status'] for sub_response in response.json()['responses']] == \
+            [HTTP_400_BAD_REQUEST, HTTP_400_BAD_REQUEST]
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_too_many_requests(self):
+        response = self.batch(*[{'method': 'GET', 'path': '/api/v1/users/me'}] * 3)
+
+        assert response.status_code == HTTP_400_BAD_REQUEST
+        assert 'requests' in response.json()
+
+    def test_anonymous(self):
+        response = self.batch({'method': 'GET', 'path': '/api/v1/users/me'}, client=self.client)
+
+        assert response.status_code == HTTP_401_UNAUTHORIZED
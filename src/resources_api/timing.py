@@ -0,0 +1,143 @@
+"""
+Per-request timing of API requests reported in `Server-Timing` header:
+* `db` - time of SQL queries, number of queries in the description
+* `auth` - time of authentication
+* `view` - time of the view including rendering of the response
+* `total` - time of the whole request handling by the middleware stack
+
+Requests slower than `SERVER_TIMING_SLOW_REQUEST_MS` are logged with their slowest SQL queries.
+"""
+from __future__ import annotations
+
+import contextlib
+import heapq
+import logging
+import threading
+import time
+import typing as t
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+
+__all__ = (
+    'ServerTimingMiddleware',
+    'measure',
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTimings:
+    def __init__(self, slow_queries: int) -> None:
+        self.durations: t.Dict[str, float] = {}
+        self.queries = 0
+        self.db_time = 0.0
+        # min-heap of (duration, sql) of the slowest queries, kept only if slow requests are logged
+        self.slowest_queries: t.List[t.Tuple[float, str]] = []
+        self.slow_queries = slow_queries
+
+    def add(self, name: str, duration: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+
+    def execute_wrapper(self, execute: t.Callable, sql: str, params: t.Any, many: bool,
+                        context: t.Dict[str, t.Any]) -> t.Any:
+        started = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += duration
+
+            if self.slow_queries:
+                if len(self.slowest_queries) < self.slow_queries:
+                    heapq.heappush(self.slowest_queries, (duration, sql))
+                elif duration > self.slowest_queries[0][0]:
+                    heapq.heapreplace(self.slowest_queries, (duration, sql))
+
+    def get_header(self) -> str:
+        metrics = [f'db;dur={self.db_time * 1000:.3f};desc="{self.queries} queries"']
+        metrics.extend(f'{name};dur={duration * 1000:.3f}' for name, duration in self.durations.items())
+        return ', '.join(metrics)
+
+
+_state = threading.local()
+
+
+@contextlib.contextmanager
+def measure(name: str) -> t.Iterator[None]:
+    """
+    Adds duration of the block to `name` metric of the current request, does nothing outside of a timed request.
+    """
+    timings = getattr(_state, 'timings', None)
+
+    if timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+class ServerTimingMiddleware:
+    """
+    Adds `Server-Timing` header to responses of requests to `SERVER_TIMING_PATH_PREFIX`.
+    Enabled by `SERVER_TIMING_ENABLED`, should be the first middleware, so `total` covers all the others.
+    """
+
+    def __init__(self, get_response: t.Callable[[HttpRequest], HttpResponse]) -> None:
+        if not settings.SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.slow_request_ms = settings.SERVER_TIMING_SLOW_REQUEST_MS
+        self.slow_queries = settings.SERVER_TIMING_SLOW_QUERIES if self.slow_request_ms is not None else 0
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if not request.path.startswith(settings.SERVER_TIMING_PATH_PREFIX):
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        timings = _state.timings = RequestTimings(self.slow_queries)
+
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings.execute_wrapper))
+
+                response = self.get_response(request)
+        finally:
+            _state.timings = None
+
+        if hasattr(request, '_view_started'):
+            timings.add('view', time.perf_counter() - request._view_started)
+
+        timings.add('total', time.perf_counter() - started)
+        response['Server-Timing'] = timings.get_header()
+
+        if self.slow_request_ms is not None and timings.durations['total'] * 1000 >= self.slow_request_ms:
+            self._log_slow_request(request, response, timings)
+
+        return response
+
+    def process_view(self, request: HttpRequest, *args: t.Any) -> None:
+        request._view_started = time.perf_counter()
+
+    def _log_slow_request(self, request: HttpRequest, response: HttpResponse, timings: RequestTimings) -> None:
+        queries = '\n'.join(f'  {duration * 1000:.3f} ms: {sql}'
+                            for duration, sql in sorted(timings.slowest_queries, reverse=True))
+
+        logger.warning(
+            'Slow request %s %s %s: %.3f ms, %d queries in %.3f ms\n%s',
+            request.method, request.get_full_path(), response.status_code, timings.durations['total'] * 1000,
+            timings.queries, timings.db_time * 1000, queries,
+        )
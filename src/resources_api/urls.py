@@ -16,34 +16,38 @@ Including another URLconf
 from __future__ import annotations
 
 # from django.contrib import admin
+from django.conf import settings
 from django.conf.urls import url
 from django.urls import include
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
 
 from resources.urls import urlpatterns as resources_urlspatterns
 from users.urls import auth_urlpatterns, users_urlpatterns
 
+from .metrics import metrics_view
+from .views import BatchView, DBPoolStatsView
 
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Snippets API",
-      default_version='v1',
-      description="Test description",
-      terms_of_service="https://www.google.com/policies/terms/",
-      contact=openapi.Contact(email="contact@snippets.local"),
-      license=openapi.License(name="BSD License"),
-   ),
-   public=True,
-   permission_classes=(permissions.AllowAny,),
-)
 
 urlpatterns = [
     url(r'^api/v1/auth', include(auth_urlpatterns)),
     url(r'^api/v1/users', include(users_urlpatterns)),
     url(r'^api/v1/resources', include(resources_urlspatterns)),
-    url(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    url(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    url(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    url(r'^api/v1/batch$', BatchView.as_view()),
+    url(r'^api/v1/db-pool-stats$', DBPoolStatsView.as_view()),
 ]
+
+if settings.PROFILING_ENABLED:
+    from .views import ProfileSessionView, ProfileSessionsView, ProfilingView
+
+    urlpatterns += [
+        url(r'^api/v1/profiling$', ProfilingView.as_view()),
+        url(r'^api/v1/profiling/sessions$', ProfileSessionsView.as_view()),
+        url(r'^api/v1/profiling/sessions/(?P<session_id>[0-9a-f]+)$', ProfileSessionView.as_view()),
+    ]
+
+# responds 404 if metrics are disabled, so they can be enabled by tests after the URLconf is loaded
+urlpatterns.append(url(r'^metrics$', metrics_view))
+
+if settings.API_DOCS_ENABLED:
+    from .docs import docs_urlpatterns
+
+    urlpatterns += docs_urlpatterns
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from django.http import HttpResponse, JsonResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.status import HTTP_201_CREATED, HTTP_202_ACCEPTED
+from rest_framework.views import APIView
+
+from .batch import run_batch
+from .db.pool import get_pools_stats
+from .profiling import profiler
+from .seriazliers import (
+    BatchSerializer,
+    ProfileSessionSerializer,
+    ProfilingSerializer,
+)
+
+
+__all__ = (
+    'BatchView',
+    'DBPoolStatsView',
+    'ProfilingView',
+    'ProfileSessionsView',
+    'ProfileSessionView',
+)
+
+
+class DBPoolStatsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request: Request) -> JsonResponse:
+        """
+        Usage and wait time of database connection pools of the worker process that handles the request
+        """
+        return JsonResponse(get_pools_stats())
+
+
+class BatchView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request: Request) -> JsonResponse:
+        """
+        Runs API requests `{"method": ..., "path": ..., "body": ...}` in their order as the user of the batch
+        and returns their statuses, headers, bodies and durations. With `atomic` they run in one transaction that is
+        rolled back by the first failed request.
+        """
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return JsonResponse(run_batch(request, **serializer.validated_data))
+
+
+class ProfilingView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request: Request) -> JsonResponse:
+        """
+        Sample rate, number of samples by view and profile sessions of the worker process that handles the request
+        """
+        return JsonResponse({
+            'sample_rate': profiler.sample_rate,
+            'views': profiler.get_views_samples(),
+            'sessions': [session.as_dict() for session in profiler.get_sessions()],
+        })
+
+    def patch(self, request: Request) -> JsonResponse:
+        """
+        Sets sample rate of the worker process that handles the request
+        """
+        serializer = ProfilingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        profiler.sample_rate = serializer.validated_data['sample_rate']
+        return self.get(request)
+
+
+class ProfileSessionsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def post(self, request: Request) -> JsonResponse:
+        """
+        Profiles every request of the view handled by the worker process for `duration` seconds
+        """
+        serializer = ProfileSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        session = profiler.start_session(**serializer.validated_data)
+        return JsonResponse(session.as_dict(), status=HTTP_201_CREATED)
+
+
+class ProfileSessionView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request: Request, session_id: str) -> HttpResponse:
+        """
+        Collapsed stacks of the finished profile session, 202 with the session state while it is running
+        """
+        session = profiler.get_session(session_id)
+
+        if session is None:
+            raise NotFound()
+
+        if not session.finished:
+            return JsonResponse(session.as_dict(), status=HTTP_202_ACCEPTED)
+
+        response = HttpResponse(profiler.get_collapsed(session), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{session.view}.{session.id}.collapsed"'
+        return response
@@ -11,9 +11,16 @@ from __future__ import annotations
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'resources_api.settings')
 
 application = get_wsgi_application()
+
+if settings.API_DOCS_ENABLED:
+    # generate API schema at startup rather than on the first request
+    from resources_api.docs import schema_document
+
+    schema_document.get('.json')
@@ -0,0 +1,4 @@
+from __future__ import annotations
+
+
+default_app_config = 'users.apps.AuthConfig'
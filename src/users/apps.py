@@ -5,3 +5,6 @@ from django.apps import AppConfig
 
 class AuthConfig(AppConfig):
     name = 'users'
+
+    def ready(self) -> None:
+        from . import jobs, signals  # noqa: F401
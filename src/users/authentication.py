@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import threading
+import typing as t
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from common.cache import CacheStats
+
+from .models import UserModel
+
+from resources_api.db.replicas import set_request_user, use_primary
+from resources_api.timing import measure
+
+
+__all__ = (
+    'CachedJWTAuthentication',
+    'get_cache_stats',
+    'invalidate_user',
+)
+
+
+class TokensCache:
+    """
+    Bounded LRU of validated tokens keyed by raw token. Shared by all threads of a worker process.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.stats = CacheStats()
+        self._tokens: t.OrderedDict[bytes, Token] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, raw_token: bytes) -> t.Optional[Token]:
+        with self._lock:
+            token = self._tokens.get(raw_token)
+
+            if token is None:
+                self.stats.miss()
+                return None
+
+            self.stats.hit()
+            self._tokens.move_to_end(raw_token)
+            return token
+
+    def set(self, raw_token: bytes, token: Token) -> None:
+        with self._lock:
+            self._tokens[raw_token] = token
+            self._tokens.move_to_end(raw_token)
+
+            if len(self._tokens) > self.maxsize:
+                self._tokens.popitem(last=False)
+
+    def delete(self, raw_token: bytes) -> None:
+        with self._lock:
+            self._tokens.pop(raw_token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+
+
+tokens_cache = TokensCache(settings.AUTH_TOKEN_CACHE_SIZE)
+users_cache_stats = CacheStats()
+
+
+# fields of users used by requests, the rest (the password hash first of all) is not put into the shared cache
+# and is loaded from the database on access. Ordered as the fields of the model, as `Model.from_db` expects.
+CACHED_USER_FIELDS = tuple(
+    field.attname for field in UserModel._meta.concrete_fields
+    if field.attname in ('id', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+)
+
+
+def _get_user_cache_key(user_id: t.Any) -> str:
+    return f'auth:user:{user_id}'
+
+
+def invalidate_user(user_id: t.Any) -> None:
+    """
+    Drops cached user. Called on every save/delete of the user, once immediately and once more after the commit,
+    so a concurrent request cannot put the old state back into the cache meanwhile.
+    Tokens cache does not need invalidation: tokens carry no user state and the user is looked up for every request.
+    """
+    cache = caches[settings.AUTH_USER_CACHE_ALIAS]
+    key = _get_user_cache_key(user_id)
+
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def get_cache_stats() -> t.Dict[str, t.Dict[str, t.Union[int, float]]]:
+    return {
+        'tokens': tokens_cache.stats.as_dict(),
+        'users': users_cache_stats.as_dict(),
+    }
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that skips signature verification for recently seen tokens (expiration is still checked)
+    and takes users from cache (`AUTH_USER_CACHE_ALIAS`, shared by all the processes, so a user changed by any of them
+    is invalidated for all) for `AUTH_USER_CACHE_TIMEOUT` seconds. Only `CACHED_USER_FIELDS` are cached, a user taken
+    from cache has the other fields deferred.
+    Users updated by `QuerySet.update()` bypass invalidation and may be stale till the timeout.
+    """
+
+    def authenticate(self, request: Request) -> t.Optional[t.Tuple[UserModel, Token]]:
+        with measure('auth'):
+            return super().authenticate(request)
+
+    def get_validated_token(self, raw_token: bytes) -> Token:
+        token = tokens_cache.get(raw_token)
+
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            tokens_cache.set(raw_token, token)
+            return token
+
+        try:
+            token.check_exp(current_time=aware_utcnow())
+        except TokenError as exc:
+            tokens_cache.delete(raw_token)
+            raise InvalidToken({'detail': exc.args[0]})
+
+        return token
+
+    def get_user(self, validated_token: Token) -> UserModel:
+        cache = caches[settings.AUTH_USER_CACHE_ALIAS]
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        key = _get_user_cache_key(user_id)
+
+        set_request_user(user_id)
+
+        values = cache.get(key)
+
+        if values is not None:
+            users_cache_stats.hit()
+            # saving of a user with deferred fields updates the loaded fields only
+            return UserModel.from_db(DEFAULT_DB_ALIAS, CACHED_USER_FIELDS, values)
+
+        users_cache_stats.miss()
+
+        # a just registered user may be not replicated yet
+        with use_primary():
+            user = super().get_user(validated_token)
+        cache.set(key, tuple(getattr(user, field) for field in CACHED_USER_FIELDS), settings.AUTH_USER_CACHE_TIMEOUT)
+
+        return user
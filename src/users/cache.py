@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from common.cache import ChangeVersions
+
+
+__all__ = (
+    'users_versions',
+)
+
+
+# replaced on every save and deletion of the user, see users.signals
+users_versions = ChangeVersions('users')
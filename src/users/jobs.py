@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import typing as t
+
+from django.conf import settings
+from django.db import transaction
+
+from jobs.models import JobModel
+from jobs.queue import (
+    enqueue,
+    heartbeat,
+    register,
+)
+from resources.cache import resources_versions
+from resources.models import ResourceModel
+
+from .models import UserModel, UserOptionsModel
+
+
+__all__ = (
+    'PURGE_USER',
+    'enqueue_purge_user',
+    'get_purge_user_key',
+)
+
+
+PURGE_USER = 'purge_user'
+
+
+def get_purge_user_key(user_id: int) -> str:
+    return f'{PURGE_USER}:{user_id}'
+
+
+@transaction.atomic()
+def enqueue_purge_user(user: UserModel) -> JobModel:
+    """
+    Deactivates the user at once, so they cannot authenticate while their data is deleted, and queues the purge
+    """
+    if user.is_active:
+        user.is_active = False
+        user.save(update_fields=('is_active',))
+
+    return enqueue(PURGE_USER, key=get_purge_user_key(user.pk), user_id=user.pk)
+
+
+@register(PURGE_USER)
+def purge_user(job: JobModel, user_id: int) -> t.Dict[str, int]:
+    """
+    Deletes resources of the user in batches, each one in its own short transaction, then the user and their options
+    """
+    batch_size = settings.USERS_PURGE_BATCH_SIZE
+    queryset = ResourceModel.objects.filter(owner_id=user_id).order_by('pk').select_for_update()
+    # a retried job continues where the previous attempt stopped
+    deleted = (job.progress or {}).get('deleted_resources', 0)
+
+    while True:
+        with transaction.atomic():
+            batch = list(queryset.values_list('pk', flat=True)[:batch_size])
+
+            if not batch:
+                break
+
+            ResourceModel.objects.filter(pk__in=batch).delete()
+            UserOptionsModel.objects.release_resources(user_id, len(batch))
+            resources_versions.bump([user_id])
+
+        deleted += len(batch)
+        heartbeat(job, progress={'deleted_resources': deleted})
+
+    # options are deleted by cascade, a resource created for the user meanwhile fails the attempt and it is retried
+    UserModel.objects.filter(pk=user_id).delete()
+
+    return {'deleted_resources': deleted}
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import csv
+import sys
+import typing as t
+from itertools import islice
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+
+from ...provisioning import CREATED, provision_users
+
+
+class Command(BaseCommand):
+    help = 'Creates users from CSV with email and password columns. Passwords are hashed by ' \
+           'USERS_PROVISION_PROCESSES processes, every batch of users is created in one transaction. ' \
+           'Rows that cannot be created (invalid or existing emails, weak passwords) are reported and skipped.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('path', help='Path to CSV file with header, "-" for stdin')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of users created at once')
+
+    def handle(self, *args: t.Any, path: str, batch_size: int, **options: t.Any) -> None:
+        csv_file = sys.stdin if path == '-' else open(path, newline='')
+
+        try:
+            rows = csv.DictReader(csv_file)
+
+            if not {'email', 'password'} <= set(rows.fieldnames or ()):
+                raise CommandError('CSV must have email and password columns')
+
+            created, failed = self._provision(rows, batch_size)
+        finally:
+            if csv_file is not sys.stdin:
+                csv_file.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Users created: {created}, failed: {failed}'))
+
+    def _provision(self, rows: t.Iterator[t.Dict[str, str]], batch_size: int) -> t.Tuple[int, int]:
+        created = failed = 0
+        row_number = 1
+
+        for batch in iter(lambda: list(islice(rows, batch_size)), []):
+            for result in provision_users([{'email': row['email'], 'password': row['password']} for row in batch]):
+                if result['status'] == CREATED:
+                    created += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f'row {row_number}: {result["email"]}: {result["errors"]}')
+
+                row_number += 1
+
+            self.stdout.write(f'{created + failed} rows processed')
+
+        return created, failed
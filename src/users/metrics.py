@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from resources_api.metrics import Counter, Histogram
+
+
+__all__ = (
+    'quota_exceeded_total',
+    'quota_lock_wait_seconds',
+)
+
+
+quota_exceeded_total = Counter('resources_quota_exceeded_total', 'Number of resource creations rejected by quota.')
+
+# time of the statements locking options row, mostly waiting for the lock held by concurrent transactions
+quota_lock_wait_seconds = Histogram(
+    'resources_quota_lock_wait_seconds',
+    'Time of locking user options row in quota checks in seconds.',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.6 on 2026-10-18 10:33
+
+from __future__ import annotations
+
+from django.db import migrations, models
+from django.db.models import (
+    Count,
+    OuterRef,
+    Subquery,
+)
+from django.db.models.functions import Coalesce
+
+
+def fill_resource_count(apps, schema_editor):
+    UserOptionsModel = apps.get_model('users', 'UserOptionsModel')
+    ResourceModel = apps.get_model('resources', 'ResourceModel')
+
+    resources_count = ResourceModel.objects.filter(owner_id=OuterRef('user_id')) \
+        .order_by() \
+        .values('owner_id') \
+        .annotate(count=Count('id')) \
+        .values('count')
+
+    UserOptionsModel.objects.update(resource_count=Coalesce(Subquery(resources_count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('resources', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useroptionsmodel',
+            name='resource_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_resource_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # expression indexes are not supported by Django models, the expression is the one of users.models.get_usage_ratio
+    atomic = False
+
+    dependencies = [
+        ('users', '0002_useroptionsmodel_resource_count'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS users_options_usage_ratio_idx ON users_useroptionsmodel '
+            '(((resource_count)::double precision / NULLIF(quota, 0)) DESC NULLS LAST)',
+            'DROP INDEX CONCURRENTLY IF EXISTS users_options_usage_ratio_idx',
+        ),
+    ]
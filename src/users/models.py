@@ -6,11 +6,17 @@ from django.contrib.auth.models import (
     UserManager,
 )
 from django.db import models
+from django.db.models.functions import (
+    Cast,
+    Greatest,
+    NullIf,
+)
 
 
 __all__ = (
     'UserModel',
     'UserOptionsModel',
+    'get_usage_ratio',
 )
 
 
@@ -61,6 +67,43 @@ class UserModel(AbstractBaseUser, PermissionsMixin):
         super().__init__(*args, **kwargs)
 
 
+class UserOptionsQuerySet(models.QuerySet):
+    def acquire_resources(self, user_id: int, count: int = 1) -> bool:
+        """
+        Reserves `count` resources within user's quota by a single conditional UPDATE.
+        Updated row stays locked till the end of the transaction. Returns False if quota would be exceeded.
+        """
+        return bool(
+            self.filter(user_id=user_id)
+                .filter(models.Q(quota__isnull=True) | models.Q(quota__gte=models.F('resource_count') + count))
+                .update(resource_count=models.F('resource_count') + count)
+        )
+
+    def release_resources(self, user_id: int, count: int = 1) -> None:
+        """
+        Returns `count` resources back to user's quota. Counter never goes below zero,
+        drift is repaired by `reconcile_resource_counts` cmd.
+        """
+        self.filter(user_id=user_id).update(
+            resource_count=Greatest(models.F('resource_count') - count, models.Value(0))
+        )
+
+
 class UserOptionsModel(models.Model):
     user = models.OneToOneField(UserModel, editable=False, null=False, on_delete=models.CASCADE, related_name='options')
     quota = models.PositiveIntegerField(null=True)
+    resource_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = UserOptionsQuerySet.as_manager()
+
+
+def get_usage_ratio(options: str = '') -> models.Expression:
+    """
+    Share of the quota taken by resources, null for unlimited and zero quotas.
+    `options` is the path to the options from the queried model, e.g. `options__` for users.
+    The expression matches `users_options_usage_ratio_idx` index, so filtering by it is indexed.
+    """
+    return models.ExpressionWrapper(
+        Cast(f'{options}resource_count', models.FloatField()) / NullIf(f'{options}quota', models.Value(0)),
+        output_field=models.FloatField(),
+    )
@@ -0,0 +1,168 @@
+"""
+Bulk provisioning of users.
+
+PBKDF2 hashing takes most of the time of a user creation and holds the GIL, so passwords are hashed by a pool of
+`USERS_PROVISION_PROCESSES` worker processes. The pool is started on first use and kept by the process. Then all
+the users and their options are inserted by two `bulk_create` queries in one transaction.
+"""
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+import threading
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+
+from .cache import users_versions
+from .models import UserModel, UserOptionsModel
+from .seriazliers import RegistrationSerializer
+
+from resources_api.exceptions import UNIQUE_VIOLATION_DETAILS
+
+
+__all__ = (
+    'CREATED',
+    'FAILED',
+    'hash_passwords',
+    'provision_users',
+)
+
+
+CREATED = 'created'
+FAILED = 'failed'
+
+EMAIL_EXISTS = UNIQUE_VIOLATION_DETAILS['users_usermodel_email_key']
+EMAIL_DUPLICATED = {'email': ['Email is duplicated in the request']}
+
+_pool_lock = threading.Lock()
+_pool: t.Optional[ProcessPoolExecutor] = None
+_pool_owner: t.Optional[t.Tuple[int, int]] = None
+_pool_pid: t.Optional[int] = None
+
+
+def _get_pool(processes: int) -> ProcessPoolExecutor:
+    global _pool, _pool_owner, _pool_pid
+
+    with _pool_lock:
+        # a forked process starts its own pool
+        if _pool_owner != (os.getpid(), processes):
+            # the previous pool of the process is replaced after a change of the number of processes or a crash,
+            # a pool inherited by a forked process belongs to the parent
+            if _pool is not None and _pool_pid == os.getpid():
+                # maps running in other threads are finished by the workers before they exit
+                _pool.shutdown(wait=False)
+
+            # spawned workers do not inherit threads and database connections of the process
+            _pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=django.setup)
+            _pool_owner = (os.getpid(), processes)
+            _pool_pid = os.getpid()
+
+        return _pool
+
+
+def hash_passwords(passwords: t.Sequence[str]) -> t.List[str]:
+    global _pool_owner
+
+    processes = settings.USERS_PROVISION_PROCESSES
+
+    if processes <= 1 or len(passwords) <= 1:
+        return [make_password(password) for password in passwords]
+
+    pool = _get_pool(processes)
+    # a few chunks per process keep processes busy till the end without a round trip per password
+    chunksize = math.ceil(len(passwords) / (processes * 4))
+
+    try:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+    except BrokenProcessPool:
+        # a worker was killed, the next call starts a new pool
+        _pool_owner = None
+        raise
+
+
+def _insert(users: t.List[UserModel]) -> t.Set[str]:
+    """
+    Inserts the users with their options, returns emails of the users skipped because they were registered
+    concurrently
+    """
+    taken: t.Set[str] = set()
+
+    while users:
+        try:
+            with transaction.atomic():
+                UserModel.objects.bulk_create(users)
+                UserOptionsModel.objects.bulk_create(UserOptionsModel(user=user) for user in users)
+
+            break
+
+        except IntegrityError:
+            emails = set(UserModel.objects.filter(email__in=[user.email for user in users])
+                         .values_list('email', flat=True))
+
+            if not emails:
+                raise
+
+            taken |= emails
+            users = [user for user in users if user.email not in emails]
+
+            for user in users:
+                user.pk = None
+
+    return taken
+
+
+def provision_users(rows: t.Sequence[t.Dict[str, t.Any]]) -> t.List[t.Dict[str, t.Any]]:
+    """
+    Creates users by `{"email": ..., "password": ...}` rows validated as registrations. Invalid rows and rows with
+    existing emails are skipped, the rest is created in one transaction. Returns the result of every row in their order:
+    `{"email": ..., "status": "created", "pk": ...}` or `{"email": ..., "status": "failed", "errors": {...}}`.
+    """
+    results: t.List[t.Dict[str, t.Any]] = []
+    # email -> result and password of the row to create
+    pending: t.Dict[str, t.Tuple[t.Dict[str, t.Any], str]] = {}
+
+    for row in rows:
+        serializer = RegistrationSerializer(data=row)
+
+        if not serializer.is_valid():
+            results.append({'email': row.get('email'), 'status': FAILED, 'errors': serializer.errors})
+            continue
+
+        email = serializer.validated_data['email']
+        result = {'email': email, 'status': FAILED, 'errors': EMAIL_DUPLICATED}
+        results.append(result)
+
+        if email not in pending:
+            pending[email] = (result, serializer.validated_data['password'])
+
+    # existing users are skipped before hashing their passwords
+    for email in UserModel.objects.filter(email__in=list(pending)).values_list('email', flat=True):
+        pending.pop(email)[0]['errors'] = EMAIL_EXISTS
+
+    hashes = hash_passwords([password for _, password in pending.values()])
+    users = [UserModel(email=email, password=password_hash) for email, password_hash in zip(pending, hashes)]
+
+    taken = _insert(users)
+
+    for user in users:
+        result = pending[user.email][0]
+
+        if user.email in taken:
+            result['errors'] = EMAIL_EXISTS
+        else:
+            result.update(status=CREATED, pk=user.pk)
+            del result['errors']
+
+    if len(users) > len(taken):
+        users_versions.bump([])
+
+    return results
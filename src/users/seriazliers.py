@@ -1,14 +1,15 @@
 from __future__ import annotations
 
+import time
 import typing as t
 
 from django.contrib.auth.password_validation import validate_password
 from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from rest_framework.validators import UniqueValidator
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
+from .metrics import quota_lock_wait_seconds
 from .models import UserModel, UserOptionsModel
 
 
@@ -17,18 +18,20 @@ __all__ = (
     'RegistrationSerializer',
     'JWTTokenSerializer',
     'UserSerializer',
+    'UserUsageSerializer',
+    'UsersListParamsSerializer',
     'UserOptionsSerializer',
     'AccessRefreshSerializer',
+    'BulkCreateUsersSerializer',
 )
 
 
+MAX_BULK_CREATE_SIZE = 1000
+
+
 class RegistrationSerializer(serializers.Serializer):
-    email = serializers.EmailField(
-        required=True,
-        validators=[
-            UniqueValidator(UserModel.objects.all(), message='User with such email already exists')
-        ]
-    )
+    # uniqueness is checked by the database constraint, see resources_api.exceptions
+    email = serializers.EmailField(required=True)
     password = serializers.CharField(
         required=True,
         validators=(validate_password,),
@@ -49,6 +52,17 @@ class RegistrationSerializer(serializers.Serializer):
         raise NotImplementedError()
 
 
+class BulkCreateUsersSerializer(serializers.Serializer):
+    # every row is validated by RegistrationSerializer, so invalid rows are reported rather than fail the request
+    users = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=MAX_BULK_CREATE_SIZE,
+        write_only=True,
+    )
+    results = serializers.ListField(child=serializers.DictField(), read_only=True)
+
+
 class AccessRefreshSerializer(serializers.Serializer):
     """
     Serializer for Swagger generation for auth endpoints
@@ -60,6 +74,14 @@ class AccessRefreshSerializer(serializers.Serializer):
 class JWTTokenSerializer(TokenObtainPairSerializer):
     username_field = UserModel.USERNAME_FIELD
 
+    @classmethod
+    def get_tokens(cls, user: UserModel) -> t.Dict[str, str]:
+        """
+        Issues tokens for already authenticated user, e.g. just registered one
+        """
+        refresh = cls.get_token(user)
+        return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
 
 class MeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -73,21 +95,47 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('pk', 'email', 'first_name', 'last_name', 'is_staff')
 
 
+class UserUsageSerializer(UserSerializer):
+    # annotated by UsersView from the options of the user
+    quota = serializers.IntegerField(read_only=True)
+    resource_count = serializers.IntegerField(read_only=True)
+    usage_ratio = serializers.FloatField(read_only=True)
+
+    class Meta(UserSerializer.Meta):
+        fields = (*UserSerializer.Meta.fields, 'quota', 'resource_count', 'usage_ratio')
+
+
+class UsersListParamsSerializer(serializers.Serializer):
+    include = serializers.ChoiceField(choices=('usage',), required=False)
+    usage_ratio__gte = serializers.FloatField(required=False)
+    usage_ratio__lte = serializers.FloatField(required=False)
+    ordering = serializers.ChoiceField(choices=('usage_ratio', '-usage_ratio'), required=False)
+
+
 class UserOptionsSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserOptionsModel
         fields = ('user_id', 'quota',)
 
-    def _check_quota(self, quota: t.Optional[int], user: UserModel) -> None:
+    def _check_quota(self, quota: t.Optional[int], user_id: int) -> None:
         # lock options row to avoid race condition between resource creation and options update
-        UserOptionsModel.objects.filter(user_id=user.id).select_for_update().get()
+        started = time.perf_counter()
+        resource_count = UserOptionsModel.objects.filter(user_id=user_id).select_for_update() \
+            .values_list('resource_count', flat=True).get()
+        quota_lock_wait_seconds.observe(time.perf_counter() - started, operation='update_quota')
 
-        if quota is not None and user.resources.count() > quota:
+        if quota is not None and resource_count > quota:
             raise ValidationError({'quota': ['quota cannot be less than current number of resources']})
 
     @transaction.atomic()
     def update(self, instance: UserOptionsModel, validated_data: t.Dict[str, t.Any]) -> UserOptionsModel:
         if 'quota' in validated_data:
-            self._check_quota(validated_data['quota'], self.context["request"].user)
+            self._check_quota(validated_data['quota'], instance.user_id)
+
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+
+        # resource_count is maintained concurrently, do not overwrite it with a stale value
+        instance.save(update_fields=validated_data.keys())
 
-        return super().update(instance, validated_data)
+        return instance
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import typing as t
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .cache import users_versions
+from .models import UserModel
+
+
+@receiver(post_save, sender=UserModel)
+@receiver(post_delete, sender=UserModel)
+def invalidate_cached_user(sender: t.Type[UserModel], instance: UserModel, **kwargs: t.Any) -> None:
+    invalidate_user(instance.pk)
+    users_versions.bump([instance.pk])
@@ -1,17 +1,46 @@
 from __future__ import annotations
 
+import tempfile
+import typing as t
+from concurrent.futures.process import BrokenProcessPool
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.status import (
     HTTP_200_OK,
     HTTP_201_CREATED,
-    HTTP_204_NO_CONTENT,
+    HTTP_202_ACCEPTED,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_401_UNAUTHORIZED,
     HTTP_403_FORBIDDEN,
+    HTTP_404_NOT_FOUND,
 )
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 
-from common.test_utils import UsersTestMixin, get_random_int
+from common.test_utils import (
+    UsersTestMixin,
+    get_action_queries,
+    get_random_int,
+    run_in_process,
+)
+from jobs.models import JobModel
+from resources.models import ResourceModel
 from users.models import UserOptionsModel
 
+from . import provisioning
+from .authentication import invalidate_user
+from .cache import users_versions
 from .models import UserModel
+from .provisioning import hash_passwords, provision_users
+from .views import UsersView
 
 
 class AuthEndpointsTest(UsersTestMixin, APITestCase):
@@ -26,6 +55,41 @@ class AuthEndpointsTest(UsersTestMixin, APITestCase):
         assert 'access' in response.json()
         assert 'refresh' in response.json()
         assert UserModel.objects.filter(email=email).exists()
+        assert get_action_queries(response) == 2
+
+    def test_register_hashes_password_once_and_does_not_select_users__not_authorized(self):
+        email = self.generate_email()
+        password = self.generate_password()
+
+        with patch.object(PBKDF2PasswordHasher, 'encode', autospec=True, side_effect=PBKDF2PasswordHasher.encode) \
+                as encode, CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/v1/auth/register', {'email': email, 'password': password})
+
+        sql = [q['sql'] for q in queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))]
+
+        assert response.status_code == HTTP_201_CREATED
+        assert encode.call_count == 1
+        assert len(sql) == 2
+        assert all(q.startswith('INSERT') for q in sql)
+
+    def test_register_tokens_are_valid__not_authorized(self):
+        email = self.generate_email()
+
+        response = self.client.post('/api/v1/auth/register', {'email': email, 'password': self.generate_password()})
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["access"]}')
+        response = client.get('/api/v1/users/me')
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json()['email'] == email
+
+    def test_register_existing_email__not_authorized(self):
+        response = self.client.post('/api/v1/auth/register',
+                                    {'email': self.user_email, 'password': self.generate_password()})
+
+        assert response.status_code == HTTP_400_BAD_REQUEST
+        assert response.json() == {'email': ['User with such email already exists']}
 
     def test_register__authorized(self):
         response = self.user_client.post('/api/v1/auth/register',
@@ -40,6 +104,7 @@ class AuthEndpointsTest(UsersTestMixin, APITestCase):
         assert response.status_code == HTTP_201_CREATED
         assert 'access' in response.json()
         assert 'refresh' in response.json()
+        assert get_action_queries(response) == 1
 
     def test_login__authorized(self):
         response = self.user_client.post('/api/v1/auth/login',
@@ -64,12 +129,31 @@ class UsersEndpointsTest(UsersTestMixin, APITestCase):
 
         assert response.status_code == HTTP_200_OK
         assert actual == expected
+        assert get_action_queries(response) == 0
 
     def test_users_list__admin(self):
         response = self.admin_client.get('/api/v1/users')
 
         assert response.status_code == HTTP_200_OK
         assert len(response.json()) == UserModel.objects.count()
+        assert get_action_queries(response) == 2
+
+    def test_users_list_keyset_pagination__admin(self):
+        for _ in range(3):
+            self.create_user(self.generate_email(), self.generate_password())
+
+        response = self.admin_client.get('/api/v1/users?cursor=&limit=3')
+        first_page = response.json()['results']
+
+        response = self.admin_client.get(response.json()['next'])
+        second_page = response.json()['results']
+
+        expected = list(UserModel.objects.order_by('id').values_list('pk', flat=True))
+        actual = [user['pk'] for user in first_page + second_page]
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json()['next'] is None
+        assert actual == expected
 
     def test_users_list__user(self):
         response = self.user_client.get('/api/v1/users')
@@ -87,6 +171,13 @@ class UsersEndpointsTest(UsersTestMixin, APITestCase):
         assert UserModel.objects.filter(email=email).exists()
         assert UserOptionsModel.objects.filter(user__email=email).exists()
 
+    def test_users_create_existing_email__admin(self):
+        response = self.admin_client.post('/api/v1/users', {'email': self.user_email,
+                                                            'password': self.generate_password()})
+
+        assert response.status_code == HTTP_400_BAD_REQUEST
+        assert response.json() == {'email': ['User with such email already exists']}
+
     def test_users_create__user(self):
         email = self.generate_email()
         password = self.generate_password()
@@ -109,8 +200,16 @@ class UsersEndpointsTest(UsersTestMixin, APITestCase):
     def test_users_delete__admin(self):
         response = self.admin_client.delete(f'/api/v1/users/{self.user.id}')
 
-        assert response.status_code == HTTP_204_NO_CONTENT
+        assert response.status_code == HTTP_202_ACCEPTED
+        assert response.json()['status'] == JobModel.PENDING
+        assert response['Location'] == f'/api/v1/users/{self.user.id}/purge'
+        assert not UserModel.objects.get(pk=self.user.id).is_active
+        assert get_action_queries(response) == 3
+
+        call_command('run_jobs', '--burst', stdout=StringIO())
+
         assert not UserModel.objects.filter(email=self.user_email).exists()
+        assert not UserOptionsModel.objects.filter(user_id=self.user.id).exists()
 
     def test_users_delete__user(self):
         response = self.user_client.delete(f'/api/v1/users/{self.admin.id}')
@@ -127,6 +226,7 @@ class UsersEndpointsTest(UsersTestMixin, APITestCase):
 
         assert response.status_code == HTTP_200_OK
         assert response.json()['quota'] is None
+        assert get_action_queries(response) == 1
 
     def test_users_options__set_quota__admin(self):
         new_quota = get_random_int(0, 100)
@@ -135,6 +235,7 @@ class UsersEndpointsTest(UsersTestMixin, APITestCase):
 
         assert response.status_code == HTTP_200_OK
         assert response.json()['quota'] == new_quota
+        assert get_action_queries(response) == 3
 
     def test_users_options__set_user__admin(self):
         new_user = get_random_int(0, 100)
@@ -143,3 +244,413 @@ class UsersEndpointsTest(UsersTestMixin, APITestCase):
 
         assert response.status_code == HTTP_200_OK
         assert response.json()['user_id'] != new_user
+
+    def test_users_options__set_quota_less_than_resource_count__admin(self):
+        UserOptionsModel.objects.filter(user=self.user).update(resource_count=5)
+
+        response = self.admin_client.patch(f'/api/v1/users/{self.user.id}/options', {'quota': 4})
+
+        assert response.status_code == HTTP_400_BAD_REQUEST
+        assert UserOptionsModel.objects.get(user=self.user).quota is None
+
+
+class CachedAuthenticationTest(UsersTestMixin, APITestCase):
+    def test_user_is_cached(self):
+        self.user_client.get('/api/v1/users/me')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.user_client.get('/api/v1/users/me')
+
+        assert response.status_code == HTTP_200_OK
+        assert len(queries) == 0
+
+    def test_password_is_not_cached(self):
+        self.user_client.get('/api/v1/users/me')
+
+        cached = caches[settings.AUTH_USER_CACHE_ALIAS].get(f'auth:user:{self.user.id}')
+
+        assert cached is not None
+        assert self.user.password not in cached
+
+    def test_update_of_cached_user(self):
+        self.user_client.get('/api/v1/users/me')
+
+        response = self.user_client.patch('/api/v1/users/me', {'first_name': 'name'})
+
+        assert response.status_code == HTTP_200_OK
+        assert UserModel.objects.get(id=self.user.id).first_name == 'name'
+        # deferred fields are not overwritten by the update
+        assert self.client.post('/api/v1/auth/login', {'email': self.user_email, 'password': self.user_password}) \
+            .status_code == HTTP_201_CREATED
+
+    def test_cached_user_invalidated_on_deactivation(self):
+        self.user_client.get('/api/v1/users/me')
+
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.user_client.get('/api/v1/users/me')
+
+        assert response.status_code == HTTP_401_UNAUTHORIZED
+
+    def test_cached_user_invalidated_on_staff_status_change(self):
+        self.user_client.get('/api/v1/users/me')
+
+        self.user.is_staff = True
+        self.user.save()
+
+        response = self.user_client.get('/api/v1/users')
+
+        assert response.status_code == HTTP_200_OK
+
+    def test_cached_user_invalidated_by_another_process(self):
+        self.user_client.get('/api/v1/users/me')
+
+        # saved by another worker process, which invalidates the user in the shared cache
+        UserModel.objects.filter(id=self.user.id).update(is_active=False)
+        run_in_process(invalidate_user, self.user.id)
+
+        response = self.user_client.get('/api/v1/users/me')
+
+        assert response.status_code == HTTP_401_UNAUTHORIZED
+
+    def test_cached_user_invalidated_on_delete(self):
+        self.user_client.get('/api/v1/users/me')
+
+        self.admin_client.delete(f'/api/v1/users/{self.user.id}')
+
+        response = self.user_client.get('/api/v1/users/me')
+
+        assert response.status_code == HTTP_401_UNAUTHORIZED
+
+    def test_cache_stats__admin(self):
+        self.admin_client.get('/api/v1/users/me')
+
+        response = self.admin_client.get('/api/v1/auth/cache-stats')
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json()['tokens']['hits'] > 0
+        assert response.json()['users']['hits'] > 0
+
+    def test_cache_stats__user(self):
+        response = self.user_client.get('/api/v1/auth/cache-stats')
+
+        assert response.status_code == HTTP_403_FORBIDDEN
+
+
+class UsersETagTest(UsersTestMixin, APITestCase):
+    def get_not_modified(self, client: APIClient, url: str) -> t.Tuple[int, int]:
+        """
+        Returns status and number of queries of the request made with ETag of the previous response.
+        """
+        etag = client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        return response.status_code, len(queries)
+
+    def test_me_not_modified(self):
+        assert self.get_not_modified(self.user_client, '/api/v1/users/me') == (HTTP_304_NOT_MODIFIED, 0)
+
+    def test_me_modified(self):
+        etag = self.user_client.get('/api/v1/users/me')['ETag']
+
+        self.user_client.patch('/api/v1/users/me', {'first_name': 'changed'})
+        response = self.user_client.get('/api/v1/users/me', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json()['first_name'] == 'changed'
+        assert response['ETag'] != etag
+
+    def test_me_modified_by_another_process(self):
+        etag = self.user_client.get('/api/v1/users/me')['ETag']
+
+        run_in_process(users_versions.bump, [self.user.id])
+        response = self.user_client.get('/api/v1/users/me', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == HTTP_200_OK
+        assert response['ETag'] != etag
+
+    def test_users_list_not_modified__admin(self):
+        assert self.get_not_modified(self.admin_client, '/api/v1/users') == (HTTP_304_NOT_MODIFIED, 0)
+
+    def test_users_list_modified_by_registration__admin(self):
+        etag = self.admin_client.get('/api/v1/users')['ETag']
+
+        self.create_user(self.generate_email(), self.generate_password())
+        response = self.admin_client.get('/api/v1/users', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == HTTP_200_OK
+
+    def test_users_retrieve_not_modified__admin(self):
+        url = f'/api/v1/users/{self.user.id}'
+
+        assert self.get_not_modified(self.admin_client, url) == (HTTP_304_NOT_MODIFIED, 0)
+
+    def test_users_retrieve_modified__admin(self):
+        url = f'/api/v1/users/{self.user.id}'
+        etag = self.admin_client.get(url)['ETag']
+
+        self.user.is_staff = True
+        self.user.save()
+
+        assert self.admin_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == HTTP_200_OK
+
+    def test_etag_depends_on_user__admin(self):
+        password = self.generate_password()
+        other_admin = self.create_adminuser(self.generate_email(), password)
+        other_client = self.get_authorized_client(other_admin.email, password)
+
+        assert self.admin_client.get('/api/v1/users')['ETag'] != other_client.get('/api/v1/users')['ETag']
+
+
+class UsersValuesListTest(UsersTestMixin, APITestCase):
+    def assert_same_content(self, client: APIClient, url: str) -> None:
+        fast_response = client.get(url)
+
+        with patch.object(UsersView, 'values_list', False):
+            response = client.get(url)
+
+        assert fast_response.status_code == HTTP_200_OK
+        assert fast_response.content == response.content
+
+    def test_list__admin(self):
+        self.user.first_name = 'Пользователь'
+        self.user.save()
+
+        self.assert_same_content(self.admin_client, '/api/v1/users')
+        self.assert_same_content(self.admin_client, '/api/v1/users?limit=1&offset=1')
+        self.assert_same_content(self.admin_client, '/api/v1/users?cursor=&limit=1')
+        self.assert_same_content(self.admin_client, '/api/v1/users?include=usage&ordering=-usage_ratio')
+
+
+class UsersUsageTest(UsersTestMixin, APITestCase):
+    def set_usage(self, user: UserModel, quota: t.Optional[int], resource_count: int) -> None:
+        UserOptionsModel.objects.filter(user=user).update(quota=quota, resource_count=resource_count)
+
+    def get_usage(self, url: str) -> t.Dict[int, t.Tuple[t.Any, ...]]:
+        response = self.admin_client.get(url)
+
+        assert response.status_code == HTTP_200_OK
+        assert get_action_queries(response) == 2
+
+        return {
+            user['pk']: (user['quota'], user['resource_count'], user['usage_ratio'])
+            for user in response.json()
+        }
+
+    def test_include_usage__admin(self):
+        self.set_usage(self.user, 10, 4)
+
+        usage = self.get_usage('/api/v1/users?include=usage')
+
+        assert usage[self.user.id] == (10, 4, 0.4)
+        assert usage[self.admin.id] == (None, 0, None)
+
+    def test_list_without_usage__admin(self):
+        response = self.admin_client.get('/api/v1/users')
+
+        assert 'usage_ratio' not in response.json()[0]
+
+    def test_filter_by_usage_ratio__admin(self):
+        other = self.create_user(self.generate_email(), self.generate_password())
+        self.set_usage(self.user, 10, 9)
+        self.set_usage(other, 10, 5)
+
+        assert set(self.get_usage('/api/v1/users?include=usage&usage_ratio__gte=0.9')) == {self.user.id}
+        assert set(self.get_usage('/api/v1/users?include=usage&usage_ratio__lte=0.5')) == {other.id}
+
+        response = self.admin_client.get('/api/v1/users?usage_ratio__gte=0.9')
+
+        assert [user['pk'] for user in response.json()] == [self.user.id]
+
+    def test_order_by_usage_ratio__admin(self):
+        other = self.create_user(self.generate_email(), self.generate_password())
+        self.set_usage(self.user, 10, 9)
+        self.set_usage(other, 10, 5)
+
+        # unlimited admin goes last in both directions
+        assert list(self.get_usage('/api/v1/users?include=usage&ordering=-usage_ratio')) == \
+            [self.user.id, other.id, self.admin.id]
+        assert list(self.get_usage('/api/v1/users?include=usage&ordering=usage_ratio')) == \
+            [other.id, self.user.id, self.admin.id]
+
+    def test_invalid_params__admin(self):
+        for query in ('include=quota', 'usage_ratio__gte=much', 'ordering=email', 'ordering=usage_ratio&cursor='):
+            response = self.admin_client.get(f'/api/v1/users?{query}')
+
+            assert response.status_code == HTTP_400_BAD_REQUEST, query
+
+    def test_include_usage__user(self):
+        response = self.user_client.get('/api/v1/users?include=usage')
+
+        assert response.status_code == HTTP_403_FORBIDDEN
+
+
+class UsersBulkCreateTest(UsersTestMixin, APITestCase):
+    def assert_can_login(self, email: str, password: str) -> None:
+        response = self.client.post('/api/v1/auth/login', {'email': email, 'password': password})
+
+        assert response.status_code == HTTP_201_CREATED
+
+    def test_bulk_create__admin(self):
+        email, other_email, password = self.generate_email(), self.generate_email(), self.generate_password()
+
+        response = self.admin_client.post('/api/v1/users/bulk', {'users': [
+            {'email': email, 'password': password},
+            {'email': 'not-an-email', 'password': password},
+            {'email': self.user_email, 'password': password},
+            {'email': other_email, 'password': '123'},
+            {'email': email, 'password': password},
+        ]}, format='json')
+        results = response.json()['results']
+        user = UserModel.objects.get(email=email)
+
+        assert response.status_code == HTTP_200_OK
+        assert results[0] == {'email': email, 'status': 'created', 'pk': user.pk}
+        assert [result['status'] for result in results[1:]] == ['failed'] * 4
+        assert 'email' in results[1]['errors']
+        assert results[2]['errors'] == {'email': ['User with such email already exists']}
+        assert 'password' in results[3]['errors']
+        assert results[4]['errors'] == {'email': ['Email is duplicated in the request']}
+        assert UserOptionsModel.objects.filter(user=user).exists()
+        assert not UserModel.objects.filter(email=other_email).exists()
+        assert get_action_queries(response) == 3
+        self.assert_can_login(email, password)
+
+    @override_settings(USERS_PROVISION_PROCESSES=2)
+    def test_bulk_create_hashes_passwords_in_processes__admin(self):
+        users = [{'email': self.generate_email(), 'password': self.generate_password()} for _ in range(5)]
+
+        with patch.object(PBKDF2PasswordHasher, 'encode', autospec=True,
+                          side_effect=PBKDF2PasswordHasher.encode) as encode:
+            response = self.admin_client.post('/api/v1/users/bulk', {'users': users}, format='json')
+
+        assert [result['status'] for result in response.json()['results']] == ['created'] * 5
+        # the passwords are hashed by the pool processes
+        assert encode.call_count == 0
+
+        for user in users:
+            self.assert_can_login(user['email'], user['password'])
+
+    def test_provisioning_pool_replaced(self):
+        passwords = ['first', 'second']
+
+        with patch.multiple('users.provisioning', _pool=None, _pool_owner=None, _pool_pid=None), \
+                patch('users.provisioning.ProcessPoolExecutor') as executor_class:
+            executor_class.side_effect = lambda *args, **kwargs: MagicMock()
+
+            with override_settings(USERS_PROVISION_PROCESSES=2):
+                hash_passwords(passwords)
+                first = provisioning._pool
+                first.map.side_effect = BrokenProcessPool()
+
+                with self.assertRaises(BrokenProcessPool):
+                    hash_passwords(passwords)
+
+                hash_passwords(passwords)
+                second = provisioning._pool
+
+            with override_settings(USERS_PROVISION_PROCESSES=3):
+                hash_passwords(passwords)
+
+        # a broken pool and a pool of another number of processes are shut down before they are replaced
+        first.shutdown.assert_called_once_with(wait=False)
+        second.shutdown.assert_called_once_with(wait=False)
+        assert executor_class.call_count == 3
+
+    def test_bulk_create_skips_concurrently_registered_users(self):
+        email, other_email = self.generate_email(), self.generate_email()
+
+        def hash_passwords(passwords: t.List[str]) -> t.List[str]:
+            self.create_user(email, self.generate_password())
+            return [f'hash-{password}' for password in passwords]
+
+        with patch('users.provisioning.hash_passwords', side_effect=hash_passwords):
+            results = provision_users([{'email': email, 'password': self.generate_password()},
+                                       {'email': other_email, 'password': self.generate_password()}])
+
+        assert [result['status'] for result in results] == ['failed', 'created']
+        assert results[0]['errors'] == {'email': ['User with such email already exists']}
+        assert UserOptionsModel.objects.filter(user_id=results[1]['pk']).exists()
+
+    def test_bulk_create_invalid__admin(self):
+        for data in ({'users': []}, {'users': ['email']}, {}):
+            response = self.admin_client.post('/api/v1/users/bulk', data, format='json')
+
+            assert response.status_code == HTTP_400_BAD_REQUEST, data
+
+    def test_bulk_create__user(self):
+        response = self.user_client.post('/api/v1/users/bulk', {'users': []}, format='json')
+
+        assert response.status_code == HTTP_403_FORBIDDEN
+
+    def test_provision_users_command(self):
+        email, password = self.generate_email(), self.generate_password()
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as csv_file:
+            csv_file.write(f'email,password\n{email},{password}\n{self.user_email},{password}\n')
+            csv_file.flush()
+
+            stdout, stderr = StringIO(), StringIO()
+            call_command('provision_users', csv_file.name, '--batch-size', '1', stdout=stdout, stderr=stderr)
+
+        assert 'Users created: 1, failed: 1' in stdout.getvalue()
+        assert f'row 2: {self.user_email}' in stderr.getvalue()
+        self.assert_can_login(email, password)
+
+    def test_provision_users_command_without_columns(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as csv_file:
+            csv_file.write('email\n')
+            csv_file.flush()
+
+            with self.assertRaises(CommandError):
+                call_command('provision_users', csv_file.name, stdout=StringIO())
+
+
+class UsersPurgeTest(UsersTestMixin, APITestCase):
+    def run_jobs(self) -> None:
+        call_command('run_jobs', '--burst', stdout=StringIO())
+
+    @override_settings(USERS_PURGE_BATCH_SIZE=2)
+    def test_purge_user_with_resources__admin(self):
+        ResourceModel.objects.bulk_create(ResourceModel(name=f'resource-{i}', owner=self.user) for i in range(5))
+        UserOptionsModel.objects.filter(user=self.user).update(resource_count=5)
+
+        self.admin_client.delete(f'/api/v1/users/{self.user.id}')
+        self.run_jobs()
+
+        response = self.admin_client.get(f'/api/v1/users/{self.user.id}/purge')
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json()['status'] == JobModel.DONE
+        assert response.json()['result'] == {'deleted_resources': 5}
+        assert response.json()['progress'] == {'deleted_resources': 5}
+        assert not ResourceModel.objects.filter(owner_id=self.user.id).exists()
+        assert not UserModel.objects.filter(pk=self.user.id).exists()
+
+    def test_purge_pending__admin(self):
+        self.admin_client.delete(f'/api/v1/users/{self.user.id}')
+
+        response = self.admin_client.get(f'/api/v1/users/{self.user.id}/purge')
+
+        assert response.status_code == HTTP_200_OK
+        assert response.json()['status'] == JobModel.PENDING
+
+    def test_delete_twice_queues_one_job__admin(self):
+        first = self.admin_client.delete(f'/api/v1/users/{self.user.id}')
+        second = self.admin_client.delete(f'/api/v1/users/{self.user.id}')
+
+        assert first.json()['id'] == second.json()['id']
+        assert JobModel.objects.count() == 1
+
+    def test_purge_not_requested__admin(self):
+        response = self.admin_client.get(f'/api/v1/users/{self.user.id}/purge')
+
+        assert response.status_code == HTTP_404_NOT_FOUND
+
+    def test_purge__user(self):
+        response = self.user_client.get(f'/api/v1/users/{self.user.id}/purge')
+
+        assert response.status_code == HTTP_403_FORBIDDEN
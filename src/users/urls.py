@@ -14,7 +14,9 @@ from .views import (
 users_urlpatterns = [
     path(r'/me', MeView.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update'})),
     path(r'', UsersView.as_view({'post': 'create', 'get': 'list'})),
+    path(r'/bulk', UsersView.as_view({'post': 'bulk_create'})),
     path(r'/<int:pk>', UsersView.as_view({'get': 'retrieve', 'delete': 'destroy'})),
+    path(r'/<int:pk>/purge', UsersView.as_view({'get': 'purge'})),
     path(r'/<int:pk>/options', UsersOptionsView.as_view({'get': 'retrieve',
                                                          'put': 'update',
                                                          'patch': 'partial_update'})),
@@ -23,4 +25,5 @@ users_urlpatterns = [
 auth_urlpatterns = [
     path(r'/register', AuthViewSet.as_view({'post': 'register'})),
     path(r'/login', AuthViewSet.as_view({'post': 'obtain_jwt'})),
+    path(r'/cache-stats', AuthViewSet.as_view({'get': 'cache_stats'})),
 ]
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import typing as t
+from functools import partial
 
+from django.db.models import F, QuerySet
 from django.http import JsonResponse
-from drf_yasg.utils import swagger_auto_schema
 from rest_framework import mixins, status
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import (
     NOT,
     AllowAny,
@@ -14,19 +16,40 @@ from rest_framework.permissions import (
     SingleOperandHolder,
 )
 from rest_framework.request import Request
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from common.etags import ETagMixin
+from common.listing import ValuesListMixin
+from common.pagination import KeysetPagination
+from common.query_budget import QueryBudgetMixin
+from common.swagger import swagger_schema
+from jobs.models import JobModel
+from jobs.seriazliers import JobSerializer
 from users.seriazliers import AccessRefreshSerializer
 
-from .models import UserModel, UserOptionsModel
+from .authentication import get_cache_stats
+from .cache import users_versions
+from .jobs import enqueue_purge_user, get_purge_user_key
+from .models import (
+    UserModel,
+    UserOptionsModel,
+    get_usage_ratio,
+)
+from .provisioning import provision_users
 from .seriazliers import (
+    BulkCreateUsersSerializer,
     JWTTokenSerializer,
     MeSerializer,
     RegistrationSerializer,
     UserOptionsSerializer,
     UserSerializer,
+    UsersListParamsSerializer,
+    UserUsageSerializer,
 )
 
+from resources_api.db.replicas import pin_user
+
 
 __all__ = (
     'MeView',
@@ -36,48 +59,153 @@ __all__ = (
 )
 
 
-class AuthViewSet(GenericViewSet):
+class AuthViewSet(QueryBudgetMixin,
+                  GenericViewSet):
     queryset = UserModel.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
 
     action2permission_classes = {
         'register': [SingleOperandHolder(NOT, IsAuthenticated)],
+        'cache_stats': [IsAdminUser],
+    }
+    action2query_budget = {
+        'register': 2,
+        'obtain_jwt': 1,
+        'cache_stats': 0,
+    }
+    # see DEFAULT_THROTTLE_RATES
+    action2throttle_scope = {
+        'register': 'register',
+        'obtain_jwt': 'login',
     }
 
     def get_permissions(self) -> t.List[BasePermission]:
         perms_classes = self.action2permission_classes.get(self.action, self.permission_classes)
         return [p() for p in perms_classes]
 
-    @swagger_auto_schema(request_body=RegistrationSerializer,
-                         responses={status.HTTP_201_CREATED: AccessRefreshSerializer})
+    @swagger_schema(lambda openapi: dict(request_body=RegistrationSerializer,
+                                         responses={status.HTTP_201_CREATED: AccessRefreshSerializer}))
     def register(self, request: Request) -> JsonResponse:
         serializer = RegistrationSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.create(serializer.validated_data)
-
-        jwt_serializer = JWTTokenSerializer(data=serializer.validated_data)
-        jwt_serializer.is_valid()
+        user = serializer.create(serializer.validated_data)
+        # registration is anonymous, so the middleware cannot pin the new user
+        pin_user(user.id)
 
-        return JsonResponse(jwt_serializer.validated_data, status=status.HTTP_201_CREATED)
+        return JsonResponse(JWTTokenSerializer.get_tokens(user), status=status.HTTP_201_CREATED)
 
-    @swagger_auto_schema(request_body=JWTTokenSerializer,
-                         responses={status.HTTP_201_CREATED: AccessRefreshSerializer})
+    @swagger_schema(lambda openapi: dict(request_body=JWTTokenSerializer,
+                                         responses={status.HTTP_201_CREATED: AccessRefreshSerializer}))
     def obtain_jwt(self, request: Request) -> JsonResponse:
         serializer = JWTTokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         return JsonResponse(serializer.validated_data, status=status.HTTP_201_CREATED)
 
+    def cache_stats(self, request: Request) -> JsonResponse:
+        """
+        Hits and misses of authentication caches of the worker process that handles the request
+        """
+        return JsonResponse(get_cache_stats())
+
 
-class UsersView(mixins.RetrieveModelMixin,
-                mixins.DestroyModelMixin,
-                mixins.ListModelMixin,
+class UsersView(QueryBudgetMixin,
+                ETagMixin,
+                mixins.RetrieveModelMixin,
+                ValuesListMixin,
                 GenericViewSet):
     queryset = UserModel.objects.all()
     serializer_class = UserSerializer
     permission_classes = (IsAdminUser,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ('id',)
+    # serializers of the list return model fields as is, see ValuesListMixin
+    values_list = True
+    action2query_budget = {
+        'list': 2,
+        'retrieve': 1,
+        'create': 2,
+        # existing emails, users and options, whatever the number of users
+        'bulk_create': 3,
+        'destroy': 3,
+        'purge': 1,
+    }
+
+    def get_etag_version(self) -> str:
+        return users_versions.get(self.kwargs.get('pk', users_versions.ALL))
+
+    def get_list_params(self) -> t.Dict[str, t.Any]:
+        if not hasattr(self, '_list_params'):
+            serializer = UsersListParamsSerializer(data=self.request.query_params)
+            serializer.is_valid(raise_exception=True)
+            self._list_params = serializer.validated_data
+
+        return self._list_params
+
+    def get_serializer_class(self) -> t.Type[UserSerializer]:
+        if self.action == 'list' and self.get_list_params().get('include') == 'usage':
+            return UserUsageSerializer
+
+        return super().get_serializer_class()
+
+    def get_queryset(self) -> QuerySet:
+        queryset = super().get_queryset()
+
+        if self.action != 'list' or not self.get_list_params():
+            return queryset
+
+        return self.filter_by_usage(queryset, self.get_list_params())
+
+    def filter_by_usage(self, queryset: QuerySet, params: t.Dict[str, t.Any]) -> QuerySet:
+        """
+        Joins quota and resource count of the users, so the list is a single query however many users it has
+        """
+        queryset = queryset.annotate(
+            quota=F('options__quota'),
+            resource_count=F('options__resource_count'),
+            usage_ratio=get_usage_ratio('options__'),
+        )
+
+        for lookup in ('usage_ratio__gte', 'usage_ratio__lte'):
+            if lookup in params:
+                queryset = queryset.filter(**{lookup: params[lookup]})
+
+        if 'ordering' in params:
+            if self.paginator.cursor_query_param in self.request.query_params:
+                raise ValidationError({'ordering': ['Ordering is not supported in cursor mode']})
 
-    @swagger_auto_schema(request_body=RegistrationSerializer, responses={status.HTTP_201_CREATED: UserSerializer})
+            usage_ratio = F('usage_ratio')
+            # users with unlimited quota go last in both directions
+            queryset = queryset.order_by(
+                usage_ratio.desc(nulls_last=True) if params['ordering'].startswith('-')
+                else usage_ratio.asc(nulls_last=True),
+                'id',
+            )
+
+        return queryset
+
+    @swagger_schema(lambda openapi: dict(
+        manual_parameters=[
+            openapi.Parameter('include', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['usage'],
+                              description='Include quota, resource count and usage ratio of every user'),
+            openapi.Parameter('usage_ratio__gte', openapi.IN_QUERY, type=openapi.TYPE_NUMBER),
+            openapi.Parameter('usage_ratio__lte', openapi.IN_QUERY, type=openapi.TYPE_NUMBER),
+            openapi.Parameter('ordering', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              enum=['usage_ratio', '-usage_ratio']),
+        ],
+    ))
+    def list(self, request: Request, *args: t.Any, **kwargs: t.Any) -> Response:
+        # usage changes with resources and options which do not replace users versions, so it has no ETag
+        if self.get_list_params():
+            return super().list(request, *args, **kwargs)
+
+        return self.get_conditional_response(self.get_etag(), partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request: Request, *args: t.Any, **kwargs: t.Any) -> Response:
+        return self.get_conditional_response(self.get_etag(), partial(super().retrieve, request, *args, **kwargs))
+
+    @swagger_schema(lambda openapi: dict(request_body=RegistrationSerializer,
+                                         responses={status.HTTP_201_CREATED: UserSerializer}))
     def create(self, request: Request, *args: t.Any, **kwargs: t.Any) -> JsonResponse:
         serializer = RegistrationSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -86,8 +214,47 @@ class UsersView(mixins.RetrieveModelMixin,
         serializer_class = self.get_serializer_class()
         return JsonResponse(serializer_class(user).data, status=status.HTTP_201_CREATED)
 
+    @swagger_schema(lambda openapi: dict(request_body=BulkCreateUsersSerializer,
+                                         responses={status.HTTP_200_OK: BulkCreateUsersSerializer}))
+    def bulk_create(self, request: Request, *args: t.Any, **kwargs: t.Any) -> JsonResponse:
+        """
+        Creates up to 1000 users at once, passwords are hashed in parallel. Invalid rows and existing emails are
+        skipped, the result of every row is returned in the order of `users`.
+        """
+        serializer = BulkCreateUsersSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = provision_users(serializer.validated_data['users'])
+
+        return JsonResponse(BulkCreateUsersSerializer({'results': results}).data)
+
+    @swagger_schema(lambda openapi: dict(responses={status.HTTP_202_ACCEPTED: JobSerializer}))
+    def destroy(self, request: Request, *args: t.Any, **kwargs: t.Any) -> JsonResponse:
+        """
+        Deactivates the user and queues deletion of the user with all their resources,
+        the status of the deletion is available at `purge` endpoint
+        """
+        job = enqueue_purge_user(self.get_object())
 
-class UsersOptionsView(mixins.UpdateModelMixin,
+        response = JsonResponse(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = f'{request.path}/purge'
+        return response
+
+    @swagger_schema(lambda openapi: dict(responses={status.HTTP_200_OK: JobSerializer}))
+    def purge(self, request: Request, pk: int) -> JsonResponse:
+        """
+        Status of the last deletion of the user
+        """
+        job = JobModel.objects.filter(key=get_purge_user_key(pk)).order_by('-id').first()
+
+        if job is None:
+            raise NotFound()
+
+        return JsonResponse(JobSerializer(job).data)
+
+
+class UsersOptionsView(QueryBudgetMixin,
+                       mixins.UpdateModelMixin,
                        mixins.RetrieveModelMixin,
                        GenericViewSet):
     permission_classes = (IsAdminUser,)
@@ -95,13 +262,32 @@ class UsersOptionsView(mixins.UpdateModelMixin,
     queryset = UserOptionsModel.objects.all()
     lookup_field = 'user_id'
     lookup_url_kwarg = 'pk'
+    action2query_budget = {
+        'retrieve': 1,
+        'update': 3,
+        'partial_update': 3,
+    }
 
 
-class MeView(mixins.UpdateModelMixin,
+class MeView(QueryBudgetMixin,
+             ETagMixin,
+             mixins.UpdateModelMixin,
              mixins.RetrieveModelMixin,
              GenericViewSet):
     permission_classes = (IsAuthenticated,)
     serializer_class = MeSerializer
+    # the user is taken from authentication
+    action2query_budget = {
+        'retrieve': 0,
+        'update': 1,
+        'partial_update': 1,
+    }
 
     def get_object(self) -> UserModel:
         return self.request.user
+
+    def get_etag_version(self) -> str:
+        return users_versions.get(self.request.user.id)
+
+    def retrieve(self, request: Request, *args: t.Any, **kwargs: t.Any) -> Response:
+        return self.get_conditional_response(self.get_etag(), partial(super().retrieve, request, *args, **kwargs))